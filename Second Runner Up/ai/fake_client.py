@@ -0,0 +1,43 @@
+import time
+import asyncio
+
+from config import ChatbotConfig
+from ai.gemini_client import GeminiClient, AIResponse
+
+
+class FakeGeminiClient(GeminiClient):
+    """In-process stand-in for the Gemini API that answers after a fixed delay.
+
+    Used by the benchmarks and by `server.py --fake-ai` to exercise the full
+    pipeline without network access or an API key.
+    """
+
+    def __init__(self, config: ChatbotConfig, latency: float = 0.0):
+        super().__init__(config)
+        self.latency = latency
+        self.initialized = True
+        self.calls = 0
+
+    def generate_response(self, prompt: str, context=None, temperature=None) -> AIResponse:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return AIResponse(f"Synthetic AI answer {self.calls}")
+
+    async def agenerate_response(self, prompt: str, context=None, temperature=None) -> AIResponse:
+        self.calls += 1
+        calls = self.calls
+        # Same concurrency limit as real calls
+        async with self._get_semaphore():
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        return AIResponse(f"Synthetic AI answer {calls}")
+
+    def stream_response(self, prompt: str, context=None):
+        result = self.generate_response(prompt, context)
+        for word in result.text.split(" "):
+            yield word + " "
+        yield result
+
+    async def aclose(self):
+        pass  # No transport to close
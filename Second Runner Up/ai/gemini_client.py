@@ -1,5 +1,9 @@
-from typing import Optional, List
+from typing import Optional, List, Iterator, AsyncIterator, Union
+from dataclasses import dataclass
 import time
+import random
+import asyncio
+import weakref
 import importlib
 import logging
 import importlib
@@ -10,6 +14,34 @@ except ImportError:
     genai = None
 
 from config import ChatbotConfig
+from utils.rate_limiter import TokenBucket
+from utils.circuit_breaker import CircuitBreaker
+
+
+class AIError:
+    """Failure kinds reported in AIResponse.error"""
+    NOT_INITIALIZED = "not_initialized"
+    RATE_LIMITED = "rate_limited"  # Local token bucket, no request was sent
+    QUOTA = "quota"
+    UNAVAILABLE = "unavailable"
+    TIMEOUT = "timeout"
+    CONFIG = "config"
+    CIRCUIT_OPEN = "circuit_open"
+    UNKNOWN = "unknown"
+
+    RETRYABLE = {QUOTA, UNAVAILABLE, TIMEOUT}
+
+
+@dataclass
+class AIResponse:
+    """Generated text, or a user-facing message plus the AIError kind on failure"""
+    text: str
+    error: Optional[str] = None
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
 
 class GeminiClient:
@@ -19,18 +51,27 @@ class GeminiClient:
     to the older `google.generativeai` API if available.
     """
 
+    RATE_LIMITED_RESPONSE = "⚠️ [API Limit] Too many requests right now. Please wait a moment and try again."
+    CIRCUIT_OPEN_RESPONSE = "⚠️ [Offline] The AI service is failing right now, so only local answers are available."
+
     def __init__(self, config: ChatbotConfig):
         self.config = config
         self.model = None
         self.api = None
         self.initialized = False
-        self.request_count = 0
-        self.last_request_time = time.time()
+        self.rate_limiter = TokenBucket(config.max_requests_per_minute, config.rate_limit_burst)
+        self._semaphores = weakref.WeakKeyDictionary()  # Event loop -> its semaphore (one is bound to a single loop)
+        self.breaker = CircuitBreaker(config.circuit_failure_threshold, config.circuit_reset_timeout)
+        self.retries = 0
 
 
     def initialize(self, api_key: str) -> bool:
         try:
-            self.client = genai.Client(api_key=api_key)
+            # One client (and connection pool) serves both sync and async calls
+            self.client = genai.Client(
+                api_key=api_key,
+                http_options={'timeout': self.config.api_timeout * 1000}
+            )
             self.initialized = True
             return True
         except Exception as e:
@@ -38,35 +79,275 @@ class GeminiClient:
             return False
 
 
-    def generate_response(self, prompt: str, context=None, temperature=None) -> str:
+    def generate_response(self, prompt: str, context=None, temperature=None) -> AIResponse:
+        """Generate a reply, retrying retryable failures with exponential backoff"""
+        if not self.initialized:
+            return AIResponse("AI service not initialized", AIError.NOT_INITIALIZED)
+
+        if not self.breaker.allow():
+            return AIResponse(self.CIRCUIT_OPEN_RESPONSE, AIError.CIRCUIT_OPEN)
+
+        full_prompt = self._build_prompt(prompt, context)
+        result = None
+
+        for attempt in range(self.config.max_retries + 1):
+            if not self._check_rate_limit():
+                result = result or AIResponse(self.RATE_LIMITED_RESPONSE, AIError.RATE_LIMITED)
+                break
+
+            try:
+                response = self.client.models.generate_content(
+                    model=self.config.gemini_model,  # e.g. "gemini-1.5-flash"
+                    contents=full_prompt
+                )
+                result = AIResponse(self._extract_text(response))
+            except Exception as e:
+                result = self._error_response(e)
+            result.attempts = attempt + 1
+
+            delay = self._retry_delay(result, attempt)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        self._record_outcome(result)
+        return result
+
+    async def agenerate_response(self, prompt: str, context=None, temperature=None) -> AIResponse:
+        """Async counterpart of generate_response.
+
+        At most `max_concurrent_requests` calls are in flight at once; each is
+        bounded by `api_timeout` and can be cancelled by the caller. Backoff
+        sleeps happen outside the concurrency limit.
+        """
+        if not self.initialized:
+            return AIResponse("AI service not initialized", AIError.NOT_INITIALIZED)
+
+        if not self.breaker.allow():
+            return AIResponse(self.CIRCUIT_OPEN_RESPONSE, AIError.CIRCUIT_OPEN)
+
+        full_prompt = self._build_prompt(prompt, context)
+        result = None
+
+        try:
+            for attempt in range(self.config.max_retries + 1):
+                if not await self._acheck_rate_limit():
+                    result = result or AIResponse(self.RATE_LIMITED_RESPONSE, AIError.RATE_LIMITED)
+                    break
+
+                try:
+                    async with self._get_semaphore():
+                        response = await asyncio.wait_for(
+                            self.client.aio.models.generate_content(
+                                model=self.config.gemini_model,
+                                contents=full_prompt
+                            ),
+                            timeout=self.config.api_timeout
+                        )
+                    result = AIResponse(self._extract_text(response))
+                except asyncio.TimeoutError:
+                    logging.getLogger('AmmaarBhaiChatBot').warning(
+                        "GenAI request timed out after %ss", self.config.api_timeout
+                    )
+                    result = AIResponse(
+                        "⚠️ [Timeout] Sorry, the AI service took too long to respond. Please try again.",
+                        AIError.TIMEOUT
+                    )
+                except Exception as e:
+                    result = self._error_response(e)
+                result.attempts = attempt + 1
+
+                delay = self._retry_delay(result, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+
+        self._record_outcome(result)
+        return result
+
+    def stream_response(self, prompt: str, context=None) -> Iterator[Union[str, AIResponse]]:
+        """Yield text chunks as Gemini generates them, then the final AIResponse.
+
+        The final response carries the assembled text. Failures before the
+        first chunk are retried like generate_response; once text has been
+        yielded a failure ends the stream with an error response.
+        """
         if not self.initialized:
-            return "AI service not initialized"
+            yield AIResponse("AI service not initialized", AIError.NOT_INITIALIZED)
+            return
 
-        if not self._check_rate_limit():
-            return "Rate limit exceeded. Please wait."
+        if not self.breaker.allow():
+            yield AIResponse(self.CIRCUIT_OPEN_RESPONSE, AIError.CIRCUIT_OPEN)
+            return
 
         full_prompt = self._build_prompt(prompt, context)
+        result = None
+        chunks = []
 
         try:
-            response = self.client.models.generate_content(
-                model=self.config.gemini_model,  # e.g. "gemini-1.5-flash"
-                contents=full_prompt
+            for attempt in range(self.config.max_retries + 1):
+                if not self._check_rate_limit():
+                    result = result or AIResponse(self.RATE_LIMITED_RESPONSE, AIError.RATE_LIMITED)
+                    break
+
+                try:
+                    for chunk in self.client.models.generate_content_stream(
+                        model=self.config.gemini_model,
+                        contents=full_prompt
+                    ):
+                        text = self._extract_text(chunk)
+                        if text:
+                            chunks.append(text)
+                            yield text
+                    result = AIResponse("".join(chunks))
+                except Exception as e:
+                    result = self._error_response(e)
+                result.attempts = attempt + 1
+
+                # Text already shown to the caller can't be taken back, so only retry before it
+                delay = None if chunks else self._retry_delay(result, attempt)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        except GeneratorExit:
+            self.breaker.release()  # Caller stopped reading
+            raise
+
+        self._record_outcome(result)
+        yield result
+
+    async def astream_response(self, prompt: str, context=None) -> AsyncIterator[Union[str, AIResponse]]:
+        """Async counterpart of stream_response; `api_timeout` bounds the wait for each chunk"""
+        if not self.initialized:
+            yield AIResponse("AI service not initialized", AIError.NOT_INITIALIZED)
+            return
+
+        if not self.breaker.allow():
+            yield AIResponse(self.CIRCUIT_OPEN_RESPONSE, AIError.CIRCUIT_OPEN)
+            return
+
+        full_prompt = self._build_prompt(prompt, context)
+        result = None
+        chunks = []
+
+        try:
+            for attempt in range(self.config.max_retries + 1):
+                if not await self._acheck_rate_limit():
+                    result = result or AIResponse(self.RATE_LIMITED_RESPONSE, AIError.RATE_LIMITED)
+                    break
+
+                try:
+                    async with self._get_semaphore():
+                        stream = await asyncio.wait_for(
+                            self.client.aio.models.generate_content_stream(
+                                model=self.config.gemini_model,
+                                contents=full_prompt
+                            ),
+                            timeout=self.config.api_timeout
+                        )
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(stream.__anext__(), timeout=self.config.api_timeout)
+                            except StopAsyncIteration:
+                                break
+                            text = self._extract_text(chunk)
+                            if text:
+                                chunks.append(text)
+                                yield text
+                    result = AIResponse("".join(chunks))
+                except asyncio.TimeoutError:
+                    logging.getLogger('AmmaarBhaiChatBot').warning(
+                        "GenAI stream stalled for %ss", self.config.api_timeout
+                    )
+                    result = AIResponse(
+                        "⚠️ [Timeout] Sorry, the AI service took too long to respond. Please try again.",
+                        AIError.TIMEOUT
+                    )
+                except Exception as e:
+                    result = self._error_response(e)
+                result.attempts = attempt + 1
+
+                delay = None if chunks else self._retry_delay(result, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        except (GeneratorExit, asyncio.CancelledError):
+            self.breaker.release()
+            raise
+
+        self._record_outcome(result)
+        yield result
+
+    async def aclose(self):
+        """Close the async transport"""
+        if self.initialized:
+            await self.client.aio.aclose()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit for the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.config.max_concurrent_requests)
+        return semaphore
+
+    def _error_response(self, e: Exception) -> AIResponse:
+        """Classify an API error and map it to a friendly message"""
+        err_msg = str(e).lower()
+        # Handle common API errors with friendly messages
+        if "429" in err_msg or "resource exhausted" in err_msg:
+            return AIResponse(
+                "⚠️ [API Limit] You're sending requests too fast or have hit your daily quota. Please wait.",
+                AIError.QUOTA
+            )
+        
+        if "503" in err_msg or "unavailable" in err_msg or "overloaded" in err_msg:
+            return AIResponse(
+                "⚠️ [Server Busy] Google's AI service is overloaded right now. Please try again in a minute.",
+                AIError.UNAVAILABLE
+            )
+        
+        if isinstance(e, TimeoutError) or "timed out" in err_msg or "timeout" in err_msg:
+            return AIResponse(
+                "⚠️ [Timeout] Sorry, the AI service took too long to respond. Please try again.",
+                AIError.TIMEOUT
+            )
+        
+        if "404" in err_msg or "not found" in err_msg:
+            return AIResponse(
+                f"⚠️ [Config Error] The model '{self.config.gemini_model}' was not found. Please check your configuration.",
+                AIError.CONFIG
             )
-            return self._extract_text(response)
-        except Exception as e:
-            err_msg = str(e).lower()
-            # Handle common API errors with friendly messages
-            if "429" in err_msg or "resource exhausted" in err_msg:
-                return "⚠️ [API Limit] You're sending requests too fast or have hit your daily quota. Please wait."
-            
-            if "503" in err_msg or "unavailable" in err_msg or "overloaded" in err_msg:
-                return "⚠️ [Server Busy] Google's AI service is overloaded right now. Please try again in a minute."
-            
-            if "404" in err_msg or "not found" in err_msg:
-                return f"⚠️ [Config Error] The model '{self.config.gemini_model}' was not found. Please check your configuration."
 
-            logging.getLogger('AmmaarBhaiChatBot').error(f"GenAI generation failed: {e}")
-            return self.config.default_error_response
+        logging.getLogger('AmmaarBhaiChatBot').error("GenAI generation failed: %s", e)
+        return AIResponse(self.config.default_error_response, AIError.UNKNOWN)
+
+    def _retry_delay(self, result: AIResponse, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None if the result should be returned"""
+        if result.ok or result.error not in AIError.RETRYABLE or attempt >= self.config.max_retries:
+            return None
+
+        # Exponential backoff with jitter so concurrent callers don't retry in lockstep
+        ceiling = min(self.config.retry_max_delay, self.config.retry_delay * (2 ** attempt))
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        self.retries += 1
+        logging.getLogger('AmmaarBhaiChatBot').warning(
+            "GenAI %s error, retrying in %.1fs (attempt %d/%d)",
+            result.error, delay, attempt + 2, self.config.max_retries + 1
+        )
+        return delay
+
+    def _record_outcome(self, result: AIResponse):
+        """Feed the final result of a request to the circuit breaker"""
+        if result.ok:
+            self.breaker.record_success()
+        elif result.error == AIError.RATE_LIMITED:
+            self.breaker.release()  # Nothing was sent, so it says nothing about the API
+        else:
+            self.breaker.record_failure()
 
 
     def _extract_text(self, resp) -> str:
@@ -134,17 +415,25 @@ class GeminiClient:
         return f"{system_part}Context:\n{context_str}\n\nUser: {prompt}"
 
     def _check_rate_limit(self) -> bool:
-        """Check rate limiting"""
+        """Wait (up to rate_limit_max_wait) for a rate limit token"""
         if not self.config.rate_limit_enabled:
             return True
+        return self.rate_limiter.acquire(timeout=self.config.rate_limit_max_wait)
 
-        current_time = time.time()
-        if current_time - self.last_request_time >= 60:
-            self.request_count = 0
-            self.last_request_time = current_time
-
-        if self.request_count >= self.config.max_requests_per_minute:
-            return False
+    async def _acheck_rate_limit(self) -> bool:
+        if not self.config.rate_limit_enabled:
+            return True
+        return await self.rate_limiter.aacquire(timeout=self.config.rate_limit_max_wait)
 
-        self.request_count += 1
-        return True
+    def get_statistics(self) -> dict:
+        """Rate limiter fill level, queue depth and circuit breaker state"""
+        bucket = self.rate_limiter.stats()
+        breaker = self.breaker.stats()
+        return {
+            'rate_limit_tokens': round(bucket['tokens'], 2),
+            'rate_limit_capacity': bucket['capacity'],
+            'rate_limit_queue': bucket['queue_depth'],
+            'circuit_state': breaker['state'],
+            'circuit_failures': breaker['failures'],
+            'ai_retries': self.retries
+        }
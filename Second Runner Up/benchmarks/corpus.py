@@ -0,0 +1,127 @@
+import re
+import random
+from typing import Dict, List
+
+CONSONANTS = "bcdfghjklmnprstvz"
+VOWELS = "aeiou"
+FILLERS = ["please", "can", "you", "tell", "me", "about", "the", "what", "is", "a", "and", "now", "i", "want", "know"]
+OPERATORS = ["+", "-", "*", "/", "%", "^"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """Unique pronounceable pseudo-words that never collide with stop words"""
+    words = set()
+    while len(words) < size:
+        syllables = rng.randint(2, 4)
+        words.add("".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)))
+    return sorted(words)
+
+
+def generate_patterns(size: int, vocab: List[str], rng: random.Random) -> Dict:
+    """A patterns.json-shaped corpus: regex, literal and learned entries in a 4:3:3 mix"""
+    patterns = {}
+    for i in range(size):
+        kind = rng.random()
+        words = rng.sample(vocab, rng.randint(2, 4))
+        responses = [f"Synthetic response {i}.{j}" for j in range(rng.randint(1, 3))]
+
+        if kind < 0.4:
+            alternatives = "|".join(" ".join(rng.sample(words, len(words))) for _ in range(2))
+            patterns[f"regex_{i}"] = {
+                "patterns": [rf"\b({alternatives})\b", rf"\b{words[0]}\b.*\b{words[-1]}\b"],
+                "responses": responses,
+                "priority": rng.randint(0, 10),
+                "tags": words
+            }
+        elif kind < 0.7:
+            patterns[f"phrase_{i}"] = {
+                "patterns": [" ".join(words)],
+                "responses": responses,
+                "priority": rng.randint(0, 10),
+                "tags": sorted(words)
+            }
+        else:
+            # Shaped like HybridChatbot.learn_pattern output
+            patterns[f"learned_{i:08x}"] = {
+                "patterns": [r"\b" + r".*".join(re.escape(w) for w in words) + r"\b"],
+                "responses": responses,
+                "tags": words,
+                "normalized": " ".join(words),
+                "original_query": "what is " + " ".join(words),
+                "priority": 9
+            }
+    return patterns
+
+
+def generate_knowledge(size: int, vocab: List[str], rng: random.Random) -> List[Dict]:
+    """A knowledge_base.json-shaped corpus of short facts with tags"""
+    entries = []
+    for i in range(size):
+        tags = rng.sample(vocab, 2)
+        body = rng.sample(vocab, rng.randint(8, 16))
+        entries.append({
+            "tags": tags,
+            "content": f"Fact {i}: " + " ".join(tags + body) + ".",
+            "sources": []
+        })
+    return entries
+
+
+def generate_queries(patterns: Dict, knowledge: List[Dict], unused_vocab: List[str],
+                     count: int, rng: random.Random) -> Dict[str, List[str]]:
+    """Queries aimed at each tier, keyed by the tier they should reach"""
+    by_kind = {"regex": [], "phrase": [], "learned": []}
+    for name, data in patterns.items():
+        by_kind[name.split("_")[0]].append(data)
+
+    def filler(n: int) -> List[str]:
+        return rng.sample(FILLERS, n)
+
+    def regex_query() -> str:
+        data = rng.choice(by_kind["regex"])
+        words = data["tags"]
+        return " ".join(filler(2) + [words[0]] + filler(1) + [words[-1]])
+
+    def exact_query() -> str:
+        data = rng.choice(by_kind["phrase"])
+        return " ".join(filler(2) + [data["patterns"][0]] + filler(1))
+
+    def typo(word: str) -> str:
+        pos = rng.randrange(len(word))
+        return word[:pos] + rng.choice(VOWELS) + word[pos + 1:]
+
+    queries = {
+        "regex": [regex_query() for _ in range(count)],
+        "exact": [exact_query() for _ in range(count)],
+        "knowledge": [],
+        "tag": [],
+        "fuzzy": [],
+        "math": [],
+        "multi": [],
+        "miss": []
+    }
+
+    for _ in range(count):
+        entry = rng.choice(knowledge)
+        queries["knowledge"].append(rng.choice(entry["tags"]))
+
+        # Reversed tag order misses the learned regex but keeps the tag overlap
+        learned = rng.choice(by_kind["learned"])
+        queries["tag"].append(" ".join(reversed(learned["tags"])) + " " + rng.choice(unused_vocab))
+
+        phrase = rng.choice(by_kind["phrase"])["patterns"][0].split()
+        queries["fuzzy"].append(" ".join(typo(w) if rng.random() < 0.5 else w for w in phrase))
+
+        a, b, c = rng.randint(1, 9999), rng.randint(1, 999), rng.randint(1, 99)
+        op1, op2 = rng.choice(OPERATORS[:4]), rng.choice(OPERATORS)
+        if rng.random() < 0.5:
+            queries["math"].append(f"what is {a} {op1} {b}")
+        else:
+            queries["math"].append(f"({a} {op1} {b}) {op2} {c % 8 + 1}")
+
+        parts = [regex_query(), exact_query(), regex_query()][:rng.randint(2, 3)]
+        queries["multi"].append(". ".join(parts) + "?")
+
+        queries["miss"].append(" ".join(["explain"] + rng.sample(unused_vocab, 3)))
+
+    return queries
@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Add parent directory to path to import local modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ChatbotConfig
+from core.chatbot import HybridChatbot
+from ai.fake_client import FakeGeminiClient
+from benchmarks.corpus import make_vocabulary, generate_patterns, generate_knowledge, generate_queries
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def measure(fn: Callable, inputs: List, budget: float, is_hit: Callable = bool) -> Dict:
+    """Time fn over inputs (stopping once budget seconds are used) and summarize the latencies"""
+    if inputs:
+        fn(inputs[0])  # Warm-up: lazy index builds, regex caches
+
+    latencies = []
+    hits = 0
+    deadline = time.perf_counter() + budget
+    for item in inputs:
+        start = time.perf_counter()
+        result = fn(item)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if is_hit(result):
+            hits += 1
+        if end > deadline:
+            break
+
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "count": len(latencies),
+        "hit_rate": round(hits / len(latencies), 4) if latencies else 0.0,
+        "throughput_per_s": round(len(latencies) / total, 1) if total else 0.0,
+        "mean_ms": round(total / len(latencies) * 1000, 4) if latencies else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4)
+    }
+
+
+def build_chatbot(workdir: str, size: int, seed: int, args) -> Tuple[HybridChatbot, Dict[str, List[str]], float]:
+    """Write synthetic corpora to workdir and build a chatbot over them"""
+    rng = random.Random(seed)
+    vocab = make_vocabulary(max(2000, size // 2), rng)
+    reserved = vocab[:500]  # Never used in the corpora: guaranteed misses
+    corpus_vocab = vocab[500:]
+
+    patterns = generate_patterns(size, corpus_vocab, rng)
+    knowledge = generate_knowledge(size, corpus_vocab, rng)
+    queries = generate_queries(patterns, knowledge, reserved, args.queries, rng)
+
+    patterns_file = os.path.join(workdir, "patterns.json")
+    knowledge_file = os.path.join(workdir, "knowledge_base.json")
+    with open(patterns_file, 'w', encoding='utf-8') as f:
+        json.dump(patterns, f)
+    with open(knowledge_file, 'w', encoding='utf-8') as f:
+        json.dump(knowledge, f)
+
+    config = ChatbotConfig(
+        base_dir=Path(workdir),
+        patterns_file=patterns_file,
+        patterns_journal_file=os.path.join(workdir, "patterns.journal.jsonl"),
+        knowledge_file=knowledge_file,
+        enable_auto_learning=False,
+        enable_response_cache=args.caches,
+        enable_semantic_cache=args.caches,
+        enable_disk_cache=False,
+        save_conversations=False,
+        log_to_file=False,
+        log_level="WARNING"
+    )
+
+    start = time.perf_counter()
+    chatbot = HybridChatbot(config)
+    build_time = time.perf_counter() - start
+    chatbot.gemini_client = FakeGeminiClient(config, args.ai_latency / 1000.0)
+    return chatbot, queries, build_time
+
+
+def run_size(size: int, args) -> Dict:
+    """Benchmark every tier and the full pipeline against corpora of one size"""
+    with tempfile.TemporaryDirectory(prefix="aima_bench_") as workdir:
+        chatbot, queries, build_time = build_chatbot(workdir, size, args.seed, args)
+        try:
+            parser = chatbot.parser
+            matcher = chatbot.pattern_matcher
+            solver = chatbot.math_solver
+
+            def normalized(tier: str) -> List[str]:
+                return [parser.parse(q).normalized_text for q in queries[tier]]
+
+            def solve(query: str):
+                return solver.solve(solver.extract_expression(query) or query)
+
+            mix = [q for tier_queries in queries.values() for q in tier_queries]
+            random.Random(args.seed).shuffle(mix)
+
+            sources: Dict[str, int] = {}
+
+            def respond(query: str):
+                reply = chatbot.respond(query)
+                sources[reply.source or "NONE"] = sources.get(reply.source or "NONE", 0) + 1
+                return reply.source == "LOCAL"
+
+            budget = args.budget
+            tiers = {
+                "parse": measure(parser.parse, mix, budget, is_hit=lambda r: True),
+                "math_solver": measure(solve, queries["math"], budget),
+                "intent_splitter": measure(chatbot.splitter.split, queries["multi"], budget, is_hit=lambda r: len(r) > 1),
+                "regex_exact": measure(matcher.compiled.match, normalized("regex") + normalized("exact"), budget),
+                "search_knowledge": measure(matcher.search_knowledge, normalized("knowledge"), budget),
+                "tag_match": measure(matcher._tag_match, normalized("tag"), budget, is_hit=lambda r: r.matched),
+                "fuzzy_match": measure(matcher._fuzzy_match, normalized("fuzzy"), budget, is_hit=lambda r: r.matched),
+                "pipeline": measure(respond, mix, budget)
+            }
+            tiers["pipeline"]["sources"] = sources
+
+            return {
+                "patterns": len(matcher.patterns),
+                "knowledge_entries": len(matcher.knowledge_base),
+                "build_s": round(build_time, 3),
+                "tiers": tiers
+            }
+        finally:
+            chatbot.shutdown()
+
+
+def print_report(results: Dict):
+    for size, result in results["results"].items():
+        print(f"\n== {size} entries (build {result['build_s']}s) ==")
+        print(f"{'tier':<18}{'count':>7}{'hit%':>7}{'ops/s':>11}{'p50 ms':>10}{'p99 ms':>10}")
+        for tier, stats in result["tiers"].items():
+            print(f"{tier:<18}{stats['count']:>7}{stats['hit_rate'] * 100:>7.1f}{stats['throughput_per_s']:>11.1f}"
+                  f"{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+        print(f"pipeline sources: {result['tiers']['pipeline']['sources']}")
+
+
+def print_comparison(results: Dict, baseline_file: str):
+    """Print per-tier changes against an earlier result file (negative latency change is better)"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n== Compared with {baseline_file} ==")
+    for size, result in results["results"].items():
+        old = baseline.get("results", {}).get(size)
+        if not old:
+            continue
+        for tier, stats in result["tiers"].items():
+            before = old["tiers"].get(tier)
+            if not before:
+                continue
+            changes = []
+            for key in ("p50_ms", "p99_ms", "throughput_per_s"):
+                if before[key]:
+                    changes.append(f"{key} {(stats[key] - before[key]) / before[key] * 100:+.1f}%")
+            print(f"{size:>7} {tier:<18}" + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chatbot tiers and full pipeline on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes (entries)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries generated per tier")
+    parser.add_argument("--budget", type=float, default=10.0, help="Time budget in seconds per tier and size")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="Simulated Gemini latency in ms")
+    parser.add_argument("--caches", action="store_true", help="Enable the response and semantic caches in the pipeline run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Result file (default: logs/benchmark_<timestamp>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "queries": args.queries,
+            "budget_s": args.budget,
+            "ai_latency_ms": args.ai_latency,
+            "caches": args.caches,
+            "seed": args.seed
+        },
+        "results": {}
+    }
+
+    for size in args.sizes:
+        print(f"Benchmarking {size} entries...", file=sys.stderr)
+        results["results"][str(size)] = run_size(size, args)
+
+    output = args.output or os.path.join("logs", f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print_report(results)
+    if args.compare:
+        print_comparison(results, args.compare)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
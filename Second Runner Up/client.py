@@ -0,0 +1,57 @@
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+from typing import Dict, Optional
+
+
+def send(url: str, message: str, session: Optional[str] = None, user: Optional[str] = None) -> Dict:
+    """POST one message to a server.py /chat endpoint and return the JSON reply"""
+    payload = {"message": message}
+    if session:
+        payload["session"] = session
+    if user:
+        payload["user"] = user
+    request = urllib.request.Request(
+        url.rstrip("/") + "/chat",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        # Error replies carry a JSON body too
+        return {"error": json.load(e).get("error", str(e)), "status": e.code}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimal client for server.py: one message per input line")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Server address")
+    parser.add_argument("--user", help="User name (profile) for the session")
+    parser.add_argument("--session", help="Continue an existing session")
+    args = parser.parse_args()
+
+    session = args.session
+    interactive = sys.stdin.isatty()
+    while True:
+        if interactive:
+            print("You: ", end="", flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            break
+        message = line.strip()
+        if not message:
+            continue
+
+        reply = send(args.url, message, session, args.user)
+        if "response" not in reply:
+            print(f"[ERROR {reply.get('status', '')}] {reply['error']}")
+            continue
+        session = reply["session"]
+        print(f"[{reply['source']}] {reply['response']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,16 @@ class ChatbotConfig:
     api_timeout: int = 30
     max_retries: int = 3
     retry_delay: float = 1.0
+    retry_max_delay: float = 8.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    max_concurrent_requests: int = 8
     
     # Local Pattern Matching
     pattern_match_threshold: float = 0.7
     use_fuzzy_matching: bool = True
     fuzzy_match_threshold: int = 80
+    similarity_backend: str = "auto"  # "rapidfuzz" (batch scoring in C++), "fuzzywuzzy", or "auto": rapidfuzz if installed
     case_sensitive: bool = False
     
     # Response Configuration
@@ -25,9 +30,11 @@ class ChatbotConfig:
     response_temperature: float = 0.7
     enable_local_priority: bool = True
     fallback_to_ai: bool = True
+    stream_responses: bool = True
     enable_auto_learning: bool = True
     knowledge_file: str = "local/knowledge_base.json"
     min_knowledge_score: int = 85
+    knowledge_top_k: int = 10
     system_instruction: str = (
         "You are a helpful CLI assistant. Provide direct, concise answers. "
         "Do not use markdown (no bold, italic, code blocks). Eliminate conversational filler. "
@@ -44,6 +51,17 @@ class ChatbotConfig:
     enable_response_cache: bool = True
     cache_ttl_seconds: int = 3600
     cache_max_size: int = 1000
+    match_cache_max_size: int = 5000
+    enable_disk_cache: bool = True
+    disk_cache_file: str = "data/response_cache.db"
+    disk_cache_ttl_seconds: int = 7 * 24 * 3600
+    disk_cache_max_bytes: int = 50 * 1024 * 1024
+    cache_compress_min_bytes: int = 1024
+    cache_sweep_interval: float = 300.0
+    enable_semantic_cache: bool = True
+    semantic_cache_threshold: float = 0.8  # Token Jaccard; one extra word in three (0.67) is a different question
+    semantic_cache_max_size: int = 2000
+    semantic_cache_min_tokens: int = 2
     
     # Input Processing
     min_input_length: int = 1
@@ -52,18 +70,44 @@ class ChatbotConfig:
     remove_special_chars: bool = False
     convert_to_lowercase: bool = True
     
+    # Math Solver Limits
+    math_max_bits: int = 4096  # Largest integer result calculated locally
+    math_max_work: int = 1_000_000  # 64-bit word operations per expression
+    math_time_budget: float = 0.05  # Seconds per expression
+    math_ast_cache_size: int = 256
+    
     # Logging
     log_level: str = "INFO"
     log_to_file: bool = True
     log_file_path: str = "logs/chatbot.log"
+    log_json_file: Optional[str] = None  # e.g. "logs/chatbot.jsonl": structured JSON-lines sink
+    log_json_max_bytes: int = 10 * 1024 * 1024  # Rotated past this size
+    log_json_backups: int = 3
+    log_debug_sample_every: int = 1  # Keep 1 of every N DEBUG records per message
+    enable_latency_metrics: bool = True
+    metrics_dump_interval: float = 0.0  # Seconds between snapshots appended to metrics_file; 0 disables
+    metrics_file: str = "logs/latency_metrics.jsonl"
     log_conversations: bool = True
     
     # Data Persistence
     save_conversations: bool = True
-    conversation_file: str = "data/conversation_history.json"
+    conversation_file: str = "data/conversation_history.jsonl"
+    history_flush_interval: float = 1.0
+    history_compact_threshold: int = 1000
     save_user_preferences: bool = True
+    profile_db_file: str = "data/users/profiles.db"  # Under base_dir; holds every user's profile
+    profile_flush_interval: float = 1.0
     preferences_file: str = "data/user_preferences.json"
     
+    # Server Mode (server.py)
+    server_host: str = "127.0.0.1"
+    server_port: int = 8765
+    server_max_in_flight: int = 64  # Chat requests beyond this are refused with 503 + Retry-After
+    server_max_sessions: int = 1000  # Least recently used idle sessions are closed beyond this
+    server_session_ttl: float = 1800.0  # Seconds a session may sit idle
+    server_max_body_bytes: int = 64 * 1024
+    server_idle_timeout: float = 60.0  # Seconds a keep-alive connection may wait for a request
+    
     # UI/UX
     show_response_source: bool = True
     show_typing_indicator: bool = True
@@ -75,6 +119,8 @@ class ChatbotConfig:
     # Security
     rate_limit_enabled: bool = True
     max_requests_per_minute: int = 60
+    rate_limit_burst: int = 10
+    rate_limit_max_wait: float = 10.0
     block_inappropriate_content: bool = True
     sanitize_input: bool = True
     
@@ -93,6 +139,9 @@ class ChatbotConfig:
     # Paths
     base_dir: Path = field(default_factory=lambda: Path(__file__).parent)
     patterns_file: str = "local/patterns.json"
+    patterns_journal_file: str = "local/patterns.journal.jsonl"
+    patterns_compact_threshold: int = 200
+    patterns_reload_interval: float = 2.0  # Seconds between checks of patterns_file/knowledge_file for edits; 0 disables
     
     def validate(self) -> bool:
         """Validate configuration parameters"""
@@ -100,4 +149,7 @@ class ChatbotConfig:
         assert 0 <= self.response_temperature <= 2, "Temperature must be 0-2"
         assert self.max_history_length > 0, "History length must be positive"
         assert self.cache_ttl_seconds > 0, "Cache TTL must be positive"
+        assert 0 < self.semantic_cache_threshold <= 1, "Semantic cache threshold must be 0-1"
+        assert self.max_retries >= 0, "Retries must be non-negative"
+        assert self.math_max_bits > 0 and self.math_time_budget > 0, "Math limits must be positive"
         return True
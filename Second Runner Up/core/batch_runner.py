@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import dataclasses
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import ChatbotConfig
+from core.chatbot import HybridChatbot, Reply
+from core.input_parser import ParsedInput
+from local.pattern_matcher import MatchResult
+
+
+@dataclass
+class BatchQuery:
+    """One input line: a query and the id it is reported under"""
+    id: object
+    query: str
+
+
+def read_queries(lines: Iterable[str]) -> List[BatchQuery]:
+    """Parse plain-text lines or JSONL objects with a "query" (or "text") field and optional "id\""""
+    queries = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            if isinstance(record, dict):
+                text = record.get("query", record.get("text"))
+                if text is None:
+                    logging.getLogger('AmmaarBhaiChatBot').warning("Line %d: no query field, skipped", line_no)
+                    continue
+                queries.append(BatchQuery(record.get("id", line_no), str(text)))
+                continue
+
+        queries.append(BatchQuery(line_no, line))
+    return queries
+
+
+# Per-process chatbot used by the local-tier workers
+_worker_bot: Optional[HybridChatbot] = None
+
+# A query's local-tier outcome: (reply, parsed input, below-threshold match, seconds).
+# reply is None when the query goes on to the AI stage with the parsed input and match.
+LocalResult = Tuple[Optional[Reply], Optional[ParsedInput], Optional[MatchResult], float]
+
+
+def _init_worker(config: ChatbotConfig):
+    global _worker_bot
+    _worker_bot = HybridChatbot(config)
+    # Pool workers skip atexit handlers but run multiprocessing finalizers on exit
+    Finalize(None, _worker_bot.shutdown, exitpriority=10)
+
+
+def _answer_in_worker(queries: List[str]) -> Tuple[List[LocalResult], Dict[str, int]]:
+    """Answer a chunk locally, returning the results and the counters they moved"""
+    before = dict(_worker_bot.stats)
+    results = _answer_locally(_worker_bot, queries)
+    return results, {key: value - before.get(key, 0) for key, value in _worker_bot.stats.items()}
+
+
+def _answer_locally(bot: HybridChatbot, queries: List[str]) -> List[LocalResult]:
+    """Run the local tiers on each query; misses keep what the AI stage needs"""
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        try:
+            reply, parsed, match = bot._answer_from_local_tiers(query)
+        except Exception as e:
+            reply, parsed, match = bot._handle_error(e), None, None
+        results.append((reply, parsed, match, time.perf_counter() - start))
+    return results
+
+
+class BatchRunner:
+    """Answers a list of queries: local tiers on a process pool, AI fallbacks concurrently.
+
+    Workers hold a local-only copy of the chatbot (no Gemini, response
+    cache, history or learning) and send back each miss's parsed input and
+    best local match. The main chatbot then goes straight to its AI stage
+    (context-keyed caches, then Gemini), where the Gemini client's token
+    bucket and concurrency limit pace the API calls.
+    """
+
+    def __init__(self, chatbot: HybridChatbot, workers: Optional[int] = None, chunk_size: int = 64):
+        self.chatbot = chatbot
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def run(self, queries: List[BatchQuery]) -> List[Dict]:
+        """Answer every query, returning result records in input order"""
+        texts = [q.query for q in queries]
+        self.chatbot.stats['total_queries'] += len(texts)
+        local = self._run_local(texts)
+
+        results = [(reply, latency) for reply, _, _, latency in local]
+        pending = [i for i, (reply, _, _, _) in enumerate(local) if reply is None]
+        if pending:
+            answered = asyncio.run(self._run_ai_stage([(texts[i],) + local[i][1:] for i in pending]))
+            for i, result in zip(pending, answered):
+                results[i] = result
+
+        return [self._record(q, reply, latency) for q, (reply, latency) in zip(queries, results)]
+
+    def _run_local(self, texts: List[str]) -> List[LocalResult]:
+        if self.workers <= 1 or len(texts) <= self.chunk_size:
+            return _answer_locally(self.chatbot, texts)
+
+        worker_config = dataclasses.replace(
+            self.chatbot.config,
+            enable_response_cache=False,  # Report the tier that actually answered
+            enable_disk_cache=False,
+            save_conversations=False,
+            enable_auto_learning=False,
+            log_to_file=False,
+            log_level="WARNING"
+        )
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(worker_config,)) as executor:
+            for chunk_results, counted in executor.map(_answer_in_worker, chunks):
+                results.extend(chunk_results)
+                for key, delta in counted.items():
+                    self.chatbot.stats[key] = self.chatbot.stats.get(key, 0) + delta
+        return results
+
+    async def _run_ai_stage(self, misses: List[Tuple[str, ParsedInput, Optional[MatchResult], float]]) -> List[Tuple[Reply, float]]:
+        loop = asyncio.get_running_loop()
+
+        async def answer(text: str, parsed: ParsedInput, match: Optional[MatchResult], local_latency: float) -> Tuple[Reply, float]:
+            start = time.perf_counter()
+            try:
+                reply, request = await loop.run_in_executor(None, self.chatbot._prepare_ai_request, text, parsed, match)
+                if request is not None:
+                    reply = await self.chatbot._aanswer_with_ai(request)
+            except Exception as e:
+                reply = self.chatbot._handle_error(e)
+            return reply, local_latency + time.perf_counter() - start
+
+        try:
+            return await asyncio.gather(*(answer(*miss) for miss in misses))
+        finally:
+            await self.chatbot.gemini_client.aclose()
+
+    @staticmethod
+    def _record(query: BatchQuery, reply: Reply, latency: float) -> Dict:
+        return {
+            "id": query.id,
+            "query": query.query,
+            "response": reply.text,
+            "source": reply.source or "NONE",
+            "match_type": reply.match_type,
+            "confidence": round(reply.confidence, 4) if reply.confidence is not None else None,
+            "latency_ms": round(latency * 1000, 3),
+            "error": reply.error
+        }
@@ -0,0 +1,303 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+
+from core.chatbot import HybridChatbot
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    503: "Service Unavailable"
+}
+MAX_HEADERS = 100
+
+
+class RequestError(Exception):
+    """A request the server refuses, with the HTTP status to answer"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Session:
+    """One client conversation; its requests are answered in order"""
+    id: str
+    bot: HybridChatbot
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    active: int = 0  # Requests waiting for or holding the lock
+    guest: bool = False  # Anonymous: the profile is dropped from memory when the session ends
+
+
+class ChatServer:
+    """Multi-session HTTP/1.1 front end for one shared HybridChatbot.
+
+    Sessions are created with HybridChatbot.create_session, so they share
+    the pattern matcher, knowledge index, caches and Gemini client while
+    keeping their own history and user profile. Sessions never learn
+    patterns, so the shared matcher is only read. Requests are handled on
+    one asyncio event loop; the blocking steps (local tiers, disk cache and
+    profile I/O via HybridChatbot.arespond, and reading a new session's
+    profile) run on the default executor, and Gemini calls wait on the
+    client's concurrency limit. Beyond `server_max_in_flight` open chat
+    requests, new ones are refused with 503 and Retry-After rather than
+    queued.
+
+    Endpoints:
+        POST /chat             {"message": "...", "session": "<id>", "user": "<name>"} (session and user optional)
+        DELETE /sessions/<id>  end a session
+        GET /health, GET /stats
+    """
+
+    def __init__(self, chatbot: HybridChatbot):
+        self.chatbot = chatbot
+        self.config = chatbot.config
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # Least recently used first
+        self.in_flight = 0
+        self.rejected = 0
+        self.logger = logging.getLogger('AmmaarBhaiChatBot')
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Listen on a TCP address (config defaults) or a Unix socket"""
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection,
+                host or self.config.server_host,
+                self.config.server_port if port is None else port
+            )
+        return self._server
+
+    async def close(self, timeout: float = 30.0):
+        """Stop accepting connections, let open requests finish and end every session"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        # Drop idle keep-alive connections
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+        self.sessions.clear()
+        await self.chatbot.gemini_client.aclose()
+
+    def get_statistics(self) -> Dict:
+        return {
+            **self.chatbot.get_statistics(),
+            'sessions': len(self.sessions),
+            'in_flight': self.in_flight,
+            'rejected': self.rejected
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader, writer)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except RequestError as e:
+            # Malformed or oversized request: answer and drop the connection
+            await self._write_response(writer, e.status, {'error': str(e)}, False)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            self.logger.error("Server connection error: %s", e, exc_info=True)
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _read_request(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> Optional[Tuple[str, str, bytes, bool]]:
+        """Read one request: (method, path, body, keep-alive), or None once the client is done"""
+        line = await asyncio.wait_for(reader.readline(), self.config.server_idle_timeout)
+        if not line.strip():
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise RequestError(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.config.server_idle_timeout)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise RequestError(400, "too many headers")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise RequestError(400, "invalid Content-Length")
+        if length > self.config.server_max_body_bytes:
+            raise RequestError(413, f"body over {self.config.server_max_body_bytes} bytes")
+
+        if length and headers.get('expect', '').lower() == '100-continue':
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        body = await reader.readexactly(length) if length else b''
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        return method.upper(), target.split('?', 1)[0], body, keep_alive
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool):
+        body = json.dumps(payload).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if path == "/chat":
+            if method != "POST":
+                raise RequestError(405, "use POST")
+            return await self._chat(body)
+
+        if path.startswith("/sessions/"):
+            if method != "DELETE":
+                raise RequestError(405, "use DELETE")
+            session = self.sessions.get(path[len("/sessions/"):])
+            if session is None:
+                raise RequestError(404, "unknown session")
+            self._end_session(session)
+            return 200, {'deleted': session.id}
+
+        if method == "GET" and path == "/health":
+            return 200, {'status': 'ok', 'sessions': len(self.sessions), 'in_flight': self.in_flight}
+        if method == "GET" and path == "/stats":
+            return 200, self.get_statistics()
+        raise RequestError(404, "not found")
+
+    async def _chat(self, body: bytes) -> Tuple[int, Dict]:
+        try:
+            request = json.loads(body.decode('utf-8') or "{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise RequestError(400, "body must be JSON")
+        if not isinstance(request, dict) or not isinstance(request.get("message"), str):
+            raise RequestError(400, "a string \"message\" is required")
+        session_id, user = request.get("session"), request.get("user")
+        if not isinstance(session_id, (str, type(None))) or not isinstance(user, (str, type(None))):
+            raise RequestError(400, "\"session\" and \"user\" must be strings")
+
+        # Backpressure: refuse instead of queueing without bound
+        if self.in_flight >= self.config.server_max_in_flight:
+            self.rejected += 1
+            raise RequestError(503, "server busy, retry shortly")
+
+        self.in_flight += 1
+        try:
+            session = await self._get_session(session_id, user)
+            session.active += 1
+            try:
+                async with session.lock:
+                    reply = await session.bot.arespond(request["message"])
+            finally:
+                session.active -= 1
+                session.last_used = time.monotonic()
+        finally:
+            self.in_flight -= 1
+
+        return 200, {
+            'session': session.id,
+            'user': session.bot.user_manager.username,
+            'response': reply.text,
+            'source': reply.source or "NONE",
+            'match_type': reply.match_type,
+            'confidence': round(reply.confidence, 4) if reply.confidence is not None else None,
+            'error': reply.error
+        }
+
+    async def _get_session(self, session_id: Optional[str], user: Optional[str]) -> Session:
+        """Find or create a session, closing idle ones past their TTL or over the session limit"""
+        self._expire_sessions()
+
+        if session_id is not None:
+            session = self._find_session(session_id, user)
+            if session is not None:
+                return session
+        else:
+            session_id = uuid.uuid4().hex
+
+        # Anonymous sessions get a profile of their own rather than sharing one
+        username = user or f"guest-{session_id[:8]}"
+        # Loading the profile reads SQLite; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        bot = await loop.run_in_executor(None, self.chatbot.create_session, username, not user)
+
+        # Another request may have opened the same session meanwhile
+        session = self._find_session(session_id, user)
+        if session is not None:
+            return session
+
+        if len(self.sessions) >= self.config.server_max_sessions:
+            idle = next((s for s in self.sessions.values() if not s.active), None)
+            if idle is None:
+                self.rejected += 1
+                raise RequestError(503, "too many sessions")
+            self._end_session(idle)
+
+        session = Session(session_id, bot, guest=not user)
+        self.sessions[session_id] = session
+        self.logger.info("Session %s started for %s", session_id, username)
+        return session
+
+    def _find_session(self, session_id: str, user: Optional[str]) -> Optional[Session]:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            if user and user != session.bot.user_manager.username:
+                raise RequestError(409, "session belongs to another user")
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def _end_session(self, session: Session):
+        del self.sessions[session.id]
+        if session.guest:
+            # A guest profile belongs to this session alone and was never written to disk
+            self.chatbot.profile_store.unload(session.bot.user_manager.username)
+
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.config.server_session_ttl
+        for session in list(self.sessions.values()):
+            if session.last_used >= cutoff:
+                break  # Sessions are ordered by last use
+            if not session.active:
+                self._end_session(session)
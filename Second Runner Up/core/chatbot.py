@@ -1,16 +1,47 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Iterator, AsyncIterator
+import os
+import copy
 import time
+import asyncio
+import dataclasses
+from dataclasses import dataclass
 from datetime import datetime
 
 from config import ChatbotConfig
 from core.input_parser import InputParser, ParsedInput
 from core.intent_splitter import IntentSplitter
 from core.user_manager import UserManager
-from local.pattern_matcher import PatternMatcher
-from ai.gemini_client import GeminiClient
+from local.pattern_matcher import PatternMatcher, MatchResult
+from local.pattern_index import SegmentScan
+from ai.gemini_client import GeminiClient, AIResponse
 from utils.logger import ChatbotLogger
-from utils.cache import ResponseCache
+from utils.cache import ResponseCache, SemanticCache
+from utils.history_log import HistoryLog
+from utils.profile_store import ProfileStore
 from utils.math_solver import MathSolver
+from utils.metrics import LatencyMetrics
+
+
+@dataclass
+class AIRequest:
+    """A query that missed every local tier and goes to Gemini"""
+    user_input: str
+    parsed: ParsedInput
+    context: Optional[List[str]]
+    cache_key: str
+    query_tokens: List[str]
+    fingerprint: str  # Of the context (and profile note) the answer is given in
+    local_match: Optional[MatchResult] = None  # Below-threshold match to fall back on
+
+
+@dataclass
+class Reply:
+    """An answer and the tier that produced it (source None means no prefix)"""
+    text: str
+    source: Optional[str]
+    match_type: str = ""
+    confidence: Optional[float] = None
+    error: Optional[str] = None
 
 
 class HybridChatbot:
@@ -20,24 +51,40 @@ class HybridChatbot:
         self.config = config
         self.parser = InputParser(config)
         self.splitter = IntentSplitter()
-        self.user_manager = UserManager(config.base_dir, user_override)
-        self.math_solver = MathSolver()
+        self.profile_store = ProfileStore(str(config.base_dir / config.profile_db_file), config.profile_flush_interval)
+        self.user_manager = UserManager(config.base_dir, user_override, self.profile_store)
+        self.math_solver = MathSolver(
+            config.math_max_bits,
+            config.math_max_work,
+            config.math_time_budget,
+            config.math_ast_cache_size
+        )
+        self.metrics = LatencyMetrics(config.enable_latency_metrics)
         self.pattern_matcher = PatternMatcher(
             config,
             config.patterns_file,
-            parser=self.parser
+            parser=self.parser,
+            metrics=self.metrics
         )
         self.gemini_client = GeminiClient(config)
         self.logger = ChatbotLogger(config)
         self.cache = ResponseCache(config)
+        self.semantic_cache = SemanticCache(config)
         
         self.conversation_history = []
+        self.history_log = HistoryLog(
+            config.conversation_file,
+            keep=config.max_history_length,
+            flush_interval=config.history_flush_interval,
+            compact_threshold=config.history_compact_threshold
+        )
         self.session_start = datetime.now()
         self.stats = {
             'total_queries': 0,
             'local_responses': 0,
             'ai_responses': 0,
             'cache_hits': 0,
+            'ai_errors': 0,
             'errors': 0
         }
     
@@ -49,7 +96,7 @@ class HybridChatbot:
         try:
             self.config.validate()
         except AssertionError as e:
-            self.logger.error(f"Config validation failed: {e}")
+            self.logger.error("Config validation failed: %s", e)
             return False
         
         # Initialize Gemini if API key provided
@@ -62,224 +109,437 @@ class HybridChatbot:
                     return False
         
         # Load conversation history
-        if self.config.save_conversations and not self.config.clear_history_on_restart:
-            self._load_history()
-            
-        self.logger.info(f"Chatbot initialized for user: {self.user_manager.username}")
+        if self.config.save_conversations:
+            if self.config.clear_history_on_restart:
+                self.history_log.clear()
+            else:
+                self._load_history()
+            self.history_log.start()
+        
+        # Periodic latency snapshots for offline analysis
+        self.metrics.start_dumps(self.config.metrics_file, self.config.metrics_dump_interval)
+        
+        # Pick up edits to patterns.json and the knowledge base without a restart
+        self.pattern_matcher.start_watching(self.config.patterns_reload_interval, self._on_patterns_reloaded)
+        
+        self.logger.info("Chatbot initialized for user: %s", self.user_manager.username)
         return True
     
     def process_input(self, user_input: str) -> str:
         """Process user input and generate response"""
+        return self._format_reply(self.respond(user_input))
+    
+    async def aprocess_input(self, user_input: str) -> str:
+        """Async counterpart of process_input"""
+        return self._format_reply(await self.arespond(user_input))
+    
+    def respond(self, user_input: str) -> Reply:
+        """Like process_input, but returns the unformatted Reply with its source tier"""
         self.stats['total_queries'] += 1
-        start_time = time.time()
         
-        try:
-            # Validate input
-            is_valid, message = self.parser.validate_input(user_input)
-            if not is_valid:
-                self.logger.warning(f"Invalid input: {message}")
-                return f"Invalid input: {message}"
+        with self.metrics.time("total"):
+            try:
+                answer, request = self._answer_without_ai(user_input)
+                if request is None:
+                    return answer
+                
+                with self.metrics.time("gemini"):
+                    response = self.gemini_client.generate_response(
+                        user_input,
+                        context=request.context
+                    )
+                return self._complete_ai_response(request, response)
+            
+            except Exception as e:
+                return self._handle_error(e)
+    
+    async def arespond(self, user_input: str) -> Reply:
+        """Async counterpart of respond.
+        
+        The local tiers and the cache, history and profile I/O around the AI
+        call run on the default executor; only the AI call itself is awaited
+        on the event loop.
+        """
+        self.stats['total_queries'] += 1
+        loop = asyncio.get_running_loop()
+        
+        with self.metrics.time("total"):
+            try:
+                answer, request = await loop.run_in_executor(None, self._answer_without_ai, user_input)
+                if request is None:
+                    return answer
+                return await self._aanswer_with_ai(request)
+            
+            except Exception as e:
+                return self._handle_error(e)
+    
+    async def _aanswer_with_ai(self, request: AIRequest) -> Reply:
+        """Await Gemini's answer to request, then cache, learn from and log it on the default executor"""
+        with self.metrics.time("gemini"):
+            response = await self.gemini_client.agenerate_response(
+                request.user_input,
+                context=request.context
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._complete_ai_response, request, response)
+    
+    def process_input_stream(self, user_input: str) -> Iterator[str]:
+        """Streaming counterpart of process_input.
+        
+        Local answers arrive as one chunk; a Gemini answer is yielded piece by
+        piece as it is generated (the first piece carries the source prefix)
+        and cached, learned and logged once complete.
+        """
+        self.stats['total_queries'] += 1
+        
+        with self.metrics.time("total"):
+            try:
+                answer, request = self._answer_without_ai(user_input)
+                if request is None:
+                    yield self._format_reply(answer)
+                    return
+                
+                streamed = False
+                start = time.perf_counter()
+                for item in self.gemini_client.stream_response(user_input, context=request.context):
+                    if isinstance(item, AIResponse):
+                        self.metrics.record("gemini", time.perf_counter() - start)
+                        tail = self._complete_stream(request, item, streamed)
+                        if tail:
+                            yield tail
+                    elif not streamed:
+                        streamed = True
+                        self.metrics.record("gemini.first_chunk", time.perf_counter() - start)
+                        yield self._format_response(item, "GEMINI")
+                    else:
+                        yield item
             
-            # Parse input
+            except Exception as e:
+                yield self._format_reply(self._handle_error(e))
+    
+    async def aprocess_input_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Async counterpart of process_input_stream (blocking steps run on the default executor, as in arespond)"""
+        self.stats['total_queries'] += 1
+        loop = asyncio.get_running_loop()
+        
+        with self.metrics.time("total"):
+            try:
+                answer, request = await loop.run_in_executor(None, self._answer_without_ai, user_input)
+                if request is None:
+                    yield self._format_reply(answer)
+                    return
+                
+                streamed = False
+                start = time.perf_counter()
+                async for item in self.gemini_client.astream_response(user_input, context=request.context):
+                    if isinstance(item, AIResponse):
+                        self.metrics.record("gemini", time.perf_counter() - start)
+                        tail = await loop.run_in_executor(None, self._complete_stream, request, item, streamed)
+                        if tail:
+                            yield tail
+                    elif not streamed:
+                        streamed = True
+                        self.metrics.record("gemini.first_chunk", time.perf_counter() - start)
+                        yield self._format_response(item, "GEMINI")
+                    else:
+                        yield item
+            
+            except Exception as e:
+                yield self._format_reply(self._handle_error(e))
+    
+    def _answer_without_ai(self, user_input: str) -> Tuple[Optional[Reply], Optional[AIRequest]]:
+        """Run validation, caches, math and local tiers.
+        
+        Returns (reply, None) when answered without the AI, or (None, request)
+        when the query should go to Gemini.
+        """
+        reply, parsed, match_result = self._answer_from_local_tiers(user_input)
+        if reply is not None:
+            return reply, None
+        return self._prepare_ai_request(user_input, parsed, match_result)
+    
+    def _answer_from_local_tiers(self, user_input: str) -> Tuple[Optional[Reply], Optional[ParsedInput], Optional[MatchResult]]:
+        """Run validation, the response cache, math and local tiers.
+        
+        Returns (reply, None, None) when one of them answers, else (None,
+        parsed input, best below-threshold match or None) for
+        _prepare_ai_request.
+        """
+        # Validate input
+        is_valid, message = self.parser.validate_input(user_input)
+        if not is_valid:
+            self.logger.warning("Invalid input: %s", message)
+            return Reply(f"Invalid input: {message}", None, "invalid"), None, None
+        
+        # Parse input
+        with self.metrics.time("parse"):
             parsed = self.parser.parse(user_input)
-            self.logger.debug(f"Parsed input: {parsed.normalized_text}")
+        self.logger.debug("Parsed input: %s", parsed.normalized_text)
+        
+        # Check cache
+        if self.config.enable_response_cache:
+            with self.metrics.time("response_cache"):
+                cached = self.cache.get(parsed.cache_key)
+            if cached:
+                self.stats['cache_hits'] += 1
+                self.logger.debug("Cache hit")
+                return Reply(cached, "CACHED"), None, None
+        
+        # Check if input is a math expression and solve it
+        with self.metrics.time("math"):
+            expression_to_solve = self._find_math_expression(user_input)
+            result = self.math_solver.solve(expression_to_solve) if expression_to_solve else None
+        
+        if result:
+            value, formatted = result
+            if value is None:
+                response = f"{expression_to_solve} is {formatted}"
+            else:
+                response = f"{expression_to_solve} = {formatted}"
             
-            # Check cache
+            # Cache math result (in memory only)
             if self.config.enable_response_cache:
-                cached = self.cache.get(parsed.normalized_text)
-                if cached:
-                    self.stats['cache_hits'] += 1
-                    self.logger.debug("Cache hit")
-                    return self._format_response(cached, "CACHED")
+                self.cache.set(parsed.cache_key, response)
             
-            # Check if input is a math expression (try extraction first, then direct)
-            expression_to_solve = None
+            # Add to history
+            self._add_to_history(user_input, response, "MATH")
+            self.stats['local_responses'] += 1
             
-            # First, try to extract expression from natural language
-            extracted = self.math_solver.extract_expression(user_input)
-            if extracted:
-                expression_to_solve = extracted
-            # If no extraction, check if the entire input is a direct math expression
-            elif self.math_solver.is_math_expression(user_input):
-                expression_to_solve = user_input
+            self.logger.info("Math calculation: %s", response)
+            return Reply(response, "MATH", confidence=1.0), None, None
+        
+        # Try local pattern matching first (Standard)
+        match_result = None
+        if self.config.enable_local_priority:
+            # 1. Try Multi-Intent Split first
+            # Check if we can answer ALL segments locally.
+            with self.metrics.time("multi_intent"):
+                scan = self._scan_segments(user_input, parsed)
+                multi = self._match_segments(scan) if scan else None
             
-            # If we have an expression, solve it
-            if expression_to_solve:
-                result = self.math_solver.solve(expression_to_solve)
-                if result:
-                    value, formatted = result
-                    response = f"{expression_to_solve} = {formatted}"
-                    
-                    # Cache math result
-                    if self.config.enable_response_cache:
-                        self.cache.set(parsed.normalized_text, response)
-                    
-                    # Add to history
-                    self._add_to_history(user_input, response, "MATH")
-                    self.stats['local_responses'] += 1
-                    
-                    self.logger.info(f"Math calculation: {response}")
-                    return self._format_response(response, "MATH")
+            if multi:
+                final_response, confidence = multi
+                self.stats['local_responses'] += 1
+                self._add_to_history(user_input, final_response, "LOCAL")
+                self.logger.info("Multi-intent local match: %d segments", len(scan))
+                return Reply(final_response, "LOCAL", "multi", confidence), None, None
             
-            # Try local pattern matching first (Standard)
-            if self.config.enable_local_priority:
-                # 1. Try Multi-Intent Split first
-                # Check if we can answer ALL segments locally.
-                segments = self.splitter.split(user_input)
-                if len(segments) > 1:
-                    combined_responses = []
-                    all_segments_matched = True
-                    
-                    for seg in segments:
-                        # We need to parse each segment individually for the matcher
-                        seg_parsed = self.parser.parse(seg)
-                        match_result = self.pattern_matcher.match(seg_parsed)
-                        
-                        if match_result.matched and match_result.confidence >= self.config.pattern_match_threshold:
-                            combined_responses.append(match_result.response)
-                        else:
-                            all_segments_matched = False
-                            break
-                    
-                    if all_segments_matched and combined_responses:
-                        final_response = " ".join(combined_responses)
-                        self.stats['local_responses'] += 1
-                        self._add_to_history(user_input, final_response, "LOCAL")
-                        self.logger.info(f"Multi-intent local match: {len(segments)} segments")
-                        return self._format_response(final_response, "LOCAL", "multi")
-
-                # 2. Try Standard Full Match
-                match_result = self.pattern_matcher.match(parsed)
-                
-                if match_result.matched and match_result.confidence >= self.config.pattern_match_threshold:
-                    self.stats['local_responses'] += 1
-                    response = match_result.response
-                    
-                    # Cache response (local responses are safe to cache)
-                    if self.config.enable_response_cache:
-                        self.cache.set(parsed.normalized_text, response)
-                    
-                    # Log conversation
-                    self._add_to_history(user_input, response, "LOCAL")
-                    
-                    self.logger.info(f"Local match: {match_result.pattern_name} (confidence: {match_result.confidence:.2f})")
-                    return self._format_response(response, "LOCAL", match_result.match_type)
+            # 2. Try Standard Full Match (reusing the segment scan's literal hits)
+            with self.metrics.time("match"):
+                match_result = self.pattern_matcher.match(parsed, scan)
             
-            # Fallback to AI
-            if self.config.fallback_to_ai and self.gemini_client.initialized:
-                self.stats['ai_responses'] += 1
+            if match_result.matched and match_result.confidence >= self.config.pattern_match_threshold:
+                self.stats['local_responses'] += 1
+                response = match_result.response
                 
-                # Get context if enabled
-                context = None
-                if self.config.enable_context:
-                    context = self._get_context()
-                    
-                # Inject User Profile Context
-                user_context = self.user_manager.get_context_string()
-                if user_context:
-                    # We can prepend this to the prompt or the system instruction. 
-                    # Prepending to system instruction via prompt is cleaner if client supports it,
-                    # but here we pass context as list. Let's prepend to the prompt input for now.
-                    # Or better: Add it to the context list as a system note.
-                    if context is None:
-                        context = []
-                    context.append(f"System Note: {user_context}")
-
-                response = self.gemini_client.generate_response(
-                    user_input,
-                    context=context
-                )
+                # Not put in the response cache: the match cache already holds the
+                # pattern id, and a response variant is picked on every hit
                 
-                # Cache response (only if not an error)
-                if self.config.enable_response_cache:
-                    # Don't cache error responses
-                    error_keywords = [
-                        "error", "sorry", "unable", "cannot", "failed", "404", "503",
-                        "api limit", "server busy", "config error", "quota", "resource exhausted"
-                    ]
-                    is_error = any(k in response.lower() for k in error_keywords)
-                    if not is_error:
-                        self.cache.set(parsed.normalized_text, response)
-                
-                # Auto Learning
-                if self.config.enable_auto_learning:
-                    # Basic validation to avoid learning errors
-                    error_keywords = [
-                        "error", "sorry", "unable", "cannot", "failed", "404", "503",
-                        "api limit", "server busy", "config error", "quota"
-                    ]
-                    is_error = any(k in response.lower() for k in error_keywords)
-                    
-                    if not is_error and len(response) > 5:
-                         # normalize pattern for storage
-                         self.learn_pattern(user_input, response)
-                         self.logger.info("Auto-learned new pattern")
-
-                # Simple User Fact Extraction (Basic Logic)
-                import re
-                # "My name is X"
-                name_match = re.search(r"my name is\s+([a-zA-Z]+)", user_input, re.IGNORECASE)
-                if name_match:
-                    name = name_match.group(1)
-                    self.user_manager.set_fact("name", name)
-                    self.logger.info(f"Learned user name: {name}")
-
                 # Log conversation
-                self._add_to_history(user_input, response, "GEMINI")
+                self._add_to_history(user_input, response, "LOCAL")
                 
-                self.logger.info("AI response generated")
-                return self._format_response(response, "GEMINI")
+                self.logger.info("Local match: %s (confidence: %.2f)", match_result.pattern_name, match_result.confidence)
+                return Reply(response, "LOCAL", match_result.match_type, match_result.confidence), None, None
+        
+        return None, parsed, match_result
+    
+    def _prepare_ai_request(self, user_input: str, parsed: ParsedInput,
+                            match_result: Optional[MatchResult]) -> Tuple[Optional[Reply], Optional[AIRequest]]:
+        """Answer from the context-keyed and semantic caches, or build the request for Gemini"""
+        # Fallback to AI
+        if self.config.fallback_to_ai and self.gemini_client.initialized:
+            # Get context if enabled
+            context = None
+            if self.config.enable_context:
+                context = self._get_context()
+            
+            # Inject User Profile Context
+            user_context = self.user_manager.get_context_string()
+            if user_context:
+                # We can prepend this to the prompt or the system instruction. 
+                # Prepending to system instruction via prompt is cleaner if client supports it,
+                # but here we pass context as list. Let's prepend to the prompt input for now.
+                # Or better: Add it to the context list as a system note.
+                if context is None:
+                    context = []
+                context.append(f"System Note: {user_context}")
             
-            # No response available
-            return self.config.default_error_response
+            # AI answers are cached per context window and user profile, never under the bare text
+            fingerprint = self.cache.fingerprint(context)
+            ai_cache_key = self.cache.make_key(parsed.cache_key, context)
+            if self.config.enable_response_cache:
+                with self.metrics.time("response_cache"):
+                    cached = self.cache.get(ai_cache_key)
+                if cached:
+                    self.stats['cache_hits'] += 1
+                    self.logger.debug("Context cache hit")
+                    return Reply(cached, "CACHED"), None
+            
+            # Paraphrases of questions previously answered in the same context
+            query_tokens = parsed.pattern_tokens
+            if self.config.enable_semantic_cache:
+                with self.metrics.time("semantic_cache"):
+                    cached = self.semantic_cache.get(query_tokens, fingerprint)
+                if cached:
+                    self.stats['cache_hits'] += 1
+                    self.logger.debug("Semantic cache hit")
+                    return Reply(cached, "CACHED", "semantic"), None
+            
+            return None, AIRequest(user_input, parsed, context, ai_cache_key, query_tokens, fingerprint, match_result)
         
-        except Exception as e:
-            self.stats['errors'] += 1
-            self.logger.error(f"Error processing input: {e}", exc_info=True)
+        # No response available
+        return Reply(self.config.default_error_response, None, "none"), None
+    
+    def _find_math_expression(self, user_input: str) -> Optional[str]:
+        """Extract an expression from natural language, or take the whole input if it is one"""
+        # First, try to extract expression from natural language
+        extracted = self.math_solver.extract_expression(user_input)
+        if extracted:
+            return extracted
+        # If no extraction, check if the entire input is a direct math expression
+        if self.math_solver.is_math_expression(user_input):
+            return user_input
+        return None
+    
+    def _scan_segments(self, user_input: str, parsed: ParsedInput) -> Optional[SegmentScan]:
+        """Split the normalized input into segments and scan it once, or None for a single intent"""
+        if not self.config.remove_special_chars:
+            text = parsed.normalized_text
+            spans = self.splitter.spans(text)
+        else:
+            # Normalization drops the delimiters, so rebuild the text from normalized segments
+            segments = [self.parser.parse(seg).normalized_text for seg in self.splitter.split(user_input)]
+            text = " ".join(segments)
+            spans = []
+            pos = 0
+            for seg in segments:
+                spans.append((pos, pos + len(seg)))
+                pos += len(seg) + 1
+        
+        if len(spans) < 2:
+            return None
+        return self.pattern_matcher.scan(text, spans)
+    
+    def _match_segments(self, scan: SegmentScan) -> Optional[Tuple[str, float]]:
+        """Answer every segment locally: (combined response, lowest confidence), or None if any misses"""
+        combined_responses = []
+        confidences = []
+        
+        for i in range(len(scan)):
+            match_result = self.pattern_matcher.match_segment(scan, i)
             
-            if self.config.verbose_errors:
-                return f"Error: {str(e)}"
-            return self.config.default_error_response
+            if match_result.matched and match_result.confidence >= self.config.pattern_match_threshold:
+                combined_responses.append(match_result.response)
+                confidences.append(match_result.confidence)
+            else:
+                return None
+        
+        if not combined_responses:
+            return None
+        return " ".join(combined_responses), min(confidences)
     
-    def learn_pattern(self, pattern: str, response: str) -> bool:
-        """Learn a new pattern and save to file with normalization and duplicate detection"""
+    def _complete_ai_response(self, request: AIRequest, result: AIResponse) -> Reply:
+        """Cache, learn from and log a Gemini answer"""
+        if not result.ok:
+            return self._fallback_response(request, result)
+        
+        user_input = request.user_input
+        response = result.text
+        self.stats['ai_responses'] += 1
+        
+        # Cache response (errors never reach this point)
+        if self.config.enable_response_cache:
+            self.cache.set(request.cache_key, response)
+            if self.config.enable_semantic_cache:
+                self.semantic_cache.set(request.query_tokens, response, request.fingerprint)
+        
+        # Auto Learning
+        if self.config.enable_auto_learning and len(response) > 5:
+            # normalize pattern for storage
+            self.learn_pattern(user_input, response, request.parsed)
+            self.logger.info("Auto-learned new pattern")
+        
+        # Simple User Fact Extraction (Basic Logic)
+        import re
+        # "My name is X"
+        name_match = re.search(r"my name is\s+([a-zA-Z]+)", user_input, re.IGNORECASE)
+        if name_match:
+            name = name_match.group(1)
+            self.user_manager.set_fact("name", name)
+            self.logger.info("Learned user name: %s", name)
+        
+        # Log conversation
+        self._add_to_history(user_input, response, "GEMINI")
+        
+        self.logger.info("AI response generated")
+        return Reply(response, "GEMINI")
+    
+    def _complete_stream(self, request: AIRequest, result: AIResponse, streamed: bool) -> str:
+        """Finish a streamed answer, returning whatever is still left to show"""
+        if not streamed:
+            return self._format_reply(self._complete_ai_response(request, result))
+        
+        if result.ok:
+            self._complete_ai_response(request, result)
+            return ""
+        
+        # The stream broke off part way; the partial answer is not kept
+        self.stats['ai_errors'] += 1
+        self.logger.warning("AI stream failed (%s) after partial output", result.error)
+        return "\n" + result.text
+    
+    def _fallback_response(self, request: AIRequest, result: AIResponse) -> Reply:
+        """Answer from the best below-threshold local match when Gemini fails or the circuit is open"""
+        self.stats['ai_errors'] += 1
+        self.logger.warning("AI request failed (%s), falling back to local tiers", result.error)
+        
+        match = request.local_match
+        if match is not None and match.matched:
+            self.stats['local_responses'] += 1
+            self._add_to_history(request.user_input, match.response, "LOCAL")
+            return Reply(match.response, "LOCAL", "fallback", match.confidence, result.error)
+        
+        # Error messages are neither cached, learned nor added to the context
+        return Reply(result.text, "GEMINI", error=result.error)
+
+    def _handle_error(self, e: Exception) -> Reply:
+        self.stats['errors'] += 1
+        self.logger.error("Error processing input: %s", e, exc_info=True)
+        
+        if self.config.verbose_errors:
+            return Reply(f"Error: {str(e)}", None, error="exception")
+        return Reply(self.config.default_error_response, None, error="exception")
+    
+    def learn_pattern(self, pattern: str, response: str, parsed: Optional[ParsedInput] = None) -> bool:
+        """Learn a new pattern and journal it with normalization and duplicate detection.
+        
+        parsed, if given, is the already parsed pattern and supplies its normalized form.
+        """
         try:
-            import json
-            import os
             import re
-            from fuzzywuzzy import fuzz
+            import uuid
             
             # Normalize pattern for comparison
-            normalized = self.parser.normalize_for_pattern(pattern.strip())
+            if parsed is not None:
+                normalized = parsed.pattern_text
+            else:
+                normalized = self.parser.normalize_for_pattern(pattern.strip())
             
             if not normalized:
                 self.logger.warning("Pattern normalized to empty string, skipping")
                 return False
             
-            # Load existing
-            if os.path.exists(self.config.patterns_file):
-                with open(self.config.patterns_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
-                data = {}
-            
-            # Check for similar existing pattern
-            similar_key = self._find_similar_pattern(normalized, data)
+            # Check for similar existing pattern (in-memory patterns already include the journal)
+            data = self.pattern_matcher.patterns
+            similar_key = self._find_similar_pattern(normalized)
             
             if similar_key:
                 # Update existing pattern instead of creating duplicate
-                self.logger.info(f"Merging with similar pattern: {similar_key}")
+                self.logger.info("Merging with similar pattern: %s", similar_key)
                 
                 # Add response if not already present
-                existing_responses = data[similar_key].get("responses", [])
-                if response not in existing_responses:
-                    existing_responses.append(response)
-                    data[similar_key]["responses"] = existing_responses
-                    
-                    with open(self.config.patterns_file, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2)
-                    
-                    self.pattern_matcher.load_patterns()
+                if response not in data[similar_key].get("responses", []):
+                    self.pattern_matcher.add_response(similar_key, response)
                     return True
                 else:
                     self.logger.info("Response already exists for this pattern")
@@ -294,9 +554,8 @@ class HybridChatbot:
                 tag_patterns = [re.escape(tag) for tag in tags]
                 regex_pattern = r"\b" + r".*".join(tag_patterns) + r"\b"
                 
-                import uuid
                 cat_id = f"learned_{uuid.uuid4().hex[:8]}"
-                data[cat_id] = {
+                entry = {
                     "patterns": [regex_pattern],
                     "responses": [response],
                     "tags": tags,  # Store tags for semantic matching
@@ -305,39 +564,19 @@ class HybridChatbot:
                     "priority": 9  # High priority for learned items
                 }
                 
-                with open(self.config.patterns_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2)
-                
-                # Reload matcher
-                self.pattern_matcher.load_patterns()
-                self.logger.info(f"Learned new pattern with tags: {tags}")
+                # Append to the journal and index just this entry
+                self.pattern_matcher.add_pattern(cat_id, entry)
+                self.logger.info("Learned new pattern with tags: %s", tags)
                 return True
             
         except Exception as e:
-            self.logger.error(f"Failed to learn pattern: {e}")
+            self.logger.error("Failed to learn pattern: %s", e)
             return False
     
-    def _find_similar_pattern(self, normalized_pattern: str, patterns_data: dict, threshold: float = 0.85) -> Optional[str]:
-        """Find if a similar pattern already exists using fuzzy matching"""
-        from fuzzywuzzy import fuzz
-        
-        best_score = 0
-        best_match = None
-        
-        for name, data in patterns_data.items():
-            if name.startswith("learned_"):
-                # Compare with normalized form if available
-                existing_normalized = data.get("normalized", "")
-                
-                if existing_normalized:
-                    # Token sort ratio is more robust for deduplication as it respects word count
-                    score = fuzz.token_sort_ratio(normalized_pattern, existing_normalized) / 100.0
-                    
-                    if score >= 0.9 and score > best_score:
-                        best_score = score
-                        best_match = name
-        
-        return best_match if best_score >= 0.9 else None
+    def _find_similar_pattern(self, normalized_pattern: str) -> Optional[str]:
+        """Find if a similar learned pattern already exists using the near-duplicate index"""
+        # Token sort ratio is more robust for deduplication as it respects word count
+        return self.pattern_matcher.duplicate_index.find(normalized_pattern)
     
     def _format_response(self, response: str, source: str, match_type: str = "") -> str:
         """Format response with source indicator"""
@@ -349,6 +588,12 @@ class HybridChatbot:
             return prefix + response
         return response
     
+    def _format_reply(self, reply: Reply) -> str:
+        """Format a reply with its source indicator (if it has one)"""
+        if reply.source is None:
+            return reply.text
+        return self._format_response(reply.text, reply.source, reply.match_type)
+    
     def _add_to_history(self, user_input: str, response: str, source: str):
         """Add exchange to conversation history"""
         entry = {
@@ -364,9 +609,9 @@ class HybridChatbot:
         if len(self.conversation_history) > self.config.max_history_length:
             self.conversation_history = self.conversation_history[-self.config.max_history_length:]
         
-        # Save to file
+        # Append to the log (written by the background writer)
         if self.config.save_conversations and self.config.log_conversations:
-            self._save_history()
+            self.history_log.append(entry)
     
     def _get_context(self) -> List[str]:
         """Get recent conversation context"""
@@ -380,55 +625,93 @@ class HybridChatbot:
         return context
     
     def _load_history(self):
-        """Load conversation history from file"""
-        try:
-            import json
-            with open(self.config.conversation_file, 'r') as f:
-                self.conversation_history = json.load(f)
-            self.logger.info(f"Loaded {len(self.conversation_history)} conversations")
-        except FileNotFoundError:
-            self.logger.info("No previous conversation history found")
-        except Exception as e:
-            self.logger.error(f"Error loading history: {e}")
-    
-    def _save_history(self):
-        """Save conversation history to file"""
+        """Load the most recent exchanges from the conversation log"""
         try:
-            import json
-            import os
+            # One-time migration from the old JSON-array history file
+            legacy_file = os.path.splitext(self.config.conversation_file)[0] + ".json"
+            if legacy_file != self.config.conversation_file and self.history_log.import_legacy(legacy_file):
+                self.logger.info("Imported legacy history from %s", legacy_file)
             
-            os.makedirs(os.path.dirname(self.config.conversation_file), exist_ok=True)
-            
-            with open(self.config.conversation_file, 'w') as f:
-                json.dump(self.conversation_history, f, indent=2)
+            self.conversation_history = self.history_log.tail(self.config.max_history_length)
+            if self.conversation_history:
+                self.logger.info("Loaded %d conversations", len(self.conversation_history))
+            else:
+                self.logger.info("No previous conversation history found")
         except Exception as e:
-            self.logger.error(f"Error saving history: {e}")
+            self.logger.error("Error loading history: %s", e)
+    
+    def _on_patterns_reloaded(self, stale: set):
+        """Report a pattern reload (runs on the watcher thread).
+        
+        Local answers are only cached by the matcher, which has already
+        dropped the stale ones; the response cache holds math and AI answers,
+        and AI answers are only looked up after the local tiers miss.
+        """
+        self.logger.info("Patterns reloaded: %d cached matches dropped", len(stale))
+    
+    def create_session(self, username: str, guest: bool = False) -> "HybridChatbot":
+        """A chatbot for one server session.
+        
+        The session shares this chatbot's matcher, caches, AI client, profile
+        store and statistics, and has its own conversation history (kept in
+        memory only) and user profile. The shared matcher is read-only to
+        sessions: auto-learning is off, since an answer given in one user's
+        context must not become a local pattern for everyone else. A guest's
+        profile is never written to the profile store's database.
+        """
+        session = copy.copy(self)
+        session.config = dataclasses.replace(self.config, save_conversations=False, enable_auto_learning=False)
+        session.user_manager = UserManager(self.config.base_dir, username, self.profile_store, persist=not guest)
+        session.conversation_history = []
+        return session
     
     def get_statistics(self) -> Dict:
         """Get chatbot statistics"""
         uptime = datetime.now() - self.session_start
+        match_cache = self.pattern_matcher.match_cache.stats()
         
         return {
             **self.stats,
             'uptime_seconds': uptime.total_seconds(),
             'cache_size': len(self.cache.cache),
-            'history_length': len(self.conversation_history)
+            'match_cache_hits': match_cache['hits'],
+            'match_cache_misses': match_cache['misses'],
+            'match_cache_evictions': match_cache['evictions'],
+            'match_cache_size': match_cache['size'],
+            'semantic_cache_size': len(self.semantic_cache),
+            'semantic_cache_hits': self.semantic_cache.hits,
+            **self.gemini_client.get_statistics(),
+            'history_length': len(self.conversation_history),
+            'latency': self.metrics.snapshot()
         }
     
     def clear_history(self):
         """Clear conversation history"""
         self.conversation_history = []
         if self.config.save_conversations:
-            self._save_history()
+            self.history_log.clear()
         self.logger.info("Conversation history cleared")
     
     def shutdown(self):
         """Graceful shutdown"""
         self.logger.info("Shutting down chatbot...")
         
-        if self.config.save_conversations:
-            self._save_history()
+        self.pattern_matcher.stop_watching()
+        
+        # Flush queued history entries and profile updates
+        self.history_log.close()
+        self.profile_store.close()
+        self.metrics.stop_dumps()
+        
+        self.cache.close()
+        
+        # Fold learned patterns back into patterns.json
+        self.pattern_matcher.store.close()
+        self.pattern_matcher.store.compact()
         
         stats = self.get_statistics()
-        self.logger.info(f"Session stats: {stats}")
+        self.logger.info("Session stats: %s", stats)
         self.logger.info("Chatbot shutdown complete")
+        
+        # Drain the log queue
+        self.logger.close()
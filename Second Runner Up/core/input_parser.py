@@ -1,12 +1,37 @@
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import AbstractSet, Dict, FrozenSet, List, Tuple, Optional
 from dataclasses import dataclass, field
+from functools import cached_property
 
 from config import ChatbotConfig
 
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_for_pattern(text: str, stop_words: AbstractSet[str]) -> str:
+    """Lowercase text and drop punctuation, stop words and one-letter tokens"""
+    # Remove punctuation and convert to lowercase
+    text = _PUNCTUATION_RE.sub('', text.lower())
+    
+    # Tokenize
+    tokens = text.split()
+    
+    # Remove stop words while preserving order
+    filtered_tokens = [t for t in tokens if t not in stop_words and len(t) > 1]
+    
+    # Join back
+    normalized = ' '.join(filtered_tokens)
+    
+    return normalized if normalized else text.lower()  # Fallback to original if all words filtered
+
+
 @dataclass
 class ParsedInput:
-    """Structured representation of parsed input"""
+    """Structured representation of parsed input.
+    
+    The pattern forms below are computed on first use and then shared by the
+    matcher tiers, the caches and pattern learning.
+    """
     raw_text: str
     normalized_text: str
     tokens: List[str]
@@ -14,6 +39,27 @@ class ParsedInput:
     entities: Dict[str, str] = field(default_factory=dict)
     sentiment: Optional[str] = None
     confidence: float = 0.0
+    stop_words: AbstractSet[str] = field(default=frozenset(), repr=False, compare=False)
+    
+    @cached_property
+    def pattern_text(self) -> str:
+        """The input as InputParser.normalize_for_pattern would return it"""
+        return normalize_for_pattern(self.normalized_text, self.stop_words)
+    
+    @cached_property
+    def pattern_tokens(self) -> List[str]:
+        """Stop-word-filtered tokens, in input order"""
+        return self.pattern_text.split()
+    
+    @cached_property
+    def tags(self) -> FrozenSet[str]:
+        """Distinct pattern tokens, as compared against pattern tags"""
+        return frozenset(self.pattern_tokens)
+    
+    @property
+    def cache_key(self) -> str:
+        """Key for the response caches; unlike hash() it is the same in every process"""
+        return self.normalized_text
 
 
 class InputParser:
@@ -60,7 +106,8 @@ class InputParser:
         return ParsedInput(
             raw_text=raw,
             normalized_text=normalized,
-            tokens=tokens
+            tokens=tokens,
+            stop_words=self.stop_words
         )
     
     def _normalize(self, text: str) -> str:
@@ -102,16 +149,4 @@ class InputParser:
     
     def normalize_for_pattern(self, text: str) -> str:
         """Normalize text for pattern matching/storage by removing stop words and special chars"""
-        # Remove punctuation and convert to lowercase
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        
-        # Tokenize
-        tokens = text.split()
-        
-        # Remove stop words while preserving order
-        filtered_tokens = [t for t in tokens if t not in self.stop_words and len(t) > 1]
-        
-        # Join back
-        normalized = ' '.join(filtered_tokens)
-        
-        return normalized if normalized else text.lower()  # Fallback to original if all words filtered
+        return normalize_for_pattern(text, self.stop_words)
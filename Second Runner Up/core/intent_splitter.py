@@ -1,5 +1,5 @@
 import re
-from typing import List
+from typing import List, Tuple
 
 class IntentSplitter:
     """Splits user input into separate logical segments."""
@@ -24,3 +24,25 @@ class IntentSplitter:
         cleaned = [s.strip() for s in segments if s.strip()]
         
         return cleaned
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, end) offsets of the segments split() would return, so the
+        segments of parsed input can be matched without re-parsing each one.
+        """
+        spans = []
+        pos = 0
+        for m in re.finditer(self.split_pattern, text):
+            self._add_span(spans, text, pos, m.start())
+            pos = m.end()
+        self._add_span(spans, text, pos, len(text))
+        return spans
+
+    def _add_span(self, spans: List[Tuple[int, int]], text: str, start: int, end: int):
+        # Same trimming as split(): drop surrounding whitespace and empty segments
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
@@ -1,13 +1,14 @@
 import os
-import json
-import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from utils.profile_store import ProfileStore
 
 class UserManager:
     """Manages user identity and long-term memory."""
     
-    def __init__(self, base_dir: Path, user_override: Optional[str] = None):
+    def __init__(self, base_dir: Path, user_override: Optional[str] = None, store: Optional[ProfileStore] = None,
+                 persist: bool = True):
         self.base_dir = base_dir / "data" / "users"
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
@@ -19,49 +20,51 @@ class UserManager:
                 self.username = os.getlogin()
             except Exception:
                 self.username = "default_user"
-                
+        
+        # Profiles of every user share one store; old per-user JSON files are imported on first load
+        self.owns_store = store is None
+        self.store = store or ProfileStore(str(self.base_dir / "profiles.db"))
         self.profile_file = self.base_dir / f"{self.username}.json"
+        self.persist = persist  # False for guests: facts are remembered for this session only
         self.profile = self._load_profile()
-        
+        self._context: Optional[Tuple[int, str]] = None  # (facts version, context string)
+    
     def _load_profile(self) -> Dict[str, Any]:
-        """Load user profile from disk."""
-        if self.profile_file.exists():
-            try:
-                with open(self.profile_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logging.getLogger('AmmaarBhaiChatBot').error(f"Failed to load profile for {self.username}: {e}")
-                
-        # Default profile
-        return {
-            "username": self.username,
-            "created_at": None,
-            "facts": {},
-            "preferences": {}
-        }
+        """Load user profile from the store."""
+        return self.store.load(self.username, str(self.profile_file), self.persist)
     
     def save_profile(self):
-        """Save user profile to disk."""
-        try:
-            with open(self.profile_file, 'w', encoding='utf-8') as f:
-                json.dump(self.profile, f, indent=2)
-        except Exception as e:
-            logging.getLogger('AmmaarBhaiChatBot').error(f"Failed to save profile: {e}")
-
+        """Write pending profile changes now instead of at the next batch."""
+        self.store.flush()
+    
     def get_fact(self, key: str) -> Optional[str]:
         return self.profile["facts"].get(key)
     
     def set_fact(self, key: str, value: str):
-        self.profile["facts"][key] = value
-        self.save_profile()
-        
+        # Written behind the request path by the store's background writer
+        self.store.set_fact(self.username, key, value)
+    
     def get_context_string(self) -> str:
-        """Return a string summary of the user for AI context."""
-        facts = self.profile.get("facts", {})
+        """Return a string summary of the user for AI context, rebuilt only after facts change."""
+        version = self.store.version(self.username)
+        if self._context is None or self._context[0] != version:
+            self._context = (version, self._build_context())
+        return self._context[1]
+    
+    def _build_context(self) -> str:
+        facts = self.store.facts(self.username)
         if not facts:
             return ""
-            
+        
         summary = f"User Profile ({self.username}):\n"
         for k, v in facts.items():
             summary += f"- {k}: {v}\n"
         return summary
+    
+    def close(self):
+        """Flush pending facts and close the store if this manager opened it."""
+        if self.owns_store:
+            self.store.close()
+        else:
+            self.store.flush()
+
@@ -0,0 +1,67 @@
+import re
+import math
+import heapq
+from typing import List, Dict, Tuple
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (underscored tags split into words)"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over knowledge base content and tags"""
+
+    def __init__(self, entries: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries = entries
+        # Lowercased once here instead of on every search
+        self.contents: List[str] = []
+        self.tags: List[List[str]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for doc_id, entry in enumerate(entries):
+            content = entry.get("content", "").lower()
+            tags = [tag.lower() for tag in entry.get("tags", [])]
+            self.contents.append(content)
+            self.tags.append(tags)
+
+            counts: Dict[str, int] = {}
+            terms = tokenize(content)
+            for tag in tags:
+                terms.extend(tokenize(tag))
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+            self.doc_lengths.append(len(terms))
+
+        total = sum(self.doc_lengths)
+        self.avg_length = total / len(self.doc_lengths) if self.doc_lengths else 0.0
+        n = len(entries)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, text: str, top_k: int = 10) -> List[int]:
+        """Return ids of the top_k entries by BM25 score, in corpus order"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in posting:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return sorted(doc_id for doc_id, _ in best)
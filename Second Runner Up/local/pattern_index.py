@@ -0,0 +1,617 @@
+import re
+import threading
+from collections import deque
+from typing import Any, Optional, Tuple, List, Dict
+
+# Rank of a single pattern: (-priority, entry order, pattern order).
+# Lower ranks win, so higher priority entries are always tried first.
+Rank = Tuple[int, int, int]
+
+REGEX_CHARS = r'\[](){}^$.*+?|'
+DEFAULT_PRIORITY = 0
+CHUNK_SIZE = 200
+MIN_KEYWORD_LENGTH = 3  # Shorter required literals occur in too many texts to be worth indexing
+
+# Patterns that cannot be embedded in a combined alternation
+_STANDALONE_RE = re.compile(r'\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)')
+_GLOBAL_FLAGS_RE = re.compile(r'\(\?[aiLmsux]+\)')
+_QUANTIFIER_RE = re.compile(r'\{\d*(?:,\d*)?\}')
+_SPECIAL = set(REGEX_CHARS)
+
+# Non-ASCII characters IGNORECASE matches to ASCII letters; folded so keyword search sees them
+_CASE_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def is_regex_pattern(pattern: str) -> bool:
+    """Check if pattern is regex"""
+    return any(c in pattern for c in REGEX_CHARS)
+
+
+def _required_literals(pattern: str, ignore_case: bool = True) -> Optional[List[str]]:
+    """Strings one of which occurs in every text the pattern matches, or None if none is found.
+
+    Runs of plain ASCII characters count, as do groups of plain
+    alternatives like `(capital|capitol)`; quantified characters, classes
+    and any other group end a run. Of these the most selective is
+    returned: the one whose shortest string is longest, e.g. `["capital"]`
+    for the learned pattern `\\bcapital.*india\\b`.
+    """
+    if _GLOBAL_FLAGS_RE.search(pattern):
+        return None  # (?x) and friends change what the characters mean
+
+    candidates: List[List[str]] = []
+    run: List[str] = []
+    last = None  # What a following quantifier applies to: "char", "group" or None
+
+    def end_run():
+        if run:
+            candidates.append(["".join(run)])
+            run.clear()
+
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        quantifier = _QUANTIFIER_RE.match(pattern, i) if c == "{" else None
+        if c in "*?" or quantifier:
+            # The quantified atom is optional
+            if last == "char":
+                run.pop()
+            elif last == "group" and not run:
+                candidates.pop()
+            end_run()
+            i = quantifier.end() if quantifier else i + 1
+            if i < len(pattern) and pattern[i] in "?+":
+                i += 1  # Lazy or possessive
+            last = None
+            continue
+        if c == "+":
+            end_run()  # The atom still occurs, but its repeats separate it from what follows
+            i += 1
+            if i < len(pattern) and pattern[i] in "?+":
+                i += 1
+            last = None
+            continue
+
+        if c == "\\":
+            if i + 1 == len(pattern):
+                return None
+            escaped = pattern[i + 1]
+            if escaped in "xuUN" or escaped.isdigit():
+                return None  # \x41, \u0041, \N{...}, octal and group references: not one plain character
+            i += 2
+            if escaped.isascii() and not escaped.isalnum():
+                run.append(escaped)
+                last = "char"
+            else:
+                end_run()  # \b, \w, \d, \s, \n...
+                last = None
+        elif c == "(":
+            end = _group_end(pattern, i)
+            if end < 0:
+                return None
+            end_run()
+            alternatives = _literal_alternatives(pattern[i + 1:end - 1])
+            if alternatives:
+                candidates.append(alternatives)
+                last = "group"
+            else:
+                last = None
+            i = end
+        elif c == "[":
+            end_run()
+            i = _class_end(pattern, i)
+            last = None
+        elif c in "|)":
+            return None  # Top-level alternation: no single requirement
+        elif c in _SPECIAL or not c.isascii():
+            end_run()
+            i += 1
+            last = None
+        else:
+            run.append(c)
+            last = "char"
+            i += 1
+    end_run()
+
+    candidates = [alternatives for alternatives in candidates
+                  if min(len(text) for text in alternatives) >= MIN_KEYWORD_LENGTH]
+    if not candidates:
+        return None
+    best = max(candidates, key=lambda alternatives: (min(len(text) for text in alternatives), -len(alternatives)))
+    return [text.lower() for text in best] if ignore_case else best
+
+
+def _literal_alternatives(body: str) -> Optional[List[str]]:
+    """The alternatives of a group body if each is plain characters only"""
+    if body.startswith("?:"):
+        body = body[2:]
+    elif body.startswith("?"):
+        return None  # Lookaround, named or conditional group
+
+    alternatives = [[]]
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c == "|":
+            alternatives.append([])
+        elif c == "\\" and i + 1 < len(body) and body[i + 1].isascii() and not body[i + 1].isalnum():
+            alternatives[-1].append(body[i + 1])
+            i += 1
+        elif c in _SPECIAL or c == "\\" or not c.isascii():
+            return None
+        else:
+            alternatives[-1].append(c)
+        i += 1
+    return ["".join(chars) for chars in alternatives]
+
+
+def _class_end(pattern: str, i: int) -> int:
+    """Index just past the character class starting at pattern[i] == '['"""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1  # A leading ] is literal
+    while i < len(pattern) and pattern[i] != "]":
+        i += 2 if pattern[i] == "\\" else 1
+    return i + 1
+
+
+def _group_end(pattern: str, i: int) -> int:
+    """Index just past the group starting at pattern[i] == '(', or -1 if unbalanced"""
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i = _class_end(pattern, i)
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+class LiteralAutomaton:
+    """Aho-Corasick automaton over plain (non-regex) phrases"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Optional[Rank]] = [None]
+        self.depth: List[int] = [0]  # Length of the string spelled by each node
+        self.dirty = False
+
+    def add(self, phrase: str, rank: Rank):
+        """Insert a phrase; failure links are rebuilt lazily on next search"""
+        node = 0
+        for ch in phrase:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(None)
+                self.depth.append(self.depth[node] + 1)
+            node = nxt
+        if self.out[node] is None or rank < self.out[node]:
+            self.out[node] = rank
+        self.dirty = True
+
+    def build(self):
+        """Compute failure links and fold the best output rank along them"""
+        queue = deque()
+        for nxt in self.goto[0].values():
+            self.fail[nxt] = 0
+            queue.append(nxt)
+
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                inherited = self.out[self.fail[nxt]]
+                if inherited is not None and (self.out[nxt] is None or inherited < self.out[nxt]):
+                    self.out[nxt] = inherited
+        self.dirty = False
+
+    def best(self, text: str) -> Optional[Rank]:
+        """Return the lowest rank of any phrase occurring in text"""
+        if self.dirty:
+            self.build()
+
+        best = self.out[0]  # Empty phrase matches everything
+        node = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            rank = out[node]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def best_in_spans(self, text: str, spans: List[Tuple[int, int]]) -> Tuple[Optional[Rank], List[Optional[Rank]]]:
+        """best() for the whole text and for each sorted (start, end) span, in one pass.
+
+        A phrase counts for a span only if it lies wholly inside it, so each
+        span gets the same rank as best(text[start:end]).
+        """
+        if self.dirty:
+            self.build()
+
+        best = self.out[0]
+        span_best = [self.out[0]] * len(spans)
+        node = 0
+        j = 0
+        goto, fail, out, depth = self.goto, self.fail, self.out, self.depth
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            rank = out[node]
+            if rank is None:
+                continue
+            if best is None or rank < best:
+                best = rank
+
+            while j < len(spans) and spans[j][1] <= i:
+                j += 1
+            if j == len(spans) or i < spans[j][0]:
+                continue
+            current = span_best[j]
+            if current is not None and current <= rank:
+                continue  # The folded rank bounds every phrase ending here
+
+            # Back off to the longest suffix that starts inside the span
+            node_in_span = node
+            while depth[node_in_span] > i - spans[j][0] + 1:
+                node_in_span = fail[node_in_span]
+            rank = out[node_in_span]
+            if rank is not None and (current is None or rank < current):
+                span_best[j] = rank
+        return best, span_best
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every value whose keyword occurs in a text.
+
+    Built once from all its keywords; it is never changed afterwards, so
+    searches need no lock.
+    """
+
+    def __init__(self, keywords: List[Tuple[str, Any]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Any]] = [[]]
+        self.link: List[int] = [0]  # Nearest failure ancestor with output (0: none)
+
+        for keyword, value in keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.link.append(0)
+                node = nxt
+            self.out[node].append(value)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.link[nxt] = self.fail[nxt] if self.out[self.fail[nxt]] else self.link[self.fail[nxt]]
+
+    def find(self, text: str) -> List[Any]:
+        """Values of every keyword occurring in text, each node's reported once"""
+        found = []
+        seen = set()
+        node = 0
+        goto, fail, out, link = self.goto, self.fail, self.out, self.link
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else link[node]
+            while hit and hit not in seen:
+                seen.add(hit)
+                found.extend(out[hit])
+                hit = link[hit]
+        return found
+
+
+class RegexCascade:
+    """Regex patterns of one priority level, indexed by the literals they require.
+
+    Patterns with a required literal (`capital` in `\\bcapital.*india\\b`)
+    are keyed: a KeywordAutomaton over the text picks the few whose literal
+    occurs, and only those are run, in rank order. Keyed patterns added
+    since the automaton was built sit in `recent` until CHUNK_SIZE of them
+    force a rebuild.
+
+    The rest are compiled into combined blocks
+    `(?:.*?(?P<_p0>...)|.*?(?P<_p1>...)|...)` used with `match()`, so the
+    regex engine tries alternatives in rank order and stops at the first
+    pattern that matches anywhere in the text.
+
+    Added patterns wait in `pending` and are folded in on the next search,
+    so building N patterns compiles each block once rather than on every
+    add. Blocks and keyed patterns are published as new objects, so a search
+    running meanwhile always sees a compiled state (that from before the add).
+    """
+
+    def __init__(self, flags: int):
+        self.flags = flags
+        # (combined, compiled, [(pattern, rank)])
+        self.blocks: List[Tuple[bool, re.Pattern, List[Tuple[str, Rank]]]] = []
+        # (automaton of (rank, compiled), recent [(rank, compiled, literals)], all keywords)
+        self.keyed: Tuple[KeywordAutomaton, List[Tuple[Rank, re.Pattern, List[str]]], List[Tuple[str, Any]]] = (
+            KeywordAutomaton([]), [], []
+        )
+        self.pending: List[Tuple[str, Rank]] = []
+        self.dirty = False
+        self.lock = threading.Lock()  # Serializes add() and compile()
+
+    def add(self, pattern: str, rank: Rank):
+        """Queue a pattern; it is compiled into the cascade on the next search"""
+        re.compile(pattern, self.flags)  # Raises re.error on invalid patterns
+        with self.lock:
+            self.dirty = True
+            self.pending.append((pattern, rank))
+
+    def compile(self):
+        """Fold pending patterns in, recompiling only the blocks they change"""
+        with self.lock:
+            if not self.dirty:
+                return  # Another search compiled them first
+            automaton, recent, keywords = self.keyed
+            recent = list(recent)
+            blocks = list(self.blocks)
+            for pattern, rank in self.pending:
+                literals = _required_literals(pattern, bool(self.flags & re.IGNORECASE))
+                if literals:
+                    recent.append((rank, re.compile(pattern, self.flags), literals))
+                elif _STANDALONE_RE.search(pattern):
+                    blocks.append((False, re.compile(pattern, self.flags), [(pattern, rank)]))
+                elif blocks and blocks[-1][0] and len(blocks[-1][2]) < CHUNK_SIZE:
+                    blocks[-1] = (True, None, blocks[-1][2] + [(pattern, rank)])
+                else:
+                    blocks.append((True, None, [(pattern, rank)]))
+
+            if len(recent) >= CHUNK_SIZE:
+                keywords = keywords + [(text, (rank, compiled)) for rank, compiled, literals in recent for text in literals]
+                automaton, recent = KeywordAutomaton(keywords), []
+
+            compiled_blocks = []
+            for combined, compiled, members in blocks:
+                if combined and compiled is None:
+                    try:
+                        compiled = self._compile_block(members)
+                    except re.error:
+                        # Valid alone but not together: keep each pattern standalone
+                        compiled_blocks.extend((False, re.compile(p, self.flags), [(p, r)]) for p, r in members)
+                        continue
+                compiled_blocks.append((combined, compiled, members))
+
+            self.blocks = compiled_blocks
+            self.keyed = (automaton, recent, keywords)
+            self.pending = []
+            self.dirty = False
+
+    def search(self, text: str) -> Optional[Rank]:
+        """Return the rank of the first pattern (in rank order) that matches"""
+        if self.dirty:
+            self.compile()
+
+        best = None
+        for combined, compiled, members in self.blocks:
+            if combined:
+                m = compiled.match(text)
+                if m:
+                    best = members[int(m.lastgroup[2:])][1]
+                    break
+            elif compiled.search(text):
+                best = members[0][1]
+                break
+
+        automaton, recent, _ = self.keyed
+        if not automaton.goto[0] and not recent:
+            return best
+
+        if self.flags & re.IGNORECASE:
+            folded = text.translate(_CASE_FOLD).lower()
+        else:
+            folded = text
+        candidates = automaton.find(folded)
+        candidates += [(rank, compiled) for rank, compiled, literals in recent
+                       if any(literal in folded for literal in literals)]
+        candidates.sort(key=lambda candidate: candidate[0])
+        for rank, compiled in candidates:
+            if best is not None and rank >= best:
+                break
+            if compiled.search(text):
+                return rank
+        return best
+
+    def _compile_block(self, members: List[Tuple[str, Rank]]) -> re.Pattern:
+        body = "|".join(f"(?s:.*?)(?P<_p{i}>{pattern})" for i, (pattern, _) in enumerate(members))
+        return re.compile(f"(?:{body})", self.flags)
+
+
+class CompiledPatterns:
+    """All patterns from patterns.json compiled once into a single matching engine"""
+
+    def __init__(self):
+        self.flags = re.IGNORECASE
+        self.automaton = LiteralAutomaton()
+        self.cascades: Dict[int, RegexCascade] = {}
+        self.priorities: List[int] = []  # Cascade keys, highest first
+        self.names: List[str] = []
+        self.literals: List[Tuple[str, str]] = []  # (pattern name, lowered phrase) for fuzzy matching
+        self.literal_phrases: List[str] = []  # The phrases alone, for batch scoring
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, patterns: Dict) -> "CompiledPatterns":
+        index = cls()
+        for name, data in patterns.items():
+            index.add(name, data)
+        return index
+
+    def add(self, name: str, data: Dict):
+        """Compile a single pattern entry into the index"""
+        seq = len(self.names)
+        self.names.append(name)
+        priority = int(data.get("priority", DEFAULT_PRIORITY))
+
+        for i, pattern in enumerate(data.get("patterns", [])):
+            rank = (-priority, seq, i)
+            if is_regex_pattern(pattern):
+                try:
+                    cascade = self.cascades.get(priority)
+                    if cascade is None:
+                        cascade = self.cascades[priority] = RegexCascade(self.flags)
+                        self.priorities = sorted(self.cascades, reverse=True)
+                    cascade.add(pattern, rank)
+                except re.error as e:
+                    print(f"[ERROR] Invalid pattern in '{name}': {e}")
+            else:
+                phrase = pattern.lower()
+                self.automaton.add(phrase, rank)
+                self.literals.append((name, phrase))
+                self.literal_phrases.append(phrase)
+
+    def match(self, text: str) -> Optional[Tuple[str, str]]:
+        """Return (pattern name, match type) of the highest ranked matching pattern"""
+        return self._resolve(text, self.automaton.best(text))
+
+    def scan(self, text: str, spans: List[Tuple[int, int]]) -> "SegmentScan":
+        """Find literal hits for text and each of its segments in a single pass"""
+        return SegmentScan(self, text, spans)
+
+    def _resolve(self, text: str, best: Optional[Rank]) -> Optional[Tuple[str, str]]:
+        """Combine the best literal rank with the regex cascades"""
+        best_type = "exact"
+
+        for priority in self.priorities:
+            # Nothing at this priority can outrank a literal hit of higher priority
+            if best is not None and best[0] < -priority:
+                break
+            rank = self.cascades[priority].search(text)
+            if rank is not None:
+                if best is None or rank < best:
+                    best, best_type = rank, "regex"
+                break
+
+        if best is None:
+            return None
+        return self.names[best[1]], best_type
+
+
+class SegmentScan:
+    """Compiled-pattern hits for a text split into segments.
+
+    Literal hits for the whole text and every segment come from one automaton
+    pass. Regex cascades run lazily on the segments (and the whole text)
+    actually asked for, so each result equals CompiledPatterns.match on it.
+    """
+
+    def __init__(self, index: CompiledPatterns, text: str, spans: List[Tuple[int, int]]):
+        self.index = index
+        self.text = text
+        self.spans = spans
+        self.literal, self.segment_literals = index.automaton.best_in_spans(text, spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def segment(self, i: int) -> str:
+        start, end = self.spans[i]
+        return self.text[start:end]
+
+    def match_segment(self, i: int) -> Optional[Tuple[str, str]]:
+        return self.index._resolve(self.segment(i), self.segment_literals[i])
+
+    def match_full(self) -> Optional[Tuple[str, str]]:
+        return self.index._resolve(self.text, self.literal)
+
+
+class TagIndex:
+    """Inverted index from tag to the patterns carrying it"""
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = {}
+        self.names: List[str] = []
+        self.sizes: List[int] = []  # Distinct tag count per pattern
+
+    @classmethod
+    def build(cls, patterns: Dict) -> "TagIndex":
+        index = cls()
+        for name, data in patterns.items():
+            index.add(name, data)
+        return index
+
+    def add(self, name: str, data: Dict):
+        """Index the tags of a single pattern entry"""
+        tags = data.get("tags")
+        if not tags:
+            # Fallback: create tags from normalized if available
+            norm = data.get("normalized")
+            if norm:
+                tags = norm.split()
+        if not tags:
+            return
+
+        seq = len(self.names)
+        tag_set = set(tags)
+        self.names.append(name)
+        self.sizes.append(len(tag_set))
+        for tag in tag_set:
+            self.postings.setdefault(tag, []).append(seq)
+
+    def best(self, input_tags: set) -> Optional[Tuple[str, float]]:
+        """Return (pattern name, score) with the best Jaccard/recall blend.
+
+        Only patterns sharing at least one tag with the input are scored.
+        """
+        overlap: Dict[int, int] = {}
+        for tag in input_tags:
+            for seq in self.postings.get(tag, ()):
+                overlap[seq] = overlap.get(seq, 0) + 1
+
+        best_seq, best_score = None, 0.0
+        n_input = len(input_tags)
+        for seq, shared in overlap.items():
+            size = self.sizes[seq]
+            jaccard = shared / (n_input + size - shared)
+            recall = shared / size
+            score = (jaccard * 0.4) + (recall * 0.6)
+            # Ties go to the earlier pattern, as with a linear scan
+            if score > best_score or (score == best_score and best_seq is not None and seq < best_seq):
+                best_seq, best_score = seq, score
+
+        if best_seq is None:
+            return None
+        return self.names[best_seq], best_score
@@ -1,12 +1,23 @@
 import re
 import json
-from typing import Optional, Tuple, List, Dict
+import logging
+import threading
+from typing import Optional, Tuple, List, Dict, FrozenSet, Set, Callable
 from dataclasses import dataclass
 
-from fuzzywuzzy import fuzz
-
 from config import ChatbotConfig
 from core.input_parser import ParsedInput
+from local.pattern_index import CompiledPatterns, SegmentScan, TagIndex, is_regex_pattern
+from local.knowledge_index import KnowledgeIndex
+from local.pattern_store import PatternStore
+from utils.cache import LRUCache
+from utils.duplicate_index import DuplicateIndex
+from utils.file_watcher import FileWatcher
+from utils.metrics import LatencyMetrics
+from utils.similarity import get_backend
+
+# Past this many changed patterns a reload clears the match cache instead of re-checking each entry
+MAX_SELECTIVE_INVALIDATION = 50
 
 @dataclass
 class MatchResult:
@@ -18,64 +29,333 @@ class MatchResult:
     match_type: str  # 'exact', 'regex', 'fuzzy'
 
 
+@dataclass(frozen=True)
+class PatternSnapshot:
+    """Patterns and knowledge base with their indexes, as one consistently loaded version.
+
+    A match reads the matcher's current snapshot once and uses only it, so a
+    reload swapping in a new snapshot never changes the data under a match
+    in progress. Reloads build a new snapshot; only learned patterns are
+    added to the live one in place.
+    """
+    patterns: Dict
+    compiled: CompiledPatterns
+    tag_index: TagIndex
+    duplicate_index: DuplicateIndex
+    knowledge_base: List[Dict]
+    knowledge_index: KnowledgeIndex
+    version: int = 0
+
+
 class PatternMatcher:
     """Advanced pattern matching engine"""
-    
-    def __init__(self, config: ChatbotConfig, patterns_file: str, parser=None):
+
+    def __init__(self, config: ChatbotConfig, patterns_file: str, parser=None, metrics: Optional[LatencyMetrics] = None):
         self.config = config
-        self.patterns = self._load_patterns(patterns_file)
-        self.knowledge_base = self._load_knowledge_base()
-        self.match_cache = {}
+        self.patterns_file = patterns_file
+        self.store = PatternStore(
+            patterns_file,
+            getattr(config, 'patterns_journal_file', None),
+            getattr(config, 'patterns_compact_threshold', 200)
+        )
+        self.snapshot = self._build_snapshot(self._load_patterns(patterns_file), self._load_knowledge_base())
+        # normalized text -> (pattern_name, confidence, match_type, fixed response)
+        self.match_cache = LRUCache(getattr(config, 'match_cache_max_size', 5000))
         self.parser = parser
+        self.metrics = metrics or LatencyMetrics(enabled=False)
+        self.similarity = get_backend(getattr(config, 'similarity_backend', 'auto'))
+        
+        # Serializes snapshot swaps with learned changes and match cache writes
+        self.lock = threading.Lock()
+        self._changes_during_reload: Optional[List[Tuple]] = None
+        self._reload_lock = threading.Lock()
+        self.watcher: Optional[FileWatcher] = None
+
+    # The current snapshot's contents (each read may see a newer snapshot than the last)
+    @property
+    def patterns(self) -> Dict:
+        return self.snapshot.patterns
+
+    @property
+    def compiled(self) -> CompiledPatterns:
+        return self.snapshot.compiled
+
+    @property
+    def tag_index(self) -> TagIndex:
+        return self.snapshot.tag_index
+
+    @property
+    def duplicate_index(self) -> DuplicateIndex:
+        return self.snapshot.duplicate_index
+
+    @property
+    def knowledge_base(self) -> List[Dict]:
+        return self.snapshot.knowledge_base
+
+    @property
+    def knowledge_index(self) -> KnowledgeIndex:
+        return self.snapshot.knowledge_index
+
+    def _build_snapshot(self, patterns: Dict, knowledge_base: List[Dict],
+                        previous: Optional[PatternSnapshot] = None) -> PatternSnapshot:
+        """Index patterns and knowledge_base, reusing the previous snapshot's indexes for unchanged parts"""
+        if previous is not None and patterns == previous.patterns:
+            pattern_parts = (previous.patterns, previous.compiled, previous.tag_index, previous.duplicate_index)
+        else:
+            pattern_parts = (
+                patterns,
+                CompiledPatterns.build(patterns),
+                TagIndex.build(patterns),
+                DuplicateIndex.build(patterns)
+            )
+        if previous is not None and knowledge_base == previous.knowledge_base:
+            knowledge_parts = (previous.knowledge_base, previous.knowledge_index)
+        else:
+            knowledge_parts = (knowledge_base, KnowledgeIndex(knowledge_base))
+        version = previous.version + 1 if previous is not None else 0
+        return PatternSnapshot(*pattern_parts, *knowledge_parts, version)
+
+    def load_patterns(self) -> Set[str]:
+        """Reload patterns and knowledge base from disk (see reload)"""
+        return self.reload()
+
+    def reload(self) -> Set[str]:
+        """Rebuild the indexes from the files on disk and swap them in as a new snapshot.
+        
+        Matches already running finish on the old snapshot; queries are never
+        blocked by the rebuild. Patterns learned while it runs are carried
+        over. A file that fails to parse leaves the current snapshot in place.
+        Returns the normalized texts dropped from the match cache.
+        """
+        with self._reload_lock:
+            with self.lock:
+                self._changes_during_reload = []
+            try:
+                patterns = self.store.load(defaults=self._get_default_patterns())
+                knowledge_base = self._read_knowledge_base()
+                new = self._build_snapshot(patterns, knowledge_base, self.snapshot)
+            except Exception:
+                with self.lock:
+                    self._changes_during_reload = None
+                raise
+            
+            with self.lock:
+                changes, self._changes_during_reload = self._changes_during_reload, None
+                old = self.snapshot
+                if new.patterns is old.patterns and new.knowledge_base is old.knowledge_base:
+                    return set()  # Nothing changed (e.g. our own journal compaction)
+                
+                for op, name, value in changes:
+                    self._apply_change(new, op, name, value)
+                changed, removed, knowledge_changed = self._diff_snapshots(old, new)
+                self.snapshot = new
+                # Entries cached from here on come from the new snapshot
+                entries = self.match_cache.items()
+            
+            # Checked without holding the locks, so matches keep running meanwhile
+            stale = self._invalidate(changed, removed, knowledge_changed, entries)
+        
+        logging.getLogger('AmmaarBhaiChatBot').info(
+            "Reloaded patterns (snapshot %d: %d patterns, %d knowledge entries)",
+            new.version, len(new.patterns), len(new.knowledge_base)
+        )
+        return stale
+
+    def start_watching(self, interval: float, on_reload: Optional[Callable[[Set[str]], None]] = None):
+        """Reload in the background whenever patterns.json or the knowledge base changes on disk.
+        
+        on_reload, if given, receives the texts returned by reload().
+        """
+        if self.watcher is not None or interval <= 0:
+            return
+        
+        def reload_files():
+            try:
+                stale = self.reload()
+            except (OSError, ValueError) as e:
+                # Typically a half-edited file; the next save triggers another reload
+                logging.getLogger('AmmaarBhaiChatBot').error(
+                    "Pattern reload failed, keeping snapshot %d: %s", self.snapshot.version, e
+                )
+                return
+            if on_reload is not None:
+                on_reload(stale)
+        
+        self.watcher = FileWatcher(
+            [self.patterns_file, getattr(self.config, 'knowledge_file', '')],
+            reload_files,
+            interval
+        )
+        self.watcher.start()
 
-    def load_patterns(self):
-        """Reload patterns from file"""
-        self.patterns = self._load_patterns(self.config.patterns_file)
-        self.knowledge_base = self._load_knowledge_base()
-        self.match_cache = {}
+    def stop_watching(self):
+        """Stop the file watcher (waits for a reload in progress)"""
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def add_pattern(self, name: str, data: Dict):
+        """Journal a new pattern entry and index it in place"""
+        self.store.append_pattern(name, data)
+        with self.lock:
+            self._apply_change(self.snapshot, "add", name, data)
+            if self._changes_during_reload is not None:
+                self._changes_during_reload.append(("add", name, data))
+            entries = self.match_cache.items()
+        self._invalidate({name: data}, set(), False, entries)
+
+    def add_response(self, name: str, response: str):
+        """Journal an extra response for an existing pattern"""
+        self.store.append_response(name, response)
+        # Cached matches hold pattern ids, so nothing needs invalidating
+        with self.lock:
+            self._apply_change(self.snapshot, "merge", name, response)
+            if self._changes_during_reload is not None:
+                self._changes_during_reload.append(("merge", name, response))
+
+    @staticmethod
+    def _apply_change(snapshot: PatternSnapshot, op: str, name: str, value):
+        """Apply a learned change to a snapshot unless it already has it (caller holds the lock)"""
+        if op == "add":
+            if name in snapshot.patterns:
+                return  # The reload read it from the journal
+            snapshot.patterns[name] = value
+            snapshot.compiled.add(name, value)
+            snapshot.tag_index.add(name, value)
+            if name.startswith("learned_") and value.get("normalized"):
+                snapshot.duplicate_index.add(name, value["normalized"])
+        elif name in snapshot.patterns:
+            responses = snapshot.patterns[name].setdefault("responses", [])
+            if value not in responses:
+                responses.append(value)
+
+    @staticmethod
+    def _diff_snapshots(old: PatternSnapshot, new: PatternSnapshot) -> Tuple[Dict, Set[str], bool]:
+        """(changed patterns, removed pattern names, knowledge base changed) between two snapshots"""
+        def match_fields(data):
+            if data is None:
+                return None
+            return (data.get("patterns"), data.get("tags"), data.get("normalized"), data.get("priority"))
+        
+        # Response-only edits need no invalidation: the cache stores pattern ids
+        changed = {
+            name: data for name, data in new.patterns.items()
+            if match_fields(old.patterns.get(name)) != match_fields(data)
+        }
+        removed = set(old.patterns) - set(new.patterns)
+        return changed, removed, old.knowledge_base != new.knowledge_base
+
+    def _invalidate(self, changed: Dict, removed: set, knowledge_changed: bool,
+                    entries: List[Tuple[str, Tuple]]) -> Set[str]:
+        """Drop the cached matches among entries that changed/removed patterns or a new knowledge base could affect.
+        
+        Runs without the locks: entries is a copy of the match cache taken
+        when the change was applied, and an affected entry may still be
+        served until it is dropped, as if the change had landed a moment
+        later. Returns the dropped texts.
+        """
+        if not (changed or removed or knowledge_changed):
+            return set()
+        if len(changed) + len(removed) > MAX_SELECTIVE_INVALIDATION:
+            # A bulk edit: re-checking every entry costs more than refilling the cache
+            self.match_cache.clear()
+            return {text for text, _ in entries}
+        
+        delta_compiled = CompiledPatterns.build(changed)
+        delta_tags = TagIndex.build(changed)
+        
+        def is_affected(text, cached):
+            name, _, match_type, _ = cached
+            if name in changed or name in removed:
+                return True
+            # A new regex/exact hit outranks every later tier
+            if delta_compiled.match(text):
+                return True
+            if match_type in ("regex", "exact"):
+                return False
+            if knowledge_changed:
+                return True
+            if match_type == "knowledge":
+                return False
+            if self.parser and delta_tags.postings:
+                input_tags = set(self.parser.normalize_for_pattern(text).split())
+                if delta_tags.best(input_tags):
+                    return True
+            if match_type == "semantic":
+                return False
+            cutoff = min(self.config.fuzzy_match_threshold, 60)
+            return any(self.similarity.scores("partial_ratio", text, delta_compiled.literal_phrases, cutoff))
+        
+        dropped = {text for text, cached in entries if is_affected(text, cached)}
+        self.match_cache.discard(dropped)
+        return dropped
 
     def _load_knowledge_base(self) -> List[Dict]:
         """Load knowledge base from JSON file"""
         try:
-            if hasattr(self.config, 'knowledge_file'):
-                with open(self.config.knowledge_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
+            return self._read_knowledge_base()
         except Exception as e:
             print(f"[ERROR] Failed to load knowledge base: {e}")
             return []
 
-    def search_knowledge(self, text: str) -> Optional[str]:
+    def _read_knowledge_base(self) -> List[Dict]:
+        """Read the knowledge base file, raising if it cannot be parsed"""
+        if hasattr(self.config, 'knowledge_file'):
+            with open(self.config.knowledge_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return []
+
+    def search_knowledge(self, text: str, snapshot: Optional[PatternSnapshot] = None) -> Optional[str]:
         """Search knowledge base for a match"""
-        if not self.knowledge_base or len(text) < 3:
+        snapshot = snapshot or self.snapshot
+        if not snapshot.knowledge_base or len(text) < 3:
             return None
             
         text = text.lower()
         threshold = getattr(self.config, 'min_knowledge_score', 85)
+        top_k = getattr(self.config, 'knowledge_top_k', 10)
         
         best_score = 0
         best_content = None
         
-        for entry in self.knowledge_base:
+        # BM25 retrieves a small candidate set; fuzzy scores only rerank it
+        index = snapshot.knowledge_index
+        doc_ids = index.search(text, top_k)
+        
+        # Score all candidate tags and contents in one batch per scorer (scores under the cutoffs read 0)
+        tags = [tag for doc_id in doc_ids for tag in index.tags[doc_id]]
+        tag_scores = self.similarity.scores("ratio", text, tags, threshold, reverse=True)
+        if len(text) > 4: # Partial tag matches only count for longer queries
+            partial_scores = self.similarity.scores("partial_ratio", text, tags, 95, reverse=True)
+        else:
+            partial_scores = [0] * len(tags)
+        contents = [index.contents[doc_id] for doc_id in doc_ids]
+        content_scores = self.similarity.scores("token_set_ratio", text, contents, threshold, reverse=True)
+        
+        t = 0
+        for n, doc_id in enumerate(doc_ids):
+            entry = snapshot.knowledge_base[doc_id]
+            
             # 1. Tags Match (Priority) - strict partial ratio
             # We want "VC" to match "Vice Chancellor" tag, but "Delhi University" shouldn't match "Delhi" tag easily
-            for tag in entry.get("tags", []):
+            for _ in index.tags[doc_id]:
                 # ratio is strict exactness, partial_ratio allows "subset"
                 # For tags, we want high relevance.
-                score = fuzz.ratio(tag.lower(), text)
+                score = tag_scores[t]
                 if score >= threshold:
                     return entry["content"] # Immediate return on high tag match
                 
                 # Check partial but with very high threshold
-                p_score = fuzz.partial_ratio(tag.lower(), text)
-                if p_score >= 95 and len(text) > 4: # Only for longer queries
+                p_score = partial_scores[t]
+                t += 1
+                if p_score >= 95:
                      if p_score > best_score:
                         best_score = p_score
                         best_content = entry["content"]
 
             # 2. Content Match (Wildcard)
             # Token Set Ratio: Matches if query words appear in content
-            content_score = fuzz.token_set_ratio(entry["content"].lower(), text)
+            content_score = content_scores[n]
             
             # Penalize if query is "Delhi University" and content has "Delhi" but implies something else?
             # Hard to do without NLP.
@@ -90,12 +370,8 @@ class PatternMatcher:
         return None
     
     def _load_patterns(self, filepath: str) -> Dict:
-        """Load patterns from JSON file"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return self._get_default_patterns()
+        """Load patterns from JSON file plus the learned-pattern journal"""
+        return self.store.load(defaults=self._get_default_patterns())
     
     def _get_default_patterns(self) -> Dict:
         """Default patterns if file doesn't exist"""
@@ -148,14 +424,76 @@ class PatternMatcher:
             }
         }
     
-    def match(self, parsed_input: ParsedInput) -> MatchResult:
-        """Match input against patterns"""
+    def match(self, parsed_input: ParsedInput, scan: Optional[SegmentScan] = None) -> MatchResult:
+        """Match input against patterns, reusing the literal hits of a scan over the same text"""
         text = parsed_input.normalized_text
+        snapshot = self.snapshot
+        if scan is not None and (scan.text != text or scan.index is not snapshot.compiled):
+            scan = None
+        return self._match_text(snapshot, text, scan, parsed=parsed_input)
+    
+    def scan(self, text: str, spans: List[Tuple[int, int]]) -> SegmentScan:
+        """Scan text once for literal hits in the whole text and in each (start, end) segment"""
+        return self.snapshot.compiled.scan(text, spans)
+    
+    def match_segment(self, scan: SegmentScan, i: int) -> MatchResult:
+        """Match segment i of a scan"""
+        snapshot = self.snapshot
+        if scan.index is not snapshot.compiled:
+            # Scanned before a reload: rescan against the current snapshot
+            scan = snapshot.compiled.scan(scan.text, scan.spans)
+        return self._match_text(snapshot, scan.segment(i), scan, i)
+    
+    def _match_text(self, snapshot: PatternSnapshot, text: str, scan: Optional[SegmentScan] = None,
+                    segment: Optional[int] = None, parsed: Optional[ParsedInput] = None) -> MatchResult:
+        # Check cache first (hits and remembered misses)
+        cached = self.match_cache.get(text)
+        if cached is not None:
+            result = self._resolve_cached(cached, snapshot)
+            if result is not None:
+                return result
         
-        # Check cache first
-        if text in self.match_cache:
-            return self.match_cache[text]
+        result = self._match_uncached(text, scan, segment, parsed, snapshot)
+        with self.lock:
+            # A result from a snapshot that was replaced meanwhile must not be cached
+            if snapshot is self.snapshot:
+                self.match_cache.set(text, (
+                    result.pattern_name,
+                    result.confidence,
+                    result.match_type,
+                    result.response if result.match_type == "knowledge" else None
+                ))
+        return result
+    
+    def _resolve_cached(self, cached: Tuple, snapshot: PatternSnapshot) -> Optional[MatchResult]:
+        """Rebuild a MatchResult from a cached pattern id, picking a fresh response.
+        
+        None if the pattern is not in snapshot (cached after a reload this match predates).
+        """
+        name, confidence, match_type, response = cached
+        if match_type == "none":
+            return MatchResult(False, None, "", 0.0, "none")
+        if response is None:
+            data = snapshot.patterns.get(name)
+            if data is None:
+                return None
+            response = self._select_response(data["responses"])
+        return MatchResult(
+            matched=True,
+            response=response,
+            pattern_name=name,
+            confidence=confidence,
+            match_type=match_type
+        )
+    
+    def _match_uncached(self, text: str, scan: Optional[SegmentScan] = None, segment: Optional[int] = None,
+                        parsed: Optional[ParsedInput] = None, snapshot: Optional[PatternSnapshot] = None) -> MatchResult:
+        """Run every matching tier in order; text is the scan's whole text or its given segment.
         
+        parsed, when given, is the parsed form of text and supplies its precomputed tags.
+        Every tier reads the same snapshot (the current one if not given).
+        """
+        snapshot = snapshot or self.snapshot
         best_match = MatchResult(
             matched=False,
             response=None,
@@ -164,55 +502,47 @@ class PatternMatcher:
             match_type="none"
         )
         
-        # Try standard patterns first
-        for name, data in self.patterns.items():
-            for pattern in data.get("patterns", []):
-                if self._is_regex_pattern(pattern):
-                    if re.search(pattern, text, re.IGNORECASE):
-                        result = MatchResult(
-                            matched=True,
-                            response=self._select_response(data["responses"]),
-                            pattern_name=name,
-                            confidence=1.0,
-                            match_type="regex"
-                        )
-                        self.match_cache[text] = result
-                        return result
-                else:
-                    if pattern.lower() in text:
-                        result = MatchResult(
-                            matched=True,
-                            response=self._select_response(data["responses"]),
-                            pattern_name=name,
-                            confidence=1.0,
-                            match_type="exact"
-                        )
-                        self.match_cache[text] = result
-                        return result
+        # Try standard patterns first (compiled regex alternations + literal automaton)
+        with self.metrics.time("match.regex_exact"):
+            if scan is None:
+                hit = snapshot.compiled.match(text)
+            elif segment is None:
+                hit = scan.match_full()
+            else:
+                hit = scan.match_segment(segment)
+        if hit:
+            name, match_type = hit
+            return MatchResult(
+                matched=True,
+                response=self._select_response(snapshot.patterns[name]["responses"]),
+                pattern_name=name,
+                confidence=1.0,
+                match_type=match_type
+            )
         
         # Try Knowledge Base Search (New Layer)
-        kb_result = self.search_knowledge(text)
+        with self.metrics.time("match.knowledge"):
+            kb_result = self.search_knowledge(text, snapshot)
         if kb_result:
-             result = MatchResult(
+             return MatchResult(
                 matched=True,
                 response=kb_result,
                 pattern_name="knowledge_base",
                 confidence=0.9,
                 match_type="knowledge"
             )
-             self.match_cache[text] = result
-             return result
 
         # Try Tag-Based Semantic Matching (New)
         if self.parser:
-            tag_result = self._tag_match(text)
+            with self.metrics.time("match.tag"):
+                tag_result = self._tag_match(text, parsed.tags if parsed else None, snapshot)
             if tag_result.matched:
-                self.match_cache[text] = tag_result
                 return tag_result
 
         # Try fuzzy matching if enabled
         if self.config.use_fuzzy_matching:
-            fuzzy_result = self._fuzzy_match(text)
+            with self.metrics.time("match.fuzzy"):
+                fuzzy_result = self._fuzzy_match(text, snapshot)
             if fuzzy_result.matched:
                 return fuzzy_result
         
@@ -220,26 +550,31 @@ class PatternMatcher:
     
     def _is_regex_pattern(self, pattern: str) -> bool:
         """Check if pattern is regex"""
-        return any(c in pattern for c in r'\[](){}^$.*+?|')
+        return is_regex_pattern(pattern)
     
-    def _fuzzy_match(self, text: str) -> MatchResult:
+    def _fuzzy_match(self, text: str, snapshot: Optional[PatternSnapshot] = None) -> MatchResult:
         """Perform fuzzy matching"""
+        snapshot = snapshot or self.snapshot
         best_score = 0
         best_match = None
         
-        for name, data in self.patterns.items():
-            for pattern in data.get("patterns", []):
-                if not self._is_regex_pattern(pattern):
-                    score = fuzz.partial_ratio(text, pattern.lower())
-                    
-                    # Use lower threshold for learned patterns
-                    threshold = self.config.fuzzy_match_threshold
-                    if name.startswith("learned_"):
-                        threshold = min(threshold, 60) # Lower for learned
-                        
-                    if score > best_score and score >= threshold:
-                        best_score = score
-                        best_match = (name, data)
+        # One batch call over every phrase; only scores that can pass a threshold come back non-zero
+        literals = snapshot.compiled.literals
+        cutoff = min(self.config.fuzzy_match_threshold, 60)
+        scores = self.similarity.scores("partial_ratio", text, snapshot.compiled.literal_phrases, cutoff)
+        
+        for (name, _), score in zip(literals, scores):
+            if not score:
+                continue
+            
+            # Use lower threshold for learned patterns
+            threshold = self.config.fuzzy_match_threshold
+            if name.startswith("learned_"):
+                threshold = min(threshold, 60) # Lower for learned
+                
+            if score > best_score and score >= threshold:
+                best_score = score
+                best_match = (name, snapshot.patterns[name])
         
         if best_match:
             return MatchResult(
@@ -252,66 +587,36 @@ class PatternMatcher:
         
         return MatchResult(False, None, "", 0.0, "none")
 
-    def _tag_match(self, text: str) -> MatchResult:
+    def _tag_match(self, text: str, input_tags: Optional[FrozenSet[str]] = None,
+                   snapshot: Optional[PatternSnapshot] = None) -> MatchResult:
         """Match based on semantic tags rather than full text"""
         if not self.parser:
             return MatchResult(False, None, "", 0.0, "none")
             
-        # Get tags from input
-        input_normalized = self.parser.normalize_for_pattern(text)
-        input_tags = set(input_normalized.split())
+        # Get tags from input (parsed input arrives with them already computed)
+        if input_tags is None:
+            input_tags = set(self.parser.normalize_for_pattern(text).split())
         
         if not input_tags:
             return MatchResult(False, None, "", 0.0, "none")
             
-        best_score = 0
-        best_match = None
-        
-        for name, data in self.patterns.items():
-            # Get tags from pattern data
-            pattern_tags = data.get("tags")
-            if not pattern_tags:
-                # Fallback: create tags from normalized if available
-                norm = data.get("normalized")
-                if norm:
-                    pattern_tags = norm.split()
-            
-            if not pattern_tags:
-                continue
-                
-            pattern_tags_set = set(pattern_tags)
-            
-            # Calculate Jaccard similarity (Intersection over Union)
-            intersection = input_tags & pattern_tags_set
-            union = input_tags | pattern_tags_set
-            
-            if not union:
-                continue
-                
-            score = len(intersection) / len(union)
-            
-            # Weighted score: count matches relative to pattern tags
-            # We want "linux distro" to match "linux distro best" well
-            recall = len(intersection) / len(pattern_tags_set)
-            
-            # Combined score
-            final_score = (score * 0.4) + (recall * 0.6)
-            
-            if final_score > best_score:
-                best_score = final_score
-                best_match = (name, data)
+        # Score only patterns that share at least one tag with the input
+        snapshot = snapshot or self.snapshot
+        hit = snapshot.tag_index.best(input_tags)
+        if not hit:
+            return MatchResult(False, None, "", 0.0, "none")
+        best_name, best_score = hit
         
         # Dynamic threshold for semantic matching
         base_threshold = 0.7
-        best_name = best_match[0] if best_match else ""
         if best_name.startswith("learned_"):
             base_threshold = 0.6 # Lower for learned
             
-        if best_match and best_score >= base_threshold:
+        if best_score >= base_threshold:
             return MatchResult(
                 matched=True,
-                response=self._select_response(best_match[1]["responses"]),
-                pattern_name=best_match[0],
+                response=self._select_response(snapshot.patterns[best_name]["responses"]),
+                pattern_name=best_name,
                 confidence=best_score,
                 match_type="semantic"
             )
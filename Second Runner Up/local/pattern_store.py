@@ -0,0 +1,226 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from utils.file_watcher import Signature, file_signature
+
+# (patterns.json, compacting journal, journal) signatures a load reflected
+Position = Tuple[Signature, Signature, Signature]
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive advisory lock on path, held until the block exits (no-op where fcntl is missing)"""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield  # Closing the file releases the lock
+
+
+class PatternStore:
+    """patterns.json snapshot plus an append-only journal of learned changes.
+
+    Learning appends one JSON line to the journal instead of rewriting the
+    whole patterns file. Once the journal grows past `compact_threshold`
+    records it is folded back into patterns.json by a background thread.
+    Every read or write of the files holds `locked()`, which also excludes
+    other processes using the same patterns file (e.g. the deduplicator).
+    """
+
+    def __init__(self, patterns_file: str, journal_file: Optional[str] = None, compact_threshold: int = 200):
+        self.patterns_file = patterns_file
+        self.journal_file = journal_file or os.path.splitext(patterns_file)[0] + ".journal.jsonl"
+        self.compacting_file = self.journal_file + ".compacting"
+        self.lock_file = patterns_file + ".lock"
+        self.compact_threshold = compact_threshold
+        self.journal_records = 0
+        self.defaults: Optional[Dict] = None
+        self.lock = threading.RLock()
+        self._lock_depth = 0
+        self._compactor: Optional[threading.Thread] = None
+
+    @contextmanager
+    def locked(self):
+        """Hold the store against other threads and other processes (re-entrant within a thread)"""
+        with self.lock:
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    directory = os.path.dirname(self.lock_file)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    with _file_lock(self.lock_file):
+                        yield
+                else:
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    def load(self, defaults: Optional[Dict] = None) -> Dict:
+        """Load the snapshot and replay any journal records on top of it"""
+        self.defaults = defaults
+        # Locked so a compaction running meanwhile is seen either before or after it lands
+        with self.locked():
+            data = self._read_snapshot(defaults)
+
+            # A journal being compacted when the process stopped is replayed too
+            self._replay(self.compacting_file, data)
+            self.journal_records = self._replay(self.journal_file, data)
+        return data
+
+    def load_at(self, defaults: Optional[Dict] = None) -> Tuple[Dict, Position]:
+        """load() plus the position it reflects, for replay_since() after working on the data unlocked"""
+        with self.locked():
+            return self.load(defaults), self._position()
+
+    def replay_since(self, position: Position, data: Dict, aliases: Optional[Dict[str, str]] = None) -> bool:
+        """Apply records journaled since load_at() returned position to data.
+        
+        Merges into entries renamed by aliases (old name -> new name) follow
+        the rename. Returns False, leaving data alone, if a compaction or
+        rewrite since then folded those records out of the journal. The
+        caller holds locked() through this and the rewrite that follows.
+        """
+        current = self._position()
+        if current[:2] != position[:2]:
+            return False
+        journal = position[2]
+        if journal is None:
+            offset = 0  # Created since
+        elif current[2] is not None and current[2][0] == journal[0]:
+            offset = journal[1]  # Same file, appended to since
+        else:
+            return False
+        self._replay(self.journal_file, data, offset, aliases)
+        return True
+
+    def append_pattern(self, name: str, entry: Dict):
+        """Journal a newly learned pattern entry"""
+        self._append({"op": "add", "name": name, "data": entry})
+
+    def append_response(self, name: str, response: str):
+        """Journal an extra response merged into an existing pattern"""
+        self._append({"op": "merge", "name": name, "response": response})
+
+    def rewrite(self, data: Dict):
+        """Atomically replace the snapshot with data and drop the journal.
+        
+        Callers that computed data from load() must hold locked() across
+        both, or records journaled in between are lost.
+        """
+        with self.locked():
+            self._write_snapshot(data)
+            for path in (self.compacting_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.journal_records = 0
+
+    def compact(self):
+        """Fold the journal into patterns.json"""
+        with self.locked():
+            if os.path.exists(self.compacting_file):
+                pass  # Left over from an interrupted compaction; fold it in first
+            elif os.path.exists(self.journal_file):
+                # New appends go to a fresh journal while the old one is folded in
+                os.replace(self.journal_file, self.compacting_file)
+                self.journal_records = 0
+            else:
+                return
+
+        try:
+            while True:
+                signature = file_signature(self.patterns_file)
+                data = self._read_snapshot(self.defaults)
+                self._replay(self.compacting_file, data)
+                with self.locked():
+                    if not os.path.exists(self.compacting_file):
+                        return  # Folded in by a rewrite meanwhile
+                    if file_signature(self.patterns_file) != signature:
+                        continue  # patterns.json was rewritten meanwhile: fold into the new one
+                    self._write_snapshot(data)
+                    os.remove(self.compacting_file)
+                    return
+        except Exception as e:
+            logging.getLogger('AmmaarBhaiChatBot').error("Pattern journal compaction failed: %s", e)
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="pattern-compactor", daemon=True)
+        self._compactor.start()
+
+    def close(self):
+        """Wait for a running compaction to finish"""
+        if self._compactor:
+            self._compactor.join()
+
+    def _append(self, record: Dict):
+        with self.locked():
+            directory = os.path.dirname(self.journal_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records += 1
+
+        if self.journal_records >= self.compact_threshold:
+            self.compact_in_background()
+
+    def _read_snapshot(self, defaults: Optional[Dict] = None) -> Dict:
+        try:
+            with open(self.patterns_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return dict(defaults or {})
+
+    def _write_snapshot(self, data: Dict):
+        tmp_path = self.patterns_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.patterns_file)
+
+    def _position(self) -> Position:
+        return (
+            file_signature(self.patterns_file),
+            file_signature(self.compacting_file),
+            file_signature(self.journal_file)
+        )
+
+    @staticmethod
+    def _replay(path: str, data: Dict, offset: int = 0, aliases: Optional[Dict[str, str]] = None) -> int:
+        """Apply journal records from byte offset of path on to data, returning the record count"""
+        if not os.path.exists(path):
+            return 0
+
+        count = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from an interrupted write
+
+                if record.get("op") == "add":
+                    data[record["name"]] = record["data"]
+                elif record.get("op") == "merge":
+                    name = (aliases or {}).get(record.get("name"), record.get("name"))
+                    if name in data:
+                        responses = data[name].setdefault("responses", [])
+                        if record["response"] not in responses:
+                            responses.append(record["response"])
+                count += 1
+        return count
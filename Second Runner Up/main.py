@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 from pathlib import Path
 import threading
 
@@ -106,20 +107,12 @@ class ChatbotCLI:
                     continue
                 
                 # Get response (shows typing indicator if enabled, then processes)
-                response = self.chatbot.process_input(user_input)
-                
-                # Extract source if available (format: [SOURCE]response)
-                source = None
-                if response.startswith('[') and ']' in response:
-                    end_bracket = response.index(']')
-                    source = response[1:end_bracket]
-                    response = response[end_bracket+1:].strip()
+                if self.config.stream_responses:
+                    self.stream_response(user_input)
+                    continue
                 
-                # Display response: source in grey, Bot in green, rest normal
-                if source:
-                    print(f"{Colors.LIGHT_GRAY}[{source}]{Colors.RESET} {Colors.GREEN}Bot:{Colors.RESET} {response}")
-                else:
-                    print(f"{Colors.GREEN}Bot:{Colors.RESET} {response}")
+                response = self.chatbot.process_input(user_input)
+                print(self.format_response_line(response.rstrip()))
         
         except KeyboardInterrupt:
             print("\n")
@@ -130,6 +123,32 @@ class ChatbotCLI:
             self.ui.print_system_message(f"Fatal error: {e}", "ERROR")
             self.shutdown()
     
+    def stream_response(self, user_input: str):
+        """Print a response chunk by chunk as it is generated"""
+        first = True
+        for chunk in self.chatbot.process_input_stream(user_input):
+            if first:
+                # The first chunk carries the source prefix
+                print(self.format_response_line(chunk), end="", flush=True)
+                first = False
+            else:
+                print(chunk, end="", flush=True)
+        print()
+    
+    def format_response_line(self, response: str) -> str:
+        """Render a response with its grey source tag and green Bot label"""
+        # Extract source if available (format: [SOURCE]response)
+        source = None
+        if response.startswith('[') and ']' in response:
+            end_bracket = response.index(']')
+            source = response[1:end_bracket]
+            response = response[end_bracket+1:].lstrip()  # Trailing space may join the next chunk
+        
+        # Display response: source in grey, Bot in green, rest normal
+        if source:
+            return f"{Colors.LIGHT_GRAY}[{source}]{Colors.RESET} {Colors.GREEN}Bot:{Colors.RESET} {response}"
+        return f"{Colors.GREEN}Bot:{Colors.RESET} {response}"
+    
     def handle_command(self, command: str) -> bool:
         """Handle special commands"""
         cmd = command.lower()
@@ -205,11 +224,26 @@ Features:
         print(f"   Local Responses:   {stats['local_responses']}")
         print(f"   AI Responses:      {stats['ai_responses']}")
         print(f"   Cache Hits:        {stats['cache_hits']}")
+        print(f"   AI Errors:         {stats['ai_errors']} ({stats['ai_retries']} retries)")
         print(f"   Errors:            {stats['errors']}")
         print(f"\nPerformance:")
         print(f"   Uptime:            {stats['uptime_seconds']:.1f}s")
         print(f"   Cache Size:        {stats['cache_size']} entries")
+        print(f"   Match Cache:       {stats['match_cache_size']} entries "
+              f"({stats['match_cache_hits']} hits, {stats['match_cache_misses']} misses, "
+              f"{stats['match_cache_evictions']} evictions)")
+        print(f"   Semantic Cache:    {stats['semantic_cache_size']} entries ({stats['semantic_cache_hits']} hits)")
         print(f"   History Length:    {stats['history_length']} exchanges")
+        print(f"   Rate Limit:        {stats['rate_limit_tokens']}/{stats['rate_limit_capacity']} tokens, "
+              f"{stats['rate_limit_queue']} queued")
+        print(f"   AI Circuit:        {stats['circuit_state']} ({stats['circuit_failures']} consecutive failures)")
+        
+        if stats['latency']:
+            print(f"\nLatency (ms):")
+            print(f"   {'Stage':<20}{'Count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+            for stage, timing in stats['latency'].items():
+                print(f"   {stage:<20}{timing['count']:>7}{timing['p50_ms']:>10.2f}"
+                      f"{timing['p95_ms']:>10.2f}{timing['p99_ms']:>10.2f}")
     
     def show_config(self):
         """Show configuration"""
@@ -279,13 +313,58 @@ Features:
         self.running = False
         sys.exit(0)
 
+def run_batch(args) -> int:
+    """Answer queries from a file (or stdin) and write one JSON result per line"""
+    import json
+    from core.batch_runner import BatchRunner, read_queries
+    
+    config = ChatbotConfig()
+    # Batch queries are independent: no shared conversation context or history
+    config.enable_context = False
+    config.save_conversations = False
+    # Queue for the rate limiter as long as needed instead of giving up
+    config.rate_limit_max_wait = None
+    
+    chatbot = HybridChatbot(config, user_override=args.user)
+    if not chatbot.initialize(os.environ.get("GEMINI_API_KEY")):
+        return 1
+    
+    if args.batch == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            queries = read_queries(f)
+    
+    start = time.perf_counter()
+    records = BatchRunner(chatbot, workers=args.workers).run(queries)
+    elapsed = time.perf_counter() - start
+    
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    chatbot.shutdown()
+    print(f"Answered {len(records)} queries in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
 def main():
     """Entry point"""
     import argparse
     parser = argparse.ArgumentParser(description="AIMA ChatBot")
     parser.add_argument("--user", type=str, help="Override user identity", default=None)
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="Answer queries from FILE (or stdin), one per line or JSONL, and print JSONL results")
+    parser.add_argument("--output", metavar="FILE", help="Write batch results to FILE instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for local matching in batch mode")
     args = parser.parse_args()
 
+    if args.batch is not None:
+        sys.exit(run_batch(args))
+
     cli = ChatbotCLI(user_override=args.user)
     cli.print_banner()
     cli.setup()
@@ -0,0 +1,71 @@
+import sys
+import os
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import ChatbotConfig
+from core.chatbot import HybridChatbot
+from core.chat_server import ChatServer
+from ai.fake_client import FakeGeminiClient
+
+
+async def serve(chatbot: HybridChatbot, args) -> None:
+    server = ChatServer(chatbot)
+    listener = await server.start(args.host, args.port, args.unix)
+    for sock in listener.sockets:
+        print(f"AIMA server listening on {sock.getsockname()}", file=sys.stderr)
+
+    # Stop on Ctrl+C / SIGTERM, then drain open requests
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: KeyboardInterrupt ends asyncio.run instead
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down server...", file=sys.stderr)
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIMA ChatBot multi-session server")
+    parser.add_argument("--host", help="Address to listen on (default: config.server_host)")
+    parser.add_argument("--port", type=int, help="TCP port (default: config.server_port)")
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--fake-ai", nargs="?", const=0.0, type=float, metavar="MS",
+                        help="Answer AI fallbacks with a local fake after MS milliseconds (no API key needed)")
+    args = parser.parse_args()
+
+    config = ChatbotConfig()
+    config.save_conversations = False  # Sessions keep their history in memory
+    chatbot = HybridChatbot(config)
+
+    if args.fake_ai is not None:
+        initialized = chatbot.initialize(None)
+        chatbot.gemini_client = FakeGeminiClient(config, args.fake_ai / 1000.0)
+    else:
+        initialized = chatbot.initialize(os.environ.get("GEMINI_API_KEY"))
+    if not initialized:
+        print("Failed to initialize chatbot", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        asyncio.run(serve(chatbot, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # A second Ctrl+C must not cut the final profile and log writes short
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        chatbot.shutdown()
+
+
+if __name__ == "__main__":
+    main()
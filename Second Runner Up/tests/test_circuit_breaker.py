@@ -0,0 +1,100 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import ChatbotConfig
+from ai.gemini_client import GeminiClient, AIError
+from utils.circuit_breaker import CircuitBreaker
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the run
+    breaker.record_failure()
+    assert breaker.stats() == {"state": "closed", "failures": 1}
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # The trial is still in flight
+
+    breaker.release()  # Settled without an outcome: another trial may go
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+class FlakyModels:
+    """Stands in for client.models: a 503 for the first `failures` calls, then an answer"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("503 UNAVAILABLE: model overloaded")
+        return "answer"
+
+
+def _client(failures, **overrides):
+    config = ChatbotConfig(log_to_file=False, retry_delay=0.001, retry_max_delay=0.001, **overrides)
+    client = GeminiClient(config)
+    client.client = SimpleNamespace(models=FlakyModels(failures))
+    client.initialized = True
+    return client
+
+
+def test_transient_errors_are_retried():
+    client = _client(failures=2, max_retries=3)
+    result = client.generate_response("hi")
+    assert result.ok and result.text == "answer"
+    assert result.attempts == 3
+    assert client.breaker.stats() == {"state": "closed", "failures": 0}
+
+
+def test_exhausted_retries_count_once_towards_the_breaker():
+    client = _client(failures=100, max_retries=2, circuit_failure_threshold=2)
+    result = client.generate_response("hi")
+    assert result.error == AIError.UNAVAILABLE
+    assert client.client.models.calls == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+    client.generate_response("hi")
+    assert client.breaker.state == CircuitBreaker.OPEN
+    result = client.generate_response("hi")  # Answered without calling the API
+    assert result.error == AIError.CIRCUIT_OPEN
+    assert client.client.models.calls == 6
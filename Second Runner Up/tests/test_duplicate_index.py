@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.duplicate_index import DuplicateIndex
+
+
+def test_finds_near_duplicates_only():
+    index = DuplicateIndex.build({
+        "learned_1": {"normalized": "what is the library timing"},
+        "learned_2": {"normalized": "who is the vice chancellor"},
+        "greeting": {"normalized": "what is the library timing"},  # Not learned: not indexed
+    })
+    assert len(index) == 2
+    assert index.find("what is the library timings") == "learned_1"
+    assert index.find("hostel fee structure") is None
+
+
+def test_earliest_live_pattern_wins_after_removals():
+    index = DuplicateIndex()
+    for name in ("a", "b", "c"):
+        index.add(name, "library timing today")
+    index.remove("a")
+    index.add("d", "library timing today")
+    assert len(set(index.order.values())) == len(index.order)
+    assert index.find("library timing today") == "b"
+
+    index.remove("b")
+    index.remove("c")
+    index.add("b", "library timing today")  # Re-added: now the newest
+    assert index.find("library timing today") == "d"
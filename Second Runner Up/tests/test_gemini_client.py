@@ -0,0 +1,20 @@
+import sys
+import asyncio
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import ChatbotConfig
+from ai.fake_client import FakeGeminiClient
+
+
+def test_concurrency_limit_works_on_every_event_loop():
+    client = FakeGeminiClient(ChatbotConfig(max_concurrent_requests=1), latency=0.01)
+
+    async def burst():
+        # More calls than the limit, so they queue on the semaphore
+        return await asyncio.gather(*(client.agenerate_response("q") for _ in range(3)))
+
+    for _ in range(2):
+        assert len(asyncio.run(burst())) == 3
@@ -0,0 +1,82 @@
+import sys
+import json
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.history_log import HistoryLog
+
+
+def _entries(n, start=0):
+    return [{"user": f"question {i}", "bot": f"answer {i}"} for i in range(start, start + n)]
+
+
+def _log(tmp_path, **overrides):
+    options = {"keep": 50, "flush_interval": 0.01}
+    options.update(overrides)
+    return HistoryLog(str(tmp_path / "history.jsonl"), **options)
+
+
+def test_appends_are_written_on_close(tmp_path):
+    log = _log(tmp_path)
+    log.start()
+    for entry in _entries(5):
+        log.append(entry)
+    log.close()
+    assert log.tail(10) == _entries(5)
+    assert log.tail(2) == _entries(2, start=3)
+    assert log.tail(0) == []
+
+
+def test_tail_reads_backwards_across_blocks(tmp_path):
+    log = _log(tmp_path, keep=1000)
+    entries = [{"user": "x" * 500, "bot": str(i)} for i in range(100)]  # About 50KB: several blocks
+    log.start()
+    for entry in entries:
+        log.append(entry)
+    log.close()
+    assert log.tail(37) == entries[-37:]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    log = _log(tmp_path)
+    log.start()
+    for entry in _entries(3):
+        log.append(entry)
+    log.close()
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"user": "interrupt')
+    assert log.tail(5) == _entries(3)
+
+
+def test_compaction_keeps_the_newest_records(tmp_path):
+    log = _log(tmp_path, keep=10, compact_threshold=25)
+    log.start()
+    for entry in _entries(30):
+        log.append(entry)
+    log.close()
+    with open(log.path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) < 30
+    assert log.tail(10) == _entries(10, start=20)
+
+
+def test_clear_drops_earlier_entries_only(tmp_path):
+    log = _log(tmp_path)
+    log.start()
+    for entry in _entries(3):
+        log.append(entry)
+    log.clear()
+    log.append(_entries(1, start=9)[0])
+    log.close()
+    assert log.tail(10) == _entries(1, start=9)
+
+
+def test_legacy_json_array_is_imported(tmp_path):
+    legacy = tmp_path / "conversation_history.json"
+    legacy.write_text(json.dumps(_entries(60)))
+    log = _log(tmp_path)
+    assert log.import_legacy(str(legacy))
+    assert log.tail(100) == _entries(50, start=10)
+    assert not log.import_legacy(str(legacy))  # The log exists now
@@ -0,0 +1,77 @@
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import ChatbotConfig
+from core.input_parser import InputParser
+from local.pattern_matcher import PatternMatcher
+from utils.cache import LRUCache
+
+PATTERNS = {
+    "library": {"patterns": [r"\blibrary\b.*\btimings?\b"], "responses": ["9 to 5"], "priority": 5},
+}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # b is now the oldest
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.items() == [("a", 1), ("c", 3)]
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 2, "max_size": 2}
+
+
+def test_lru_discard_and_update():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)  # An update, not an insert: nothing evicted
+    cache.discard(["b", "missing"])
+    assert cache.items() == [("a", 10)]
+    assert cache.stats()["evictions"] == 0
+
+
+@pytest.fixture
+def matcher(tmp_path):
+    patterns_file = tmp_path / "patterns.json"
+    knowledge_file = tmp_path / "knowledge_base.json"
+    patterns_file.write_text(json.dumps(PATTERNS))
+    knowledge_file.write_text("[]")
+    config = ChatbotConfig(
+        base_dir=tmp_path,
+        patterns_file=str(patterns_file),
+        patterns_journal_file=str(tmp_path / "patterns.journal.jsonl"),
+        knowledge_file=str(knowledge_file),
+        log_to_file=False
+    )
+    return PatternMatcher(config, config.patterns_file, parser=InputParser(config))
+
+
+def _match(matcher, text):
+    return matcher.match(matcher.parser.parse(text))
+
+
+def test_hits_are_cached_by_pattern_id(matcher):
+    first = _match(matcher, "library timings please")
+    assert first.matched and first.pattern_name == "library"
+    assert _match(matcher, "library timings please").response == "9 to 5"
+    assert matcher.match_cache.stats()["hits"] == 1
+
+
+def test_misses_are_cached_until_a_pattern_could_match(matcher):
+    assert not _match(matcher, "canteen menu today").matched
+    assert not _match(matcher, "canteen menu today").matched
+    assert matcher.match_cache.stats()["hits"] == 1
+
+    # Learning a pattern drops only the cached misses it could now answer
+    _match(matcher, "library timings please")
+    matcher.add_pattern("canteen", {"patterns": [r"\bcanteen\b"], "responses": ["Open till 10"], "priority": 5})
+    assert [text for text, _ in matcher.match_cache.items()] == ["library timings please"]
+    assert _match(matcher, "canteen menu today").response == "Open till 10"
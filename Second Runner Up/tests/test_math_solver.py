@@ -0,0 +1,66 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.math_solver import MathSolver
+
+
+@pytest.fixture
+def solver():
+    return MathSolver()
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 + 2", "4"),
+    ("2^10", "1024"),
+    ("10 / 4", "2.5"),
+    ("7 x 6", "42"),
+    ("-(3 - 5) * 2", "4"),
+    ("2 ** -1", "0.5"),
+    ("(-1) ** 999999999999", "-1"),
+    ("2 ** 4000", str(2 ** 4000)),
+])
+def test_solves_within_limits(solver, expression, expected):
+    assert solver.solve(expression)[1] == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "9 ** 9 ** 9",
+    "2 ** 5000",
+    "(2 ** 4000) * (2 ** 4000)",
+    "10 ** 10 ** 10 % 7",
+    "1" * 1300 + " + 1",
+])
+def test_oversized_results_are_refused_quickly(solver, expression):
+    start = time.perf_counter()
+    result, reason = solver.solve(expression)
+    assert result is None
+    assert reason.startswith("too large to calculate")
+    assert time.perf_counter() - start < 0.5
+
+
+def test_work_budget_bounds_a_chain_of_operations():
+    solver = MathSolver(max_work=50)
+    chain = " * ".join(["(2 ** 3000)"] + ["1"] * 60)
+    assert solver.solve(chain) == (None, "too large to calculate (it needs too many steps)")
+    assert MathSolver().solve(chain)[1] == str(2 ** 3000)
+
+
+def test_float_overflow_is_reported(solver):
+    assert solver.solve("10.0 ** 400") == (None, "too large to calculate (it is outside the floating-point range)")
+
+
+@pytest.mark.parametrize("expression", ["2 +", "abc", "__import__('os')", "1 / 0", "(1, 2)"])
+def test_invalid_expressions(solver, expression):
+    assert solver.solve(expression) is None
+
+
+def test_parsed_expressions_are_cached(solver):
+    solver.solve("3 * 3")
+    solver.solve("3 * 3")
+    assert solver.ast_cache.stats()["hits"] == 1
@@ -0,0 +1,113 @@
+import re
+import sys
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from local.pattern_index import CompiledPatterns, RegexCascade, _required_literals
+
+FLAGS = re.IGNORECASE
+
+# Escapes that spell characters with more than one pattern character, next to plain text
+ESCAPE_PATTERNS = [
+    r"\x41bcd", r"\101qrs", r"\u0041xyz", r"\U00000041uvw", r"\N{LATIN SMALL LETTER A}lpha",
+    r"(\w+) \1abc", r"\0zero", r"tab\tstop", r"\bword\b\s+next", r"c\+\+\ help", r"what\'s\ up",
+    r"[\x41-\x43]def", r"(?:\x41|b)ghi", r"\Afront", r"back\Z", r"\d\d\dnum"
+]
+ESCAPE_TEXTS = [
+    "abcd", "Aqrs", "axyz", "auvw", "alpha", "foo fooabc", "\0zero", "tab\tstop", "word  next",
+    "c++ help", "what's up", "bdef", "aghi", "front matter", "go back", "123num", "nothing here"
+]
+
+WORDS = [f"w{i}" for i in range(60)] + ["capital", "india", "c++", "what's", "a.b", "class", "kiwi", "w10x"]
+# Non-ASCII spellings IGNORECASE matches to ASCII letters
+TEXT_WORDS = WORDS + ["x", "é", "CAPİTAL", "claſſ", "KIWI", "ındia", "W10"]
+
+
+def _random_pattern(rng: random.Random) -> str:
+    a, b = (re.escape(word) for word in rng.sample(WORDS, 2))
+    return rng.choice([
+        rf"\b{a}\b.*\b{b}\b",
+        rf"\b({a}|{b})\b",
+        rf"^{a}\s+\w+$",
+        r"(\w+) \1",
+        rf"{a}.*?{b}",
+        rf"\b{a}s?\b",
+        rf"(?:what|how) .*{a}",
+        rf"\x77{a[1:]}.*{b}",
+    ])
+
+
+def _naive(patterns, text):
+    """Rank of the first pattern re.search finds in text: what the cascade must return"""
+    return next(((0, i, 0) for i, pattern in enumerate(patterns) if re.search(pattern, text, FLAGS)), None)
+
+
+def _cascade(patterns, searches_between=()):
+    cascade = RegexCascade(FLAGS)
+    for i, pattern in enumerate(patterns):
+        cascade.add(pattern, (0, i, 0))
+        if i in searches_between:
+            cascade.search("warm up")  # Compile part way through, as learning between queries does
+    return cascade
+
+
+def test_escapes_match_like_re_search():
+    cascade = _cascade(ESCAPE_PATTERNS)
+    for text in ESCAPE_TEXTS:
+        assert cascade.search(text) == _naive(ESCAPE_PATTERNS, text), text
+
+
+@pytest.mark.parametrize("pattern", ESCAPE_PATTERNS)
+def test_each_escape_pattern_alone(pattern):
+    cascade = _cascade([pattern])
+    for text in ESCAPE_TEXTS:
+        assert cascade.search(text) == _naive([pattern], text), (pattern, text)
+
+
+def test_compiled_patterns_match_escaped_regexes():
+    index = CompiledPatterns.build({"hex": {"patterns": [r"\x41bcd"]}, "octal": {"patterns": [r"\101qrs"]}})
+    assert index.match("abcd") == ("hex", "regex")
+    assert index.match("aqrs") == ("octal", "regex")
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_cascade_matches_a_naive_scan(seed):
+    rng = random.Random(seed)
+    patterns = [_random_pattern(rng) for _ in range(rng.randint(1, 600))]
+    searches_between = {i for i in range(len(patterns)) if rng.random() < 0.01}
+    cascade = _cascade(patterns, searches_between)
+    for _ in range(100):
+        text = " ".join(rng.choices(TEXT_WORDS, k=rng.randint(1, 8)))
+        assert cascade.search(text) == _naive(patterns, text), text
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"\bcapital.*india\b", ["capital"]),
+    (r"\bvice\ chancellor.*fee\b", ["vice chancellor"]),
+    (r"\b(greetings|howdy)\b", ["greetings", "howdy"]),
+    (r"\b(hello|hi|hey)\b", None),
+    (r"colou?r.*timings", ["timings"]),
+    (r"abc|def", None),
+    (r"(?x)abc", None),
+    (r"\x41bcd", None),
+    (r"\101qrs", None),
+])
+def test_required_literals(pattern, expected):
+    assert _required_literals(pattern) == expected
+
+
+def test_higher_priority_wins_across_tiers():
+    index = CompiledPatterns.build({
+        "low": {"patterns": ["library"], "priority": 0},
+        "high": {"patterns": [r"\blibrary\b.*\btimings\b"], "priority": 5},
+        "first": {"patterns": [r"\blibrary\b"], "priority": 5},
+    })
+    assert index.match("library timings") == ("high", "regex")
+    assert index.match("the library") == ("first", "regex")
+    assert index.match("libraryx") == ("low", "exact")
+    assert index.match("nothing") is None
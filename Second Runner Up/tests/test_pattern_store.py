@@ -0,0 +1,97 @@
+import sys
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from local.pattern_store import PatternStore
+
+BASE = {"greetings": {"patterns": ["hello"], "responses": ["Hi!"]}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    patterns_file = tmp_path / "patterns.json"
+    patterns_file.write_text(json.dumps(BASE))
+    # A high threshold: tests compact explicitly
+    store = PatternStore(str(patterns_file), compact_threshold=1000)
+    yield store
+    store.close()
+
+
+def _snapshot(store):
+    with open(store.patterns_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_appends_are_journaled_not_rewritten(store):
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    store.append_response("greetings", "Hello there!")
+    assert _snapshot(store) == BASE
+    assert store.journal_records == 2
+
+    data = store.load()
+    assert data["learned_1"]["responses"] == ["9 to 5"]
+    assert data["greetings"]["responses"] == ["Hi!", "Hello there!"]
+
+
+def test_compaction_folds_the_journal_in(store):
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    expected = store.load()
+    store.compact()
+    assert _snapshot(store) == expected
+    assert not os.path.exists(store.journal_file)
+    assert not os.path.exists(store.compacting_file)
+    assert store.load() == expected
+
+
+def test_interrupted_compaction_is_replayed_and_finished(store):
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    os.replace(store.journal_file, store.compacting_file)  # Stopped before folding it in
+    store.append_pattern("learned_2", {"patterns": ["hostel"], "responses": ["Block C"]})
+    assert {"learned_1", "learned_2"} <= set(store.load())
+
+    store.compact()
+    assert "learned_1" in _snapshot(store)
+    assert "learned_2" in store.load()
+
+
+def test_torn_final_line_is_skipped(store):
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    with open(store.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "name": "learned_2", "da')
+    assert set(store.load()) == {"greetings", "learned_1"}
+
+
+def test_compacts_in_background_past_the_threshold(tmp_path):
+    store = PatternStore(str(tmp_path / "patterns.json"), compact_threshold=3)
+    for i in range(3):
+        store.append_pattern(f"learned_{i}", {"patterns": [f"p{i}"], "responses": ["r"]})
+    store.close()
+    assert set(_snapshot(store)) == {"learned_0", "learned_1", "learned_2"}
+    assert store.journal_records == 0
+
+
+def test_replay_since_applies_only_new_records(store):
+    data, position = store.load_at()
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    store.append_response("old_name", "Another answer")
+    data["new_name"] = {"patterns": ["x"], "responses": ["First"]}
+
+    with store.locked():
+        assert store.replay_since(position, data, {"old_name": "new_name"})
+    assert "learned_1" in data
+    assert data["new_name"]["responses"] == ["First", "Another answer"]
+
+
+def test_replay_since_refuses_after_a_rewrite(store):
+    data, position = store.load_at()
+    store.append_pattern("learned_1", {"patterns": ["library"], "responses": ["9 to 5"]})
+    store.rewrite(store.load())
+    with store.locked():
+        assert not store.replay_since(position, data)
+    assert "learned_1" not in data
@@ -0,0 +1,88 @@
+import sys
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.profile_store import ProfileStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A long interval: tests decide when the batch is written
+    store = ProfileStore(str(tmp_path / "profiles.db"), flush_interval=60)
+    yield store
+    store.close()
+
+
+def _stored_facts(store, username):
+    conn = sqlite3.connect(store.path)
+    try:
+        return dict(conn.execute("SELECT key, value FROM facts WHERE username = ?", (username,)).fetchall())
+    finally:
+        conn.close()
+
+
+def test_facts_are_written_in_one_batch(store):
+    store.set_fact("asha", "name", "Asha")
+    store.set_fact("asha", "city", "Pune")
+    store.set_fact("asha", "city", "Delhi")  # Overwrites the queued change
+    assert _stored_facts(store, "asha") == {}
+
+    store.flush()
+    assert _stored_facts(store, "asha") == {"name": "Asha", "city": "Delhi"}
+    assert store.pending == {}
+
+
+def test_version_changes_only_with_facts(store):
+    store.load("asha")
+    assert store.version("asha") == 0
+    store.set_fact("asha", "name", "Asha")
+    store.set_fact("asha", "name", "Asha")  # Unchanged: no bump
+    assert store.version("asha") == 1
+
+
+def test_set_fact_after_unload(store):
+    profile = store.load("asha")
+    store.unload("asha")
+    # load() returns the profile it already holds, as if the unload raced set_fact
+    store.load = lambda username: profile
+    store.set_fact("asha", "name", "Asha")
+    assert store.version("asha") == 1
+
+
+def test_unloaded_profile_is_read_back(store):
+    store.set_fact("asha", "name", "Asha")
+    store.unload("asha")  # Before the flush: the queued change survives
+    assert store.load("asha")["facts"] == {"name": "Asha"}
+
+    store.flush()
+    store.unload("asha")
+    assert store.load("asha")["facts"] == {"name": "Asha"}
+
+
+def test_guest_profiles_are_never_written(store):
+    store.load("guest-1", persist=False)
+    store.set_fact("guest-1", "name", "Ravi")
+    assert store.facts("guest-1") == {"name": "Ravi"}
+    assert store.version("guest-1") == 1
+
+    store.flush()
+    store.unload("guest-1")
+    assert _stored_facts(store, "guest-1") == {}
+    assert store.load("guest-1", persist=False)["facts"] == {}
+    assert "guest-1" in store.transient
+
+
+def test_legacy_profile_is_imported(store, tmp_path):
+    legacy = tmp_path / "asha.json"
+    legacy.write_text(json.dumps({"created_at": "2024-01-01", "facts": {"name": "Asha"}, "preferences": {"tone": "brief"}}))
+
+    profile = store.load("asha", str(legacy))
+    assert profile["facts"] == {"name": "Asha"}
+    assert profile["preferences"] == {"tone": "brief"}
+    assert _stored_facts(store, "asha") == {"name": "Asha"}
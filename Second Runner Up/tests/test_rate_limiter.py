@@ -0,0 +1,59 @@
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.rate_limiter import TokenBucket
+
+
+def test_burst_is_served_at_once_then_paced():
+    bucket = TokenBucket(rate_per_minute=600, capacity=3)  # One token every 0.1s
+    start = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+    assert bucket.acquire()
+    assert time.monotonic() - start == pytest.approx(0.1, abs=0.05)
+
+
+def test_refuses_when_no_token_is_due_in_time():
+    bucket = TokenBucket(rate_per_minute=60, capacity=1)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.5)  # The next token is a second away
+    assert bucket.stats()["tokens"] < 1  # A refusal reserves nothing
+
+
+def test_queued_callers_are_counted():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)
+    bucket.acquire()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert bucket.stats()["queue_depth"] == 3
+    for thread in threads:
+        thread.join()
+    assert bucket.stats()["queue_depth"] == 0
+
+
+def test_cancelled_async_waiter_returns_its_token():
+    bucket = TokenBucket(rate_per_minute=60, capacity=1)
+
+    async def cancel_waiter():
+        await bucket.aacquire()
+        waiter = asyncio.ensure_future(bucket.aacquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(cancel_waiter())
+    # Only the first token is spent: the next is due in under a second again
+    assert bucket.acquire(timeout=1.0)
@@ -0,0 +1,91 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import ChatbotConfig
+from utils.cache import DiskCache, ResponseCache
+
+
+@pytest.fixture
+def disk(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_bytes=10_000, compress_min_bytes=100)
+    yield cache
+    cache.close()
+
+
+def _config(tmp_path, **overrides):
+    return ChatbotConfig(base_dir=tmp_path, disk_cache_file=str(tmp_path / "cache.db"), log_to_file=False, **overrides)
+
+
+def test_values_round_trip_compressed_or_not(disk):
+    disk.set("short", "brief answer")
+    disk.set("long", "a long answer " * 50)
+    assert disk.get("short") == "brief answer"
+    assert disk.get("long") == "a long answer " * 50
+    assert disk.get("missing") is None
+
+    compressed = dict(disk.conn.execute("SELECT key, compressed FROM responses").fetchall())
+    assert compressed == {"short": 0, "long": 1}
+
+
+def test_least_recently_accessed_rows_are_evicted(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_bytes=300, compress_min_bytes=10_000)
+    try:
+        disk.set("a", "x" * 90)
+        disk.set("b", "x" * 90)
+        disk.set("c", "x" * 90)
+        time.sleep(0.01)
+        disk.get("a")  # b is now the least recently accessed
+        disk.set("d", "x" * 90)
+        assert disk.get("b") is None
+        assert all(disk.get(key) for key in "acd")
+        assert disk.total_bytes <= 300
+        disk.set("huge", "x" * 1000)  # Over the whole budget: not stored
+        assert disk.get("huge") is None
+    finally:
+        disk.close()
+
+
+def test_expired_rows_are_dropped(disk):
+    disk.set("old", "stale answer")
+    disk.ttl_seconds = -1
+    assert disk.get("old") is None
+    disk.set("older", "stale answer")
+    assert disk.sweep() == 1
+    assert disk.total_bytes == 0
+
+
+def test_ai_answers_survive_a_restart(tmp_path):
+    config = _config(tmp_path)
+    key = ResponseCache.make_key("who is the vice chancellor", ["User: hi"])
+    cache = ResponseCache(config)
+    cache.set(key, "Dr. Rao")
+    cache.set("library timings", "9 to 5")  # A local answer: memory only
+    cache.close()
+
+    cache = ResponseCache(config)
+    try:
+        assert cache.get(key) == "Dr. Rao"
+        assert cache.get("library timings") is None
+    finally:
+        cache.close()
+
+
+def test_keys_depend_on_context():
+    text = "what about fees"
+    assert ResponseCache.make_key(text) == ResponseCache.make_key(text, [])
+    assert ResponseCache.make_key(text, ["User: hostel"]) != ResponseCache.make_key(text, ["User: library"])
+    assert ResponseCache.make_key(text).startswith(ResponseCache.AI_KEY_PREFIX)
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = ResponseCache(_config(tmp_path, cache_max_size=2, enable_disk_cache=False))
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == ("B", "C")
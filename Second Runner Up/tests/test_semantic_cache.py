@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import ChatbotConfig
+from utils.cache import SemanticCache
+
+QUESTION = "who is the vice chancellor of the university".split()
+
+
+def _cache(**overrides):
+    return SemanticCache(ChatbotConfig(log_to_file=False, **overrides))
+
+
+def test_paraphrase_hits_and_different_question_misses():
+    cache = _cache()
+    cache.set(QUESTION, "Dr. Rao")
+    assert cache.get("who is the current vice chancellor of the university".split()) == "Dr. Rao"
+    assert cache.get("who is the vice chancellor of the hostel".split()) is None
+    assert cache.hits == 1
+
+
+def test_answers_are_only_reused_in_the_same_context():
+    cache = _cache()
+    cache.set(QUESTION, "Dr. Rao", fingerprint="ctx-a")
+    assert cache.get(QUESTION, fingerprint="ctx-b") is None
+    assert cache.get(QUESTION) is None
+    assert cache.get(QUESTION, fingerprint="ctx-a") == "Dr. Rao"
+
+
+def test_short_queries_are_not_cached():
+    cache = _cache(semantic_cache_min_tokens=3)
+    cache.set(["hi", "there"], "Hello!")
+    assert len(cache) == 0
+    assert cache.get(["hi", "there"]) is None
+
+
+def test_expired_answers_are_not_served():
+    cache = _cache()
+    cache.set(QUESTION, "Dr. Rao")
+    cache.config.cache_ttl_seconds = -1
+    assert cache.get(QUESTION) is None
+
+
+def test_oldest_entry_is_evicted_from_the_index():
+    cache = _cache(semantic_cache_max_size=2)
+    questions = [f"what are the {topic} fees this year".split() for topic in ("hostel", "library", "canteen")]
+    for i, question in enumerate(questions):
+        cache.set(question, str(i))
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.get(questions[0]) is None
+    assert cache.get(questions[2]) == "2"
@@ -0,0 +1,91 @@
+import sys
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fuzzywuzzy import fuzz, process
+
+import utils.similarity as similarity
+from utils.similarity import SCORERS, FuzzyWuzzyBackend, RapidFuzzBackend, _sample_texts, check_backends
+
+# Without rapidfuzz there is no accelerated backend to compare: report a skip, not a pass
+requires_rapidfuzz = pytest.mark.skipif(similarity.rf_process is None, reason="rapidfuzz is not installed")
+
+CUTOFFS = (60, 80, 85, 90, 95)  # Thresholds the fuzzy, knowledge and deduplication tiers use
+
+
+def _corpus():
+    """Knowledge base tags and contents plus random near-miss phrases, fixed by seed"""
+    with open(ROOT / "local" / "knowledge_base.json", encoding="utf-8") as f:
+        knowledge = json.load(f)
+    texts = [tag for entry in knowledge for tag in entry.get("tags", [])]
+    texts += [entry["content"] for entry in knowledge]
+    return texts + _sample_texts(random.Random(7), 60)
+
+
+CORPUS = _corpus()
+QUERIES = _sample_texts(random.Random(11), 25) + ["vice chancellor", "library timings", "founded", "hostel fee"]
+
+
+def _top(scores):
+    """Index of the best nonzero score, first on ties (as the fuzzy tiers pick), or None"""
+    best = max(scores)
+    return scores.index(best) if best else None
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+@pytest.mark.parametrize("reverse", [False, True])
+def test_fallback_scores_every_pair_like_fuzzywuzzy(scorer, reverse):
+    fn = getattr(fuzz, scorer)
+    for query in QUERIES[:10]:
+        for cutoff in (0, 85):
+            scores = FuzzyWuzzyBackend().scores(scorer, query, CORPUS, cutoff, reverse)
+            for choice, score in zip(CORPUS, scores):
+                expected = fn(choice, query) if reverse else fn(query, choice)
+                assert score == (expected if expected >= cutoff else 0), (query, choice)
+
+
+@pytest.mark.parametrize("scorer", SCORERS)
+def test_fallback_ranks_like_extract_one(scorer):
+    for query in QUERIES[:15]:
+        for cutoff in (0, 85):
+            scores = FuzzyWuzzyBackend().scores(scorer, query, CORPUS, cutoff)
+            best = process.extractOne(query, CORPUS, processor=lambda text: text,
+                                      scorer=getattr(fuzz, scorer), score_cutoff=cutoff)
+            if best is None or best[1] == 0:
+                assert _top(scores) is None, (query, cutoff)
+            else:
+                assert max(scores) == best[1], (query, cutoff)
+                assert CORPUS[_top(scores)] == best[0], (query, cutoff)
+
+
+def test_get_backend_falls_back_without_rapidfuzz(monkeypatch):
+    monkeypatch.setattr(similarity, "rf_process", None)
+    monkeypatch.setattr(similarity, "_backend", None)
+    assert similarity.get_backend().name == "fuzzywuzzy"
+    assert similarity.get_backend("rapidfuzz").name == "fuzzywuzzy"
+
+
+@requires_rapidfuzz
+def test_backends_agree_on_every_score():
+    assert check_backends(QUERIES, CORPUS, CUTOFFS) == []
+
+
+@requires_rapidfuzz
+@pytest.mark.parametrize("scorer", SCORERS)
+@pytest.mark.parametrize("reverse", [False, True])
+def test_backends_pick_the_same_top_result(scorer, reverse):
+    reference, fast = FuzzyWuzzyBackend(), RapidFuzzBackend()
+    for query in QUERIES:
+        raw = reference.scores(scorer, query, CORPUS, 0, reverse)
+        for cutoff in CUTOFFS:
+            expected = [score if score >= cutoff else 0 for score in raw]
+            got = fast.scores(scorer, query, CORPUS, cutoff, reverse)
+            assert _top(got) == _top(expected), (query, cutoff)
+            if _top(expected) is not None:
+                assert max(got) == max(expected), (query, cutoff)
@@ -1,18 +1,175 @@
+import os
 import time
-from typing import Optional, Dict, Any
+import zlib
+import sqlite3
+import hashlib
+import logging
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from collections import OrderedDict
 import threading
 
 from config import ChatbotConfig
+from utils.lsh import MinHashLSH, jaccard
+
+
+class DiskCache:
+    """SQLite (WAL mode) response store that survives restarts"""
+    
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int,
+                 compress_min_bytes: int = 1024, sweep_interval: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, compressed INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        
+        # Background TTL sweeper
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(sweep_interval,), name="cache-sweeper", daemon=True
+        )
+        self._sweeper.start()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get stored response if present and not expired"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, compressed, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, compressed, created = row
+            if now - created > self.ttl_seconds:
+                self._delete(key)
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        
+        if compressed:
+            value = zlib.decompress(value)
+        return value.decode('utf-8')
+    
+    def set(self, key: str, value: str):
+        """Store a response, compressing large values and enforcing the byte budget"""
+        data = value.encode('utf-8')
+        compressed = len(data) >= self.compress_min_bytes
+        if compressed:
+            data = zlib.compress(data)
+        size = len(data) + len(key)
+        if size > self.max_bytes:
+            return
+        
+        now = time.time()
+        with self.lock:
+            self._delete(key)
+            self.conn.execute(
+                "INSERT INTO responses (key, value, compressed, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, int(compressed), size, now, now)
+            )
+            self.total_bytes += size
+            
+            # Evict least recently accessed rows until under budget
+            while self.total_bytes > self.max_bytes:
+                rows = self.conn.execute(
+                    "SELECT key FROM responses ORDER BY accessed LIMIT 32"
+                ).fetchall()
+                if not rows:
+                    break
+                for (old_key,) in rows:
+                    self._delete(old_key)
+                    if self.total_bytes <= self.max_bytes:
+                        break
+            self.conn.commit()
+    
+    def sweep(self) -> int:
+        """Delete expired rows"""
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            freed = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses WHERE created < ?", (cutoff,)
+            ).fetchone()[0]
+            removed = self.conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+            self.conn.commit()
+            self.total_bytes -= freed
+        return removed
+    
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.total_bytes = 0
+    
+    def close(self):
+        """Stop the sweeper and close the database"""
+        self._stop.set()
+        self._sweeper.join(timeout=1)
+        with self.lock:
+            self.conn.close()
+    
+    def _delete(self, key: str):
+        """Delete one row and update the byte total (caller holds the lock)"""
+        row = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.total_bytes -= row[0]
+    
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("Cache sweep failed: %s", e)
 
 
 class ResponseCache:
-    """LRU cache for responses"""
+    """LRU cache for responses, backed by an optional on-disk tier"""
     
     def __init__(self, config: ChatbotConfig):
         self.config = config
         self.cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
         self.lock = threading.Lock()
+        self.disk: Optional[DiskCache] = None
+        
+        if config.enable_response_cache and getattr(config, 'enable_disk_cache', False):
+            try:
+                self.disk = DiskCache(
+                    config.disk_cache_file,
+                    ttl_seconds=config.disk_cache_ttl_seconds,
+                    max_bytes=config.disk_cache_max_bytes,
+                    compress_min_bytes=config.cache_compress_min_bytes,
+                    sweep_interval=config.cache_sweep_interval
+                )
+            except sqlite3.Error as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("Disk cache unavailable: %s", e)
+    
+    AI_KEY_PREFIX = "ai:"  # Namespace of AI answers; bare normalized text keys hold local answers
+    
+    @staticmethod
+    def fingerprint(context: Optional[List[str]] = None) -> str:
+        """Short hash of the context window (and user profile note) an answer was given in"""
+        return hashlib.sha1("\n".join(context or []).encode('utf-8')).hexdigest()[:16]
+    
+    @classmethod
+    def make_key(cls, text: str, context: Optional[List[str]] = None) -> str:
+        """Build an AI answer's key from text plus its context fingerprint (an empty context has one too)"""
+        return f"{cls.AI_KEY_PREFIX}{text}#{cls.fingerprint(context)}"
     
     def get(self, key: str) -> Optional[str]:
         """Get cached response"""
@@ -26,30 +183,190 @@ class ResponseCache:
                 # Check if expired
                 if time.time() - entry['timestamp'] > self.config.cache_ttl_seconds:
                     del self.cache[key]
-                    return None
-                
-                # Move to end (LRU)
-                self.cache.move_to_end(key)
-                return entry['value']
-            
-            return None
+                else:
+                    # Move to end (LRU)
+                    self.cache.move_to_end(key)
+                    return entry['value']
+        
+        if self.disk and self._persistent(key):
+            value = self.disk.get(key)
+            if value is not None:
+                self._remember(key, value)
+                return value
+        
+        return None
     
     def set(self, key: str, value: str):
         """Cache a response"""
         if not self.config.enable_response_cache:
             return
         
+        self._remember(key, value)
+        if self.disk and self._persistent(key):
+            self.disk.set(key, value)
+    
+    def _persistent(self, key: str) -> bool:
+        """Only AI answers go to disk; local and math answers are cheap to recompute
+        and would outlive pattern edits and restarts"""
+        return key.startswith(self.AI_KEY_PREFIX)
+    
+    def _remember(self, key: str, value: str):
+        """Store in the in-memory tier"""
         with self.lock:
             # Remove oldest if at capacity
-            if len(self.cache) >= self.config.cache_max_size:
+            if key not in self.cache and len(self.cache) >= self.config.cache_max_size:
                 self.cache.popitem(last=False)
             
             self.cache[key] = {
                 'value': value,
                 'timestamp': time.time()
             }
+            self.cache.move_to_end(key)
     
     def clear(self):
         """Clear cache"""
         with self.lock:
             self.cache.clear()
+        if self.disk:
+            self.disk.clear()
+    
+    def close(self):
+        """Release the on-disk tier"""
+        if self.disk:
+            self.disk.close()
+            self.disk = None
+
+
+class LRUCache:
+    """Size-bounded LRU cache with hit/miss/eviction counters"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.cache: OrderedDict[str, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get cached value and mark it as recently used"""
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: Any):
+        """Cache a value, evicting the least recently used entry if full"""
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif len(self.cache) >= self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+            self.cache[key] = value
+    
+    def items(self) -> List[Tuple[str, Any]]:
+        """Copy of the (key, value) pairs, least recently used first"""
+        with self.lock:
+            return list(self.cache.items())
+    
+    def discard(self, keys: Iterable[str]):
+        """Remove entries if present"""
+        with self.lock:
+            for key in keys:
+                self.cache.pop(key, None)
+    
+    def clear(self):
+        """Clear cache"""
+        with self.lock:
+            self.cache.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.cache),
+            'max_size': self.max_size
+        }
+
+
+class SemanticCache:
+    """Near-duplicate cache: answers paraphrased queries via MinHash/LSH buckets.
+    
+    Each answer is stored with the fingerprint of its context (see
+    ResponseCache.fingerprint) and only reused for a query with the same one.
+    """
+    
+    def __init__(self, config: ChatbotConfig):
+        self.config = config
+        self.threshold = config.semantic_cache_threshold
+        self.max_size = config.semantic_cache_max_size
+        self.min_tokens = config.semantic_cache_min_tokens
+        self.entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.index = MinHashLSH()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def get(self, tokens: List[str], fingerprint: str = "") -> Optional[str]:
+        """Return the answer of the most similar cached query above the threshold in the same context"""
+        token_set = set(tokens)
+        if len(token_set) < self.min_tokens:
+            return None
+        
+        now = time.time()
+        with self.lock:
+            best_key, best_score = None, 0.0
+            for key in self.index.query(token_set):
+                entry = self.entries[key]
+                if entry['fingerprint'] != fingerprint:
+                    continue
+                if now - entry['timestamp'] > self.config.cache_ttl_seconds:
+                    continue
+                score = jaccard(token_set, entry['tokens'])
+                if score >= self.threshold and score > best_score:
+                    best_key, best_score = key, score
+            
+            if best_key is None:
+                return None
+            self.entries.move_to_end(best_key)
+            self.hits += 1
+            return self.entries[best_key]['value']
+    
+    def set(self, tokens: List[str], value: str, fingerprint: str = ""):
+        """Cache an answer under its token set and context fingerprint"""
+        token_set = frozenset(tokens)
+        if len(token_set) < self.min_tokens:
+            return
+        key = f"{fingerprint}#{' '.join(sorted(token_set))}"
+        
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.max_size:
+                old_key, _ = self.entries.popitem(last=False)
+                self.index.remove(old_key)
+                self.evictions += 1
+            
+            self.entries[key] = {
+                'tokens': token_set,
+                'fingerprint': fingerprint,
+                'value': value,
+                'timestamp': time.time()
+            }
+            self.entries.move_to_end(key)
+            self.index.add(key, token_set)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.index = MinHashLSH()
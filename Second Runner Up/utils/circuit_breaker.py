@@ -0,0 +1,65 @@
+import time
+import threading
+from typing import Dict
+
+
+class CircuitBreaker:
+    """Stops calling a failing service until a cool-down has passed.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open once `reset_timeout` seconds have elapsed, letting a
+    single trial call through; a success closes the circuit again, a
+    failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now; every allowed call must be settled with record_*/release"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            # Half open: one trial call at a time
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial slot without recording an outcome"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures}
@@ -0,0 +1,72 @@
+from typing import Dict, Optional, Set
+
+from utils.lsh import MinHashLSH
+from utils.similarity import get_backend
+
+
+def shingles(normalized: str, size: int = 3) -> Set[str]:
+    """Character n-grams of the sorted-token form, as compared by token_sort_ratio"""
+    text = " ".join(sorted(normalized.split()))
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class DuplicateIndex:
+    """Near-duplicate index over the `normalized` field of learned patterns.
+
+    MinHash/LSH over character shingles proposes a few candidates; only
+    those are scored exactly with `token_sort_ratio`, in one batch call.
+    """
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self.lsh = MinHashLSH()
+        self.normalized: Dict[str, str] = {}
+        self.order: Dict[str, int] = {}
+        self.next_order = 0  # Never reused, so a re-added pattern sorts after every live one
+
+    def __len__(self) -> int:
+        return len(self.normalized)
+
+    @classmethod
+    def build(cls, patterns: Dict, threshold: float = 0.9) -> "DuplicateIndex":
+        index = cls(threshold)
+        for name, data in patterns.items():
+            if name.startswith("learned_") and data.get("normalized"):
+                index.add(name, data["normalized"])
+        return index
+
+    def add(self, name: str, normalized: str):
+        """Index a pattern's normalized form"""
+        self.normalized[name] = normalized
+        if name not in self.order:
+            self.order[name] = self.next_order
+            self.next_order += 1
+        self.lsh.add(name, shingles(normalized))
+
+    def remove(self, name: str):
+        self.normalized.pop(name, None)
+        self.order.pop(name, None)
+        self.lsh.remove(name)
+
+    def find(self, normalized: str) -> Optional[str]:
+        """Return the most similar indexed pattern scoring at least the threshold"""
+        best_score = 0.0
+        best_name = None
+
+        # Earlier patterns win ties, as with a linear scan
+        names = sorted(self.lsh.query(shingles(normalized)), key=self.order.get)
+        scores = get_backend().scores(
+            "token_sort_ratio",
+            normalized,
+            [self.normalized[name] for name in names],
+            int(self.threshold * 100)  # Rounded down: only a prefilter for the check below
+        )
+        for name, score in zip(names, scores):
+            score = score / 100.0
+            if score >= self.threshold and score > best_score:
+                best_score = score
+                best_name = name
+
+        return best_name
@@ -0,0 +1,71 @@
+import os
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+Signature = Optional[Tuple[int, int, int]]  # (inode, size, mtime_ns); None if missing
+
+
+def file_signature(path: str) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class FileWatcher:
+    """Polls a set of files and calls `callback` from a background thread when they change.
+
+    A change is reported only once a file's signature has stayed the same
+    for one more poll, so an editor still writing the file is not picked up
+    half-way through. Atomic replaces (write temp file + rename) are seen as
+    an inode change.
+    """
+
+    def __init__(self, paths: List[str], callback: Callable[[], None], interval: float = 2.0):
+        self.paths = list(paths)
+        self.callback = callback
+        self.interval = interval
+        self.seen: Dict[str, Signature] = {path: file_signature(path) for path in self.paths}
+        self._candidates: Dict[str, Signature] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start polling"""
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop polling (waits for a running callback to finish)"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> bool:
+        """Check the files once; True if a settled change was found"""
+        changed = False
+        for path in self.paths:
+            signature = file_signature(path)
+            if signature == self.seen[path]:
+                self._candidates.pop(path, None)
+            elif self._candidates.get(path, False) == signature:
+                # Unchanged since the last poll: the write has settled
+                self.seen[path] = signature
+                del self._candidates[path]
+                changed = True
+            else:
+                self._candidates[path] = signature
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.poll():
+                    self.callback()
+            except Exception as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("File watcher callback failed: %s", e, exc_info=True)
@@ -0,0 +1,149 @@
+import os
+import json
+import queue
+import logging
+import threading
+from typing import Dict, List, Optional
+
+_CLEAR = object()
+_STOP = object()
+
+
+class HistoryLog:
+    """Append-only JSONL conversation log written by a background thread.
+
+    Entries are queued by the request path and written in batches with one
+    fsync per batch. Once `compact_threshold` records have been appended the
+    writer rewrites the file down to the newest `keep` records.
+    """
+
+    def __init__(self, path: str, keep: int, flush_interval: float = 1.0, compact_threshold: int = 1000):
+        self.path = path
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.queue: "queue.Queue" = queue.Queue()
+        self.appended = 0
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background writer"""
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._writer.start()
+
+    def append(self, entry: Dict):
+        """Queue an exchange for writing (never blocks on disk)"""
+        self.queue.put(entry)
+
+    def clear(self):
+        """Queue a truncation of the log"""
+        self.queue.put(_CLEAR)
+
+    def close(self):
+        """Flush pending entries and stop the writer"""
+        if self._writer is not None:
+            self.queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def tail(self, n: int) -> List[Dict]:
+        """Read the last n records by seeking backwards from the end of the file"""
+        if n <= 0 or not os.path.exists(self.path):
+            return []
+
+        block_size = 8192
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            # n records need n + 1 newlines unless we reach the start of the file
+            while position > 0 and data.count(b'\n') <= n:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+
+        lines = [line for line in data.split(b'\n') if line.strip()]
+        if position > 0:
+            lines = lines[1:]  # First line may be partial
+
+        records = []
+        for line in lines[-n:]:
+            try:
+                records.append(json.loads(line.decode('utf-8')))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue  # Torn write from an interrupted process
+        return records
+
+    def import_legacy(self, legacy_path: str) -> bool:
+        """Convert an old JSON-array history file into the JSONL log"""
+        if os.path.exists(self.path) or not os.path.exists(legacy_path):
+            return False
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._rewrite(entries[-self.keep:])
+        return True
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Drain whatever else is queued into the same batch
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending = []
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                elif item is _CLEAR:
+                    pending = []
+                    self._rewrite([])
+                else:
+                    pending.append(item)
+
+            try:
+                self._write(pending)
+                if self.appended >= self.compact_threshold:
+                    self._compact()
+            except OSError as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("Error saving history: %s", e)
+
+    def _write(self, entries: List[Dict]):
+        if not entries:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.appended += len(entries)
+
+    def _compact(self):
+        """Rewrite the log down to the newest records"""
+        self._rewrite(self.tail(self.keep))
+
+    def _rewrite(self, entries: List[Dict]):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.appended = 0
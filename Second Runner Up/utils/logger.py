@@ -1,6 +1,12 @@
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
 import os
+import threading
 from datetime import datetime
+from typing import Dict, Optional
 
 from config import ChatbotConfig
 from utils.ui_enhancements import Colors
@@ -29,8 +35,67 @@ class ColoredFormatter(logging.Formatter):
         return formatted
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record for the structured log sink"""
+    
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one of every `every` DEBUG records per message template; other levels always pass"""
+    
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+    
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        key = str(record.msg)
+        with self.lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        return count % self.every == 0
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+    
+    The stock handler merges args into the message before enqueueing; here
+    only tracebacks are rendered up front (they cannot outlive the frame),
+    so the request path pays for little more than a put(). Log args must
+    therefore not be mutated after the call.
+    """
+    
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
 class ChatbotLogger:
-    """Advanced logging utility"""
+    """Advanced logging utility.
+    
+    Records are put on a queue by the caller and formatted and written by a
+    QueueListener thread, so log I/O never runs on the request path. Messages
+    take %-style args (`logger.info("Local match: %s", name)`), which are only
+    merged when a handler actually writes the record.
+    """
+    
+    _listener: Optional[logging.handlers.QueueListener] = None  # Shared: one per process
     
     def __init__(self, config: ChatbotConfig):
         self.config = config
@@ -41,15 +106,19 @@ class ChatbotLogger:
         logger = logging.getLogger('AmmaarBhaiChatBot')
         logger.setLevel(getattr(logging, self.config.log_level))
         
-        # Clear existing handlers
+        # Clear existing handlers (and the listener writing for them)
+        ChatbotLogger.close()
+        for handler in logger.handlers:
+            handler.close()
         logger.handlers = []
+        handlers = []
         
         # Console handler with color support
         console_handler = logging.StreamHandler()
         console_handler.setLevel(getattr(logging, self.config.log_level))
         console_format = ColoredFormatter()
         console_handler.setFormatter(console_format)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
         
         # File handler
         if self.config.log_to_file:
@@ -61,18 +130,59 @@ class ChatbotLogger:
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
             file_handler.setFormatter(file_format)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
+        
+        # Structured JSON-lines sink, rotated by size
+        if self.config.log_json_file:
+            directory = os.path.dirname(self.config.log_json_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            json_handler = logging.handlers.RotatingFileHandler(
+                self.config.log_json_file,
+                maxBytes=self.config.log_json_max_bytes,
+                backupCount=self.config.log_json_backups,
+                encoding='utf-8'
+            )
+            json_handler.setLevel(logging.DEBUG)
+            json_handler.setFormatter(JsonFormatter())
+            handlers.append(json_handler)
+        
+        # The request path only enqueues; the listener thread formats and writes
+        queue_handler = LazyQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(SamplingFilter(self.config.log_debug_sample_every))
+        logger.addHandler(queue_handler)
+        
+        listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        ChatbotLogger._listener = listener
         
         return logger
     
-    def debug(self, message: str):
-        self.logger.debug(message)
+    @staticmethod
+    def close():
+        """Write out queued records and stop the listener thread.
+        
+        Its handlers are attached to the logger directly afterwards, so
+        anything logged later is still written (synchronously).
+        """
+        listener, ChatbotLogger._listener = ChatbotLogger._listener, None
+        if listener is not None:
+            listener.stop()
+            logging.getLogger('AmmaarBhaiChatBot').handlers = list(listener.handlers)
+    
+    def debug(self, message: str, *args):
+        self.logger.debug(message, *args)
     
-    def info(self, message: str):
-        self.logger.info(message)
+    def info(self, message: str, *args):
+        self.logger.info(message, *args)
     
-    def warning(self, message: str):
-        self.logger.warning(message)
+    def warning(self, message: str, *args):
+        self.logger.warning(message, *args)
     
-    def error(self, message: str, exc_info: bool = False):
-        self.logger.error(message, exc_info=exc_info)
+    def error(self, message: str, *args, exc_info: bool = False):
+        self.logger.error(message, *args, exc_info=exc_info)
+
+
+# Flush whatever is still queued when the interpreter exits without shutdown()
+atexit.register(ChatbotLogger.close)
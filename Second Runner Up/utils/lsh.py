@@ -0,0 +1,80 @@
+import zlib
+import random
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two token sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashLSH:
+    """MinHash signatures bucketed into LSH bands for near-duplicate lookup.
+
+    Token sets whose Jaccard similarity is above roughly
+    (1 / bands) ** (1 / rows) share at least one band bucket with high
+    probability, so only those are returned as candidates.
+    """
+
+    def __init__(self, bands: int = 20, rows: int = 3, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self.perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(bands * rows)
+        ]
+        self.buckets: List[Dict[Tuple[int, ...], Set[Hashable]]] = [{} for _ in range(bands)]
+        self.keys: Dict[Hashable, List[Tuple[int, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.keys
+
+    def signature(self, tokens: Iterable[str]) -> List[int]:
+        """MinHash signature of a token set"""
+        hashes = [zlib.crc32(t.encode('utf-8')) for t in set(tokens)]
+        if not hashes:
+            return [_MAX_HASH] * len(self.perms)
+        return [min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in self.perms]
+
+    def _bands(self, tokens: Iterable[str]) -> List[Tuple[int, ...]]:
+        sig = self.signature(tokens)
+        r = self.rows
+        return [tuple(sig[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def add(self, key: Hashable, tokens: Iterable[str]):
+        """Index a token set under key (replacing any previous entry)"""
+        if key in self.keys:
+            self.remove(key)
+        bands = self._bands(tokens)
+        for bucket, band in zip(self.buckets, bands):
+            bucket.setdefault(band, set()).add(key)
+        self.keys[key] = bands
+
+    def remove(self, key: Hashable):
+        bands = self.keys.pop(key, None)
+        if bands is None:
+            return
+        for bucket, band in zip(self.buckets, bands):
+            members = bucket.get(band)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band]
+
+    def query(self, tokens: Iterable[str]) -> Set[Hashable]:
+        """Keys sharing at least one band bucket with the token set"""
+        candidates: Set[Hashable] = set()
+        for bucket, band in zip(self.buckets, self._bands(tokens)):
+            members = bucket.get(band)
+            if members:
+                candidates |= members
+        return candidates
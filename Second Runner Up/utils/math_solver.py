@@ -1,7 +1,34 @@
 import re
 import ast
+import math
+import time
 import operator
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
+
+from utils.cache import LRUCache
+
+Number = Union[int, float]
+
+
+class _LimitExceeded(Exception):
+    """Raised when evaluating further would exceed a MathSolver limit"""
+
+
+class _Budget:
+    """Remaining work units and wall-clock deadline for one evaluation"""
+    __slots__ = ('work', 'deadline')
+
+    def __init__(self, work: int, seconds: float):
+        self.work = work
+        self.deadline = time.perf_counter() + seconds
+
+    def charge(self, units: int):
+        self.work -= units
+        if self.work < 0:
+            raise _LimitExceeded("it needs too many steps")
+        if time.perf_counter() > self.deadline:
+            raise _LimitExceeded("it ran past the time budget")
+
 
 class MathSolver:
     """Safe math expression evaluator for basic arithmetic."""
@@ -17,7 +44,15 @@ class MathSolver:
         ast.FloorDiv: operator.floordiv,
     }
     
-    def __init__(self):
+    def __init__(self, max_bits: int = 4096, max_work: int = 1_000_000,
+                 time_budget: float = 0.05, ast_cache_size: int = 256):
+        # Integer results are capped at max_bits; max_work counts 64-bit word operations
+        self.max_bits = max_bits
+        self.max_work = max_work
+        self.time_budget = time_budget
+        # cleaned expression -> parsed expression node (False if it does not parse)
+        self.ast_cache = LRUCache(ast_cache_size)
+        
         # Regex to detect math expressions
         # Matches: numbers, +, -, *, /, ^, %, (, ), spaces
         self.math_pattern = re.compile(
@@ -82,10 +117,11 @@ class MathSolver:
         
         return has_number and has_operator
     
-    def solve(self, expression: str) -> Optional[Tuple[float, str]]:
+    def solve(self, expression: str) -> Optional[Tuple[Optional[Number], str]]:
         """
-        Safely evaluate a math expression.
-        Returns (result, formatted_string) or None if invalid.
+        Safely evaluate a math expression within the solver's limits.
+        Returns (result, formatted_string), (None, reason) if the result is
+        too large to calculate, or None if invalid.
         """
         try:
             # Clean and normalize
@@ -95,11 +131,19 @@ class MathSolver:
             cleaned = cleaned.replace('×', '*')
             cleaned = cleaned.replace('÷', '/')
             
-            # Parse using AST (safe - no code execution)
-            tree = ast.parse(cleaned, mode='eval')
+            # Parse using AST (safe - no code execution), memoized per expression
+            body = self.ast_cache.get(cleaned)
+            if body is None:
+                try:
+                    body = ast.parse(cleaned, mode='eval').body
+                except (SyntaxError, ValueError, RecursionError, MemoryError):
+                    body = False
+                self.ast_cache.set(cleaned, body)
+            if body is False:
+                return None
             
             # Evaluate the expression tree
-            result = self._eval_node(tree.body)
+            result = self._eval_node(body, _Budget(self.max_work, self.time_budget))
             
             # Format result
             if isinstance(result, float):
@@ -109,28 +153,35 @@ class MathSolver:
                 formatted = str(result)
             
             return result, formatted
-            
-        except (SyntaxError, ValueError, TypeError, KeyError, ZeroDivisionError) as e:
+        
+        except _LimitExceeded as e:
+            return None, f"too large to calculate ({e})"
+        except OverflowError:
+            return None, "too large to calculate (it is outside the floating-point range)"
+        except (ValueError, TypeError, KeyError, ZeroDivisionError, RecursionError) as e:
             # Invalid expression
             return None
     
-    def _eval_node(self, node):
-        """Recursively evaluate AST node."""
-        if isinstance(node, ast.Num):  # Number
-            return node.n
+    def _eval_node(self, node, budget: _Budget):
+        """Recursively evaluate AST node, charging each operation to the budget."""
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):  # Number
+            if isinstance(node.value, int) and node.value.bit_length() > self.max_bits:
+                raise _LimitExceeded(f"a number has more than {self.max_bits} bits")
+            return node.value
         
         elif isinstance(node, ast.BinOp):  # Binary operation
-            left = self._eval_node(node.left)
-            right = self._eval_node(node.right)
+            left = self._eval_node(node.left, budget)
+            right = self._eval_node(node.right, budget)
             op = self.OPERATORS.get(type(node.op))
             
             if op is None:
                 raise ValueError(f"Unsupported operator: {type(node.op)}")
             
+            budget.charge(self._cost(node.op, left, right))
             return op(left, right)
         
         elif isinstance(node, ast.UnaryOp):  # Unary operation (e.g., -5)
-            operand = self._eval_node(node.operand)
+            operand = self._eval_node(node.operand, budget)
             if isinstance(node.op, ast.UAdd):
                 return +operand
             elif isinstance(node.op, ast.USub):
@@ -140,3 +191,32 @@ class MathSolver:
         
         else:
             raise ValueError(f"Unsupported expression type: {type(node)}")
+    
+    def _cost(self, op: ast.operator, left: Number, right: Number) -> int:
+        """Estimate the work for op before applying it; raise if the result would exceed max_bits."""
+        if not (isinstance(left, int) and isinstance(right, int)):
+            # Float arithmetic is constant time and raises OverflowError on its own
+            return 1
+        
+        left_bits, right_bits = abs(left).bit_length(), abs(right).bit_length()
+        if isinstance(op, ast.Pow):
+            if right < 0 or abs(left) <= 1:
+                return right_bits + 1  # Float result, or 0/1/-1 to any power
+            # log2 of the result is right * log2(left); the exponent is tiny in any result that fits
+            bits = right * math.log2(abs(left)) if right_bits <= 64 else math.inf
+            words = int(min(bits, self.max_bits)) // 64 + 1
+            # Square-and-multiply: operands double each step, so the last squaring dominates
+            cost = 2 * words * words + right_bits
+        elif isinstance(op, ast.Mult):
+            bits = left_bits + right_bits
+            cost = (left_bits // 64 + 1) * (right_bits // 64 + 1)
+        elif isinstance(op, (ast.FloorDiv, ast.Mod, ast.Div)):
+            bits = left_bits  # The quotient and remainder are never larger than the dividend
+            cost = (left_bits // 64 + 1) * (right_bits // 64 + 1)
+        else:
+            bits = max(left_bits, right_bits) + 1
+            cost = bits // 64 + 1
+        
+        if bits > self.max_bits:
+            raise _LimitExceeded(f"the result would have more than {self.max_bits} bits")
+        return cost
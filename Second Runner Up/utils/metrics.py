@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Bucket upper bounds in seconds: 5us to ~3 minutes, each 1.5x the previous
+BUCKET_BOUNDS: List[float] = [5e-6 * 1.5 ** i for i in range(44)]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are interpolated within a bucket"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # Last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Estimated latency in seconds below which pct percent of samples fall"""
+        if not self.count:
+            return 0.0
+
+        target = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                estimate = lower + (upper - lower) * (target - seen) / n
+                return min(estimate, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: "LatencyMetrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class LatencyMetrics:
+    """Per-stage latency histograms for the request path.
+
+    `with metrics.time("parse"): ...` records the block's duration on the
+    monotonic clock. Stages appear in the order they are first recorded.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.lock = threading.Lock()
+        self._dumper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def time(self, stage: str):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def record(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Summary (count, mean, p50/p95/p99, max) of every stage seen so far"""
+        with self.lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def dump(self, path: str):
+        """Append the current snapshot to a JSON-lines file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        record = {'timestamp': datetime.now().isoformat(), 'pid': os.getpid(), 'stages': self.snapshot()}
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+
+    def start_dumps(self, path: str, interval: float):
+        """Dump a snapshot every interval seconds from a background thread"""
+        if self._dumper is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._dumper = threading.Thread(target=self._dump_loop, args=(path, interval), name="metrics-dumper", daemon=True)
+        self._dumper.start()
+
+    def stop_dumps(self):
+        """Stop the dump thread after one final snapshot"""
+        if self._dumper is not None:
+            self._stop.set()
+            self._dumper.join()
+            self._dumper = None
+
+    def _dump_loop(self, path: str, interval: float):
+        while True:
+            stopping = self._stop.wait(interval)
+            try:
+                self.dump(path)
+            except OSError as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("Metrics dump failed: %s", e)
+            if stopping:
+                return
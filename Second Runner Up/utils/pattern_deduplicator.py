@@ -1,13 +1,51 @@
-import json
 import os
 import sys
-from fuzzywuzzy import fuzz
+import json
+import time
+import argparse
+from datetime import datetime
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
 
 # Add parent directory to path to import local modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import ChatbotConfig
 from core.input_parser import InputParser
+from local.pattern_store import PatternStore
+from utils.duplicate_index import DuplicateIndex
+from utils.similarity import get_backend
+
+MERGE_THRESHOLD = 0.90
+MAX_ATTEMPTS = 5  # Merges redone after a compaction before giving up for this run
+
+
+def extract_normalized(key, value, parser):
+    """Collect the normalized keywords of a pattern entry. Returns (normalized, original query)"""
+    # Collect all unique keywords from all patterns in this entry
+    all_keywords = set()
+    patterns_list = value.get("patterns", [])
+    
+    for pat in patterns_list:
+        # Clean regex
+        clean_pat = pat.replace("\\b", " ").replace("\\", " ").replace(".*", " ").replace("(", " ").replace(")", " ")
+        # Split by pipe if present
+        sub_patterns = clean_pat.split("|")
+        for sp in sub_patterns:
+            normalized_sp = parser.normalize_for_pattern(sp)
+            if normalized_sp:
+                all_keywords.update(normalized_sp.split())
+    
+    # If no patterns, fallback to key or original_query
+    query = value.get("original_query", key)
+    if not all_keywords:
+        normalized_q = parser.normalize_for_pattern(query)
+        if normalized_q:
+            all_keywords.update(normalized_q.split())
+    
+    tags = sorted(list(all_keywords))
+    return " ".join(tags), query
+
 
 def deduplicate_patterns(patterns_file):
     print(f"Loading patterns from {patterns_file}...")
@@ -16,9 +54,37 @@ def deduplicate_patterns(patterns_file):
         print("Patterns file not found.")
         return
 
-    with open(patterns_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # Include patterns learned since the last journal compaction, and any a
+    # running bot journals while we work
+    store = PatternStore(patterns_file)
+    if _rewrite_merged(store, _deduplicate) is not None:
+        print("Patterns saved.")
+
 
+def _rewrite_merged(store, merge):
+    """Run merge(data) -> (final data, aliases, result) on the store's patterns and write the result back.
+    
+    The merge runs without the store lock, so a running bot can keep
+    learning. The lock is only taken again to replay what it journaled
+    meanwhile on top of the merged data and rewrite. If a compaction folded
+    those records away first the merge is redone on a fresh load, up to
+    MAX_ATTEMPTS times; returns None, writing nothing, if none succeeds.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        data, position = store.load_at()
+        final_data, aliases, result = merge(data)
+        with store.locked():
+            if store.replay_since(position, final_data, aliases):
+                store.rewrite(final_data)
+                return result
+        print("Patterns were compacted meanwhile; deduplicating again...")
+    
+    print(f"Patterns kept changing for {MAX_ATTEMPTS} attempts; nothing was written.")
+    return None
+
+
+def _deduplicate(data):
+    """Merge near-duplicate learned patterns in data. Returns (final data, merged name -> kept name, merged count)"""
     config = ChatbotConfig()
     parser = InputParser(config)
     
@@ -36,50 +102,23 @@ def deduplicate_patterns(patterns_file):
     print(f"Found {len(standard_patterns)} standard patterns and {len(learned_patterns)} learned patterns.")
     
     processed_patterns = {}
+    duplicate_index = DuplicateIndex(threshold=MERGE_THRESHOLD)
+    aliases = {}
     merged_count = 0
     
     # Process all patterns (standard and learned)
     for key, value in data.items():
-        # Collect all unique keywords from all patterns in this entry
-        all_keywords = set()
-        patterns_list = value.get("patterns", [])
-        
-        for pat in patterns_list:
-            # Clean regex
-            clean_pat = pat.replace("\\b", " ").replace("\\", " ").replace(".*", " ").replace("(", " ").replace(")", " ")
-            # Split by pipe if present
-            sub_patterns = clean_pat.split("|")
-            for sp in sub_patterns:
-                normalized_sp = parser.normalize_for_pattern(sp)
-                if normalized_sp:
-                    all_keywords.update(normalized_sp.split())
-        
-        # If no patterns, fallback to key or original_query
-        if not all_keywords:
-            query = value.get("original_query", key)
-            normalized_q = parser.normalize_for_pattern(query)
-            if normalized_q:
-                all_keywords.update(normalized_q.split())
-        
-        tags = sorted(list(all_keywords))
-        normalized = " ".join(tags)
+        normalized, query = extract_normalized(key, value, parser)
         
         if not normalized:
             processed_patterns[key] = value
             continue
             
         # Find if we already have a similar normalized pattern (only merge for learned ones to be safe)
+        # Only exact-scores the LSH candidates (token_sort_ratio, 0.90 threshold)
         found_similar = None
         if key.startswith("learned"):
-            for p_key, p_value in processed_patterns.items():
-                if p_key.startswith("learned"):
-                    p_norm = p_value.get("normalized", "")
-                    if p_norm:
-                        # Use token_sort_ratio and higher threshold for strictness
-                        score = fuzz.token_sort_ratio(normalized, p_norm) / 100.0
-                        if score >= 0.90:
-                            found_similar = p_key
-                            break
+            found_similar = duplicate_index.find(normalized)
         
         if found_similar:
             # Merge responses
@@ -89,6 +128,7 @@ def deduplicate_patterns(patterns_file):
                 if resp not in existing_responses:
                     existing_responses.append(resp)
             processed_patterns[found_similar]["responses"] = existing_responses
+            aliases[key] = found_similar
             merged_count += 1
         else:
             # Add as new or updated pattern
@@ -98,19 +138,206 @@ def deduplicate_patterns(patterns_file):
             if "original_query" not in value and key.startswith("learned"):
                 value["original_query"] = query
             processed_patterns[key] = value
+            if key.startswith("learned"):
+                duplicate_index.add(key, normalized)
             
     # Final data
     final_data = processed_patterns
     
     print(f"Processing complete. Merged {merged_count} patterns.")
     print(f"Final count: {len(final_data)} (Original: {original_count})")
+    return final_data, aliases, merged_count
+
+def _score_pairs(pairs):
+    """Worker: exact-score candidate pairs, returning those above the merge threshold"""
+    backend = get_backend()
     
-    # Save back
-    with open(patterns_file, 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, indent=2)
-    print("Patterns saved.")
+    # Pairs arrive sorted, so each entry's partners are scored in one batch call
+    matched = []
+    for i, group in groupby(pairs, key=lambda pair: pair[0]):
+        group = list(group)
+        scores = backend.scores(
+            "token_sort_ratio",
+            group[0][2],
+            [norm_j for _, _, _, norm_j in group],
+            int(MERGE_THRESHOLD * 100)
+        )
+        for (_, j, _, _), score in zip(group, scores):
+            if score / 100.0 >= MERGE_THRESHOLD:
+                matched.append((i, j))
+    return matched
 
-if __name__ == "__main__":
+
+def _candidate_pairs(normalized, rare_tags=2, max_block_size=500):
+    """Block entries by their rarest tags and return the pairs that share a block"""
+    doc_freq = {}
+    for norm in normalized:
+        for tag in set(norm.split()):
+            doc_freq[tag] = doc_freq.get(tag, 0) + 1
+    
+    blocks = {}
+    for i, norm in enumerate(normalized):
+        tags = sorted(set(norm.split()), key=lambda t: (doc_freq[t], t))
+        for tag in tags[:rare_tags]:
+            blocks.setdefault(tag, []).append(i)
+    
+    pairs = set()
+    oversized = 0
+    for members in blocks.values():
+        if len(members) > max_block_size:
+            # Too common to discriminate; entries are still blocked by their other rare tag
+            oversized += 1
+            continue
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                pairs.add((members[a], members[b]))
+    return sorted(pairs), len(blocks), oversized
+
+
+def deduplicate_patterns_batch(patterns_file, workers=None, report_file=None, chunk_size=5000):
+    """Blocked, parallel deduplication of learned patterns with transitive merging"""
+    started = time.perf_counter()
+    print(f"Loading patterns from {patterns_file}...")
+    
+    if not os.path.exists(patterns_file):
+        print("Patterns file not found.")
+        return None
+    
+    # Scored without the store lock; what a running bot journals meanwhile is replayed before the rewrite
+    store = PatternStore(patterns_file)
+    timings = {}
+    
+    def merge(data):
+        timings['load'] = time.perf_counter() - started
+        return _merge_batch(data, timings, workers, chunk_size)
+    
+    stats = _rewrite_merged(store, merge)
+    if stats is None:
+        return None
+    timings['write'] = time.perf_counter() - started - sum(timings.values())
+    timings['total'] = time.perf_counter() - started
+    
+    report = {'patterns_file': patterns_file, 'finished_at': datetime.now().isoformat()}
+    report.update(stats)
+    report['timings_seconds'] = {k: round(v, 4) for k, v in timings.items()}
+    
+    if report_file is None:
+        report_file = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "logs", f"dedup_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+    os.makedirs(os.path.dirname(report_file) or ".", exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Processing complete. Merged {stats['merged_count']} patterns into {len(stats['clusters'])} clusters.")
+    print(f"Final count: {stats['final_count']} (Original: {stats['original_count']})")
+    print(f"Report written to {report_file} ({timings['total']:.2f}s total)")
+    return report
+
+
+def _merge_batch(data, timings, workers, chunk_size):
+    """Batch merge of data, recording phase timings. Returns (final data, merged name -> kept name, report stats)"""
     config = ChatbotConfig()
+    parser = InputParser(config)
+    original_count = len(data)
+    
+    # Normalize every entry (same keyword extraction as the incremental mode)
+    phase = time.perf_counter()
+    learned_keys = []
+    learned_norms = []
+    for key, value in data.items():
+        normalized, query = extract_normalized(key, value, parser)
+        if not normalized:
+            continue
+        value["normalized"] = normalized
+        value["tags"] = normalized.split()
+        if key.startswith("learned"):
+            value.setdefault("original_query", query)
+            learned_keys.append(key)
+            learned_norms.append(normalized)
+    timings['normalize'] = time.perf_counter() - phase
+    
+    # Block by shared rare tags
+    phase = time.perf_counter()
+    pairs, block_count, oversized = _candidate_pairs(learned_norms)
+    timings['blocking'] = time.perf_counter() - phase
+    print(f"{len(learned_keys)} learned patterns, {block_count} blocks, {len(pairs)} candidate pairs.")
+    
+    # Score candidate pairs across a process pool
+    phase = time.perf_counter()
+    chunks = [
+        [(i, j, learned_norms[i], learned_norms[j]) for i, j in pairs[k:k + chunk_size]]
+        for k in range(0, len(pairs), chunk_size)
+    ]
+    matched = []
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_score_pairs, chunks):
+                matched.extend(result)
+    timings['scoring'] = time.perf_counter() - phase
+    
+    # Merge clusters transitively (union-find, earliest entry is the root)
+    phase = time.perf_counter()
+    parent = list(range(len(learned_keys)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in matched:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    
+    clusters = {}
+    for i in range(len(learned_keys)):
+        clusters.setdefault(find(i), []).append(i)
+    
+    final_data = dict(data)
+    merged = {}
+    for root, members in clusters.items():
+        if len(members) < 2:
+            continue
+        root_key = learned_keys[root]
+        responses = final_data[root_key].setdefault("responses", [])
+        for i in members[1:]:
+            key = learned_keys[i]
+            for resp in final_data.pop(key).get("responses", []):
+                if resp not in responses:
+                    responses.append(resp)
+        merged[root_key] = [learned_keys[i] for i in members[1:]]
+    merged_count = sum(len(v) for v in merged.values())
+    timings['merge'] = time.perf_counter() - phase
+    
+    aliases = {merged_key: root_key for root_key, keys in merged.items() for merged_key in keys}
+    stats = {
+        'original_count': original_count,
+        'final_count': len(final_data),
+        'learned_count': len(learned_keys),
+        'blocks': block_count,
+        'oversized_blocks': oversized,
+        'candidate_pairs': len(pairs),
+        'matched_pairs': len(matched),
+        'merged_count': merged_count,
+        'clusters': merged
+    }
+    return final_data, aliases, stats
+
+
+if __name__ == "__main__":
     patterns_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "local", "patterns.json")
-    deduplicate_patterns(patterns_path)
+    
+    arg_parser = argparse.ArgumentParser(description="Deduplicate learned patterns")
+    arg_parser.add_argument("patterns_file", nargs="?", default=patterns_path)
+    arg_parser.add_argument("--batch", action="store_true", help="Blocked, parallel batch mode with a merge report")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Process pool size (batch mode)")
+    arg_parser.add_argument("--report", type=str, default=None, help="Merge report path (batch mode)")
+    args = arg_parser.parse_args()
+    
+    if args.batch:
+        deduplicate_patterns_batch(args.patterns_file, workers=args.workers, report_file=args.report)
+    else:
+        deduplicate_patterns(args.patterns_file)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Set, Tuple
+
+
+class ProfileStore:
+    """SQLite (WAL mode) store holding every user's profile, with write-behind fact updates.
+
+    Profiles are loaded once and kept in memory. set_fact() updates the
+    in-memory profile and queues the change; a background thread commits all
+    queued changes in one transaction every `flush_interval` seconds, so the
+    request path never waits on disk. Repeated updates to a fact between
+    flushes are written once. Profiles loaded with persist=False (guests)
+    are never written and are gone once unloaded.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()  # Guards profiles, versions, pending and transient
+        self.db_lock = threading.Lock()  # Serializes use of the connection
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.versions: Dict[str, int] = {}  # Bumped on every fact change
+        self.pending: Dict[Tuple[str, str], Tuple[str, float]] = {}  # (user, key) -> (value, updated)
+        self.transient: Set[str] = set()  # Users whose facts are kept in memory only
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "username TEXT PRIMARY KEY, created_at TEXT, preferences TEXT NOT NULL DEFAULT '{}')"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            "username TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL, "
+            "PRIMARY KEY (username, key))"
+        )
+        self.conn.commit()
+
+        # Background writer
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+        self._writer.start()
+
+    def load(self, username: str, legacy_file: Optional[str] = None, persist: bool = True) -> Dict[str, Any]:
+        """Return the user's profile, importing legacy_file (an old per-user JSON profile) if the user is new.
+
+        With persist=False the profile starts empty and lives in memory only.
+        """
+        with self.lock:
+            profile = self.profiles.get(username)
+        if profile is not None:
+            return profile
+
+        if not persist:
+            with self.lock:
+                self.transient.add(username)
+                profile = self.profiles.setdefault(
+                    username, {"username": username, "created_at": None, "facts": {}, "preferences": {}}
+                )
+                self.versions.setdefault(username, 0)
+            return profile
+
+        with self.db_lock:
+            profile = self._read(username)
+            if profile is None and legacy_file and os.path.exists(legacy_file):
+                profile = self._import_legacy(username, legacy_file)
+
+            if profile is None:
+                profile = {"username": username, "created_at": None, "facts": {}, "preferences": {}}
+            with self.lock:
+                # Changes not written yet (the user was unloaded before the flush)
+                for (user, key), (value, _) in self.pending.items():
+                    if user == username:
+                        profile["facts"][key] = value
+
+        with self.lock:
+            # Another thread may have loaded the same user meanwhile
+            profile = self.profiles.setdefault(username, profile)
+            self.versions.setdefault(username, 0)
+        return profile
+
+    def set_fact(self, username: str, key: str, value: str):
+        """Update a fact in memory and queue it for the next batch write"""
+        profile = self.load(username)
+        with self.lock:
+            if profile["facts"].get(key) == value:
+                return
+            profile["facts"][key] = value
+            # The profile may have been unloaded since load() returned it
+            self.versions[username] = self.versions.get(username, 0) + 1
+            if username not in self.transient:
+                self.pending[(username, key)] = (value, time.time())
+
+    def facts(self, username: str) -> Dict[str, str]:
+        """Copy of the user's facts"""
+        profile = self.load(username)
+        with self.lock:
+            return dict(profile["facts"])
+
+    def unload(self, username: str):
+        """Drop a profile from memory (e.g. a guest whose session ended); queued changes are still written"""
+        with self.lock:
+            self.profiles.pop(username, None)
+            self.versions.pop(username, None)
+            self.transient.discard(username)
+
+    def version(self, username: str) -> int:
+        """Counter that changes whenever the user's facts do"""
+        with self.lock:
+            return self.versions.get(username, 0)
+
+    def flush(self):
+        """Commit all queued fact changes in one transaction"""
+        with self.db_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+            if not batch:
+                return
+
+            created = datetime.now().isoformat()
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO profiles (username, created_at) VALUES (?, ?)",
+                        [(username, created) for username in {username for username, _ in batch}]
+                    )
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO facts (username, key, value, updated) VALUES (?, ?, ?, ?)",
+                        [(username, key, value, updated) for (username, key), (value, updated) in batch.items()]
+                    )
+            except sqlite3.Error:
+                # Requeue the batch without overwriting anything newer
+                with self.lock:
+                    for item, change in batch.items():
+                        self.pending.setdefault(item, change)
+                raise
+
+    def close(self):
+        """Write the last batch, stop the writer and close the database"""
+        self._stop.set()
+        self._writer.join()
+        with self.db_lock:
+            self.conn.close()
+
+    def _read(self, username: str) -> Optional[Dict[str, Any]]:
+        """Read a profile from the database (caller holds db_lock)"""
+        row = self.conn.execute(
+            "SELECT created_at, preferences FROM profiles WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        facts = dict(self.conn.execute("SELECT key, value FROM facts WHERE username = ?", (username,)).fetchall())
+        return {"username": username, "created_at": row[0], "facts": facts, "preferences": json.loads(row[1])}
+
+    def _import_legacy(self, username: str, legacy_file: str) -> Optional[Dict[str, Any]]:
+        """Copy an old per-user JSON profile into the database (caller holds db_lock)"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            facts = {str(k): str(v) for k, v in legacy.get("facts", {}).items()}
+            preferences = legacy.get("preferences", {})
+            now = time.time()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO profiles (username, created_at, preferences) VALUES (?, ?, ?)",
+                    (username, legacy.get("created_at"), json.dumps(preferences))
+                )
+                self.conn.executemany(
+                    "INSERT INTO facts (username, key, value, updated) VALUES (?, ?, ?, ?)",
+                    [(username, k, v, now) for k, v in facts.items()]
+                )
+        except (OSError, ValueError, AttributeError, sqlite3.Error) as e:
+            logging.getLogger('AmmaarBhaiChatBot').error("Failed to import profile for %s: %s", username, e)
+            return None
+        return {"username": username, "created_at": legacy.get("created_at"), "facts": facts, "preferences": preferences}
+
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.getLogger('AmmaarBhaiChatBot').error("Failed to save profiles: %s", e)
+            if stopping:
+                return
@@ -0,0 +1,81 @@
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Thread- and asyncio-safe token bucket that queues callers instead of rejecting them.
+
+    A caller reserves the next free token and then sleeps until it is due,
+    so waiters are served in arrival order. A reservation is only made if
+    the token will be available within the caller's deadline.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a token, blocking up to timeout seconds. Returns False if none was due in time"""
+        delay = self._reserve(timeout)
+        if delay is None:
+            return False
+        if delay > 0:
+            with self.lock:
+                self.waiting += 1
+            try:
+                time.sleep(delay)
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+        return True
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        """Async counterpart of acquire"""
+        delay = self._reserve(timeout)
+        if delay is None:
+            return False
+        if delay > 0:
+            with self.lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                with self.lock:
+                    self.tokens += 1.0  # Hand the reserved token back
+                raise
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """Current fill level and number of queued callers"""
+        with self.lock:
+            self._refill()
+            return {
+                'tokens': max(self.tokens, 0.0),
+                'capacity': self.capacity,
+                'queue_depth': self.waiting
+            }
+
+    def _reserve(self, timeout: Optional[float]) -> Optional[float]:
+        """Reserve a token; return the wait before it is due, or None past the deadline"""
+        with self.lock:
+            self._refill()
+            # Tokens go negative while reservations are outstanding
+            delay = max(0.0, (1.0 - self.tokens) / self.rate)
+            if timeout is not None and delay > timeout:
+                return None
+            self.tokens -= 1.0
+            return delay
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
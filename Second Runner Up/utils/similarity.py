@@ -0,0 +1,174 @@
+import sys
+import random
+import logging
+from typing import Callable, Dict, List, Optional, Sequence
+
+from fuzzywuzzy import fuzz, utils as fuzz_utils
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+except ImportError:
+    rf_fuzz = rf_process = None
+
+SCORERS = ("ratio", "partial_ratio", "token_sort_ratio", "token_set_ratio")
+
+
+def _full_process(text: str) -> str:
+    """The preprocessing fuzzywuzzy's token scorers apply by default"""
+    return fuzz_utils.full_process(text, force_ascii=True)
+
+
+# fuzzywuzzy runs token scorers on processed strings and ratio/partial_ratio on the raw ones
+_PROCESSORS: Dict[str, Optional[Callable[[str], str]]] = {
+    "ratio": None,
+    "partial_ratio": None,
+    "token_sort_ratio": _full_process,
+    "token_set_ratio": _full_process
+}
+
+
+def _ordered(scorer: str, reverse: bool) -> Callable[[str, str], int]:
+    fn = getattr(fuzz, scorer)
+    if reverse:
+        return lambda query, choice: fn(choice, query)
+    return fn
+
+
+class FuzzyWuzzyBackend:
+    """Pure-Python scorer: fuzzywuzzy, one pair at a time. The reference for every backend."""
+
+    name = "fuzzywuzzy"
+
+    def scores(self, scorer: str, query: str, choices: Sequence[str], score_cutoff: int = 0,
+               reverse: bool = False) -> List[int]:
+        """fuzz.<scorer>(query, choice) for every choice, with scores below score_cutoff reported as 0.
+
+        reverse scores fuzz.<scorer>(choice, query) instead: without
+        python-Levenshtein, fuzzywuzzy's scores depend on argument order.
+        """
+        fn = _ordered(scorer, reverse)
+        result = []
+        for choice in choices:
+            score = fn(query, choice)
+            result.append(score if score >= score_cutoff else 0)
+        return result
+
+
+class RapidFuzzBackend(FuzzyWuzzyBackend):
+    """Scores the whole choice list in one rapidfuzz call (C++), then confirms the survivors with fuzzywuzzy.
+
+    rapidfuzz's scores never fall below fuzzywuzzy's: its ratio is the exact
+    indel similarity fuzzywuzzy approximates (or equals, with
+    python-Levenshtein) and its partial_ratio searches every alignment
+    rather than a few. Choices it puts under the cutoff are therefore under
+    it for fuzzywuzzy too, and the few left are rescored exactly, so every
+    score at or above the cutoff is fuzzywuzzy's own.
+    """
+
+    name = "rapidfuzz"
+
+    def scores(self, scorer: str, query: str, choices: Sequence[str], score_cutoff: int = 0,
+               reverse: bool = False) -> List[int]:
+        if score_cutoff <= 0 or not choices:
+            return super().scores(scorer, query, choices, score_cutoff, reverse)
+
+        fn = _ordered(scorer, reverse)
+        result = [0] * len(choices)
+        # Half a point of slack: fuzzywuzzy rounds its scores, rapidfuzz does not
+        for _, _, i in rf_process.extract(
+            query,
+            choices,
+            scorer=getattr(rf_fuzz, scorer),
+            processor=_PROCESSORS[scorer],
+            limit=None,
+            score_cutoff=score_cutoff - 0.5
+        ):
+            score = fn(query, choices[i])
+            if score >= score_cutoff:
+                result[i] = score
+        return result
+
+
+_backend: Optional[FuzzyWuzzyBackend] = None
+
+
+def get_backend(name: str = "auto") -> FuzzyWuzzyBackend:
+    """The process-wide backend, chosen on first use: "rapidfuzz" if installed (for "auto"), else "fuzzywuzzy" """
+    global _backend
+    if _backend is None or (name != "auto" and _backend.name != name):
+        _backend = _make_backend(name)
+    return _backend
+
+
+def _make_backend(name: str) -> FuzzyWuzzyBackend:
+    if name == "fuzzywuzzy":
+        return FuzzyWuzzyBackend()
+    if rf_process is not None:
+        return RapidFuzzBackend()
+    if name == "rapidfuzz":
+        logging.getLogger('AmmaarBhaiChatBot').warning("rapidfuzz is not installed; using fuzzywuzzy")
+    return FuzzyWuzzyBackend()
+
+
+def check_backends(queries: Sequence[str], choices: Sequence[str],
+                   cutoffs: Sequence[int] = (60, 80, 85, 90, 95)) -> List[str]:
+    """Score every query against choices with each accelerated backend and return its disagreements with fuzzywuzzy.
+
+    Each cutoff is a threshold used by a fuzzy tier; an empty list means the
+    backends accept exactly the same choices with the same scores.
+    """
+    backends = [RapidFuzzBackend()] if rf_process is not None else []
+
+    mismatches = []
+    for scorer in SCORERS:
+        for reverse in (False, True):
+            fn = _ordered(scorer, reverse)
+            for query in queries:
+                reference = [fn(query, choice) for choice in choices]
+                for cutoff in cutoffs:
+                    expected = [score if score >= cutoff else 0 for score in reference]
+                    for backend in backends:
+                        got = backend.scores(scorer, query, choices, cutoff, reverse)
+                        if got != expected:
+                            i = next(i for i, (a, b) in enumerate(zip(got, expected)) if a != b)
+                            mismatches.append(
+                                f"{backend.name} {scorer}>={cutoff} {query!r} vs {choices[i]!r}"
+                                f"{' (reversed)' if reverse else ''}: {got[i]} != {expected[i]}"
+                            )
+    return mismatches
+
+
+def _sample_texts(rng: random.Random, count: int) -> List[str]:
+    """Random phrases built to land near the cutoffs: shared words, typos, reorderings, punctuation"""
+    words = ["hello", "there", "vice", "chancellor", "jamia", "library", "timings", "open", "what",
+             "is", "the", "how", "are", "you", "admission", "fee", "hostel", "café", "naïve", "_id"]
+    texts = []
+    for _ in range(count):
+        phrase = rng.sample(words, rng.randint(1, 5))
+        if rng.random() < 0.4:
+            w = rng.randrange(len(phrase))
+            word = phrase[w]
+            if len(word) > 2:
+                c = rng.randrange(len(word))
+                phrase[w] = word[:c] + rng.choice("aeiouxyz") + word[c + 1:]
+        text = " ".join(phrase)
+        if rng.random() < 0.3:
+            text = text.title() + rng.choice(["?", "!", ".", ",", ""])
+        texts.append(text)
+    return texts
+
+
+if __name__ == "__main__":
+    # Self-check: python utils/similarity.py [N] (tests/test_similarity.py runs the same comparison)
+    if rf_process is None:
+        sys.exit("rapidfuzz is not installed; there is no accelerated backend to check")
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    rng = random.Random(7)
+    texts = _sample_texts(rng, count)
+    problems = check_backends(texts[:count // 3], texts)
+    if problems:
+        print(f"{len(problems)} disagreements:")
+        for problem in problems[:20]:
+            print("  " + problem)
+        sys.exit(1)
+    print(f"rapidfuzz agrees with fuzzywuzzy on {count // 3} x {count} pairs for {', '.join(SCORERS)}")